@@ -6,9 +6,14 @@
 # License.zenoss under the directory where your Zenoss product is installed.
 #
 ##############################################################################
+import weakref
+
+import transaction
+from Acquisition import aq_base
 from Products.ZenUtils.Search import makeFieldIndex, makeKeywordIndex
 from ..functions import catalog_search
 from ..helpers.ZenPackLibLog import DEFAULTLOG
+from .IndexingQueue import IndexingQueue
 
 class CatalogBase(object):
     """Abstract base class that implements cataloging properties."""
@@ -17,6 +22,10 @@ class CatalogBase(object):
     _global_catalogs = {}
     LOG = DEFAULTLOG
 
+    # Incremented whenever catalogs are created or removed so that cached
+    # catalog handles are resolved again.
+    _catalog_generation = 0
+
     # Searching ##############################################################
 
     def device_search(self, name, *args, **kwargs):
@@ -41,7 +50,44 @@ class CatalogBase(object):
     # Catalog Lookup #########################################################
 
     def get_all_catalogs(self):
-        """Return list of device and global catalogs for this object."""
+        """Return list of device and global catalogs for this object.
+
+        Resolved catalogs are cached for the current transaction in a
+        volatile attribute of the object returned by get_cache_holder,
+        keyed by class, until invalidate_catalog_cache is called.
+
+        """
+        holder = self.get_cache_holder()
+        key = (CatalogBase._catalog_generation, transaction.get())
+        txn_ref, generation, cache = getattr(
+            holder, '_v_zpl_catalogs', (None, None, None))
+
+        if (generation, txn_ref and txn_ref()) != key:
+            cache = {}
+            holder._v_zpl_catalogs = (weakref.ref(key[1]), key[0], cache)
+
+        catalogs = cache.get(self.__class__)
+        if catalogs is None:
+            catalogs = self.resolve_all_catalogs()
+
+            # Don't cache partial results. The object may not be wrapped.
+            expected = len(self._device_catalogs) + len(self._global_catalogs)
+            if len(catalogs) == expected and all(catalogs):
+                cache[self.__class__] = catalogs
+
+        return list(catalogs)
+
+    def get_cache_holder(self):
+        """Return unwrapped object that holds volatile caches for self."""
+        return aq_base(self)
+
+    @staticmethod
+    def invalidate_catalog_cache():
+        """Discard all cached catalogs. Called when catalogs change."""
+        CatalogBase._catalog_generation += 1
+
+    def resolve_all_catalogs(self):
+        """Return uncached list of device and global catalogs."""
         catalogs = self.get_device_catalogs()
 
         try:
@@ -122,6 +168,7 @@ class CatalogBase(object):
             from Products.ZCatalog.ZCatalog import manage_addZCatalog
             manage_addZCatalog(context, name, name)
             zcatalog = context._getOb(name)
+            CatalogBase.invalidate_catalog_cache()
 
         if CatalogBase.create_catalog_indexes(zcatalog, indexes):
             CatalogBase.reindex_catalog(context, zcatalog, classname)
@@ -172,14 +219,24 @@ class CatalogBase(object):
 
     def index_object(self, idxs=None):
         """Index in all configured catalogs."""
+        queue = IndexingQueue.get()
         for catalog in self.get_all_catalogs():
-            if catalog:
+            if not catalog:
+                continue
+            if queue:
+                queue.index(catalog, self)
+            else:
                 catalog.catalog_object(self, self.getPrimaryId())
 
     def unindex_object(self):
         """Unindex from all configured catalogs."""
+        queue = IndexingQueue.get()
         for catalog in self.get_all_catalogs():
-            if catalog:
+            if not catalog:
+                continue
+            if queue:
+                queue.unindex(catalog, self)
+            else:
                 catalog.uncatalog_object(self.getPrimaryId())
 
     def device_id(self):
@@ -7,11 +7,8 @@
 #
 ##############################################################################
 import os
-import json
-from Products.AdvancedQuery import Eq, Or
+from Acquisition import aq_base
 from Products.Zuul.decorators import memoize
-from Products.Zuul.catalog.events import IndexingEvent
-from zope.event import notify
 from Products.ZenModel.Device import Device
 from Products.ZenModel.DeviceComponent import DeviceComponent
 from Products.ZenModel.ZenossSecurity import ZEN_CHANGE_DEVICE
@@ -20,8 +17,54 @@ from Products.ZenRelations import ToOneRelationship, ToManyContRelationship, ToM
 from Products.ZenRelations.Exceptions import ZenSchemaError
 
 from .ModelBase import ModelBase
-from ..utils import FACET_BLACKLIST
-from ..functions import catalog_search
+from .RelationshipBatch import RelationshipBatch
+from .TemplateBindings import TEMPLATE_BINDINGS
+from ..helpers.PathPatternStreams import PathPatternStreams
+from ..utils import FACET_BLACKLIST, has_metricfacade
+
+
+def get_facet_key(obj):
+    """Return primary path of obj.
+
+    Facet paths are built from it, so it changes whenever obj or any of
+    its containers is renamed or moved. Persistent ids aren't used, as
+    objects that haven't been committed yet don't have one.
+
+    """
+    return obj.getPrimaryId()
+
+
+def lines(val):
+    """handle 'lines' type"""
+    if not isinstance(val, list):
+        val = [val]
+    val = [str(v) for v in val]
+    return val
+
+
+# dictionary of _property "type" keys and target Python classes
+PROPERTY_TYPE_MAP = {
+    'boolean': bool,
+    'int': int,
+    'float': float,
+    'string': str,
+    'password': str,
+    'lines': lines,
+    }
+
+
+def get_property_coercers(properties):
+    """Return dictionary of _properties "id"s and coercion callables.
+
+    Only properties with a type in PROPERTY_TYPE_MAP are included. As
+    with attribute lookup, the last definition of a duplicate id wins.
+
+    """
+    property_types = {p.get('id'): p.get('type') for p in properties}
+    return {
+        p_id: PROPERTY_TYPE_MAP[p_type]
+        for p_id, p_type in property_types.iteritems()
+        if p_type in PROPERTY_TYPE_MAP}
 
 
 class ComponentBase(ModelBase):
@@ -47,6 +90,10 @@ class ComponentBase(ModelBase):
             },
         }
 
+    # Pair of the _properties tuple and the {id: coercer} table built from
+    # it. ClassSpec attaches a prebuilt table to every generated class.
+    _property_coercers = ((), {})
+
     def __setattr__(self, name, value):
         '''enforce type checking when setting _properties attributes'''
         if self._p_setattr(name, value):
@@ -60,38 +107,59 @@ class ComponentBase(ModelBase):
             # http://persistent.readthedocs.io/en/latest/using.html
             return
 
-        def lines(val):
-            """handle 'lines' type"""
-            if not isinstance(val, list):
-                val = [val]
-            val = [str(v) for v in val]
-            return val
-        # dictionary of _property "type" keys and target Python classes
-        target_type_map = {'boolean': bool,
-                           'int': int,
-                           'float': float,
-                           'string': str,
-                           'password': str,
-                           'lines': lines,
-                           }
-        # dictionary of _properties "id"s and "type"s
-        property_dict = {p.get('id'): p.get('type') for p in self._properties}
+        properties, coercers = self._property_coercers
+        if properties is not self._properties:
+            # _properties was changed below the class that built the table.
+            properties, coercers = type(self).update_property_coercers()
+
         # only change type if it's a _properties attribute
-        if name in property_dict:
-            # and if we know how to handle it
-            target_class = target_type_map.get(property_dict.get(name))
-            if target_class and value is not None:
-                try:
-                    value = target_class(value)
-                except Exception as e:
-                    self.LOG.warning('Error setting {} ({}) to: {} failed ({}).'.format(name,
-                                                                                        target_class.__name__,
-                                                                                        value,
-                                                                                        e))
+        coercer = coercers.get(name)
+        if coercer and value is not None:
+            try:
+                value = coercer(value)
+            except Exception as e:
+                self.LOG.warning('Error setting {} ({}) to: {} failed ({}).'.format(name,
+                                                                                    coercer.__name__,
+                                                                                    value,
+                                                                                    e))
         return super(ModelBase, self).__setattr__(name, value)
 
+    @classmethod
+    def update_property_coercers(cls):
+        """Rebuild and return the _properties coercion table for cls."""
+        cls._property_coercers = (
+            cls._properties, get_property_coercers(cls._properties))
+        return cls._property_coercers
+
     def device(self):
-        """Return device under which this component/device is contained."""
+        """Return device under which this component/device is contained.
+
+        The unwrapped device is cached on the object returned by
+        get_cache_holder, along with the primary parents of the holder and
+        the device. It's looked up again when either has changed, or when
+        a component in the holder is removed or moved. The cached device is
+        wrapped in this object's acquisition context.
+
+        """
+        holder = self.get_cache_holder()
+        cached = getattr(holder, '_v_zpl_device', None)
+        if cached is not None:
+            device, holder_parent, device_parent = cached
+            if getattr(holder, '__primary_parent__', None) is holder_parent \
+                    and getattr(device, '__primary_parent__', None) is device_parent:
+                return device.__of__(self)
+
+        device = self.find_device()
+        if device is not None:
+            holder._v_zpl_device = (
+                aq_base(device),
+                getattr(holder, '__primary_parent__', None),
+                getattr(aq_base(device), '__primary_parent__', None))
+
+        return device
+
+    def find_device(self):
+        """Return device found by walking up the primary path."""
         obj = self
 
         for i in xrange(200):
@@ -109,6 +177,37 @@ class ComponentBase(ModelBase):
                 # expects device() to return None, not to throw an exception.
                 return None
 
+    def manage_beforeDelete(self, item, container):
+        """Forget the rrdPath and the device cached for self.
+
+        Removing, renaming or moving any of the containers between self
+        and its device removes self too, so neither is used after self
+        has moved elsewhere.
+
+        """
+        holder = getattr(aq_base(self), '__primary_parent__', None)
+        if holder is not None and getattr(holder, '_v_zpl_device', None):
+            del holder._v_zpl_device
+
+        if getattr(aq_base(self), '_v_zpl_rrd_path', None):
+            del self._v_zpl_rrd_path
+
+        super(ComponentBase, self).manage_beforeDelete(item, container)
+
+    def get_cache_holder(self):
+        """Return unwrapped object that holds volatile caches for self.
+
+        Components contained in the same relationship are always under the
+        same device, so they share the relationship's cached device and
+        catalogs.
+
+        """
+        holder = getattr(aq_base(self), '__primary_parent__', None)
+        if holder is None:
+            return aq_base(self)
+
+        return holder
+
     def getStatus(self, statClass='/Status'):
         """Return the status number for this component.
 
@@ -129,42 +228,9 @@ class ComponentBase(ModelBase):
 
     def setIdForRelationship(self, relationship, id_):
         """Update ToOne relationship given relationship and id."""
-        old_obj = relationship()
-
-        # Return with no action if the relationship is already correct.
-        if (old_obj and old_obj.id == id_) or (not old_obj and not id_):
-            return
-
-        # Remove current object from relationship.
-        if old_obj:
-            relationship.removeRelation()
-
-            # Index old object. It might have a custom path reporter.
-            notify(IndexingEvent(old_obj.primaryAq(), 'path', False))
-
-        # If there is no new ID to add, we're done.
-        if id_ is None:
-            return
-
-        # Find and add new object to relationship.
-        for result in catalog_search(self.device(), 'ComponentBase', id=id_):
-            try:
-                new_obj = result.getObject()
-            except Exception as e:
-                self.LOG.error("Trying to add relation to non-existent object {}".format(e))
-            else:
-                relationship.addRelation(new_obj)
-
-            # Index remote object. It might have a custom path reporter.
-            notify(IndexingEvent(new_obj.primaryAq(), 'path', False))
-
-            # For componentSearch. Would be nice if we could target
-            # idxs=['getAllPaths'], but there's a chance that it won't exist
-            # yet.
-            new_obj.index_object()
-            return
-
-        self.LOG.error("setIdForRelationship ({}): No target found matching id={}".format(relationship, id_))
+        batch = RelationshipBatch()
+        batch.set_ids(self, relationship, id_)
+        batch.apply()
 
     def getIdsInRelationship(self, relationship):
         """Return a list of object ids in relationship.
@@ -188,49 +254,9 @@ class ComponentBase(ModelBase):
 
     def setIdsInRelationship(self, relationship, ids):
         """Update ToMany relationship given relationship and ids."""
-        new_ids = set(ids)
-        current_ids = set(o.id for o in relationship.objectValuesGen())
-        changed_ids = new_ids.symmetric_difference(current_ids)
-
-        query = Or(*[Eq('id', x) for x in changed_ids])
-
-        obj_map = {}
-        for result in catalog_search(self.device(), 'ComponentBase', query):
-            try:
-                component = result.getObject()
-            except Exception as e:
-                self.LOG.error("Trying to access non-existent object {}".format(e))
-            else:
-                obj_map[result.id] = component
-
-        for id_ in new_ids.symmetric_difference(current_ids):
-            obj = obj_map.get(id_)
-            if not obj:
-                self.LOG.error(
-                    "setIdsInRelationship ({}): No targets found matching "
-                    "id={}".format(relationship, id_))
-
-                continue
-
-            if id_ in new_ids:
-                self.LOG.debug("Adding {} to {}".format(obj, relationship))
-                relationship.addRelation(obj)
-
-                # Index remote object. It might have a custom path reporter.
-                notify(IndexingEvent(obj, 'path', False))
-            else:
-                self.LOG.debug("Removing {} from {}".format(obj, relationship))
-                relationship.removeRelation(obj)
-
-                # If the object was not deleted altogether..
-                if not isinstance(relationship, ToManyContRelationship):
-                    # Index remote object. It might have a custom path reporter.
-                    notify(IndexingEvent(obj, 'path', False))
-
-            # For componentSearch. Would be nice if we could target
-            # idxs=['getAllPaths'], but there's a chance that it won't exist
-            # yet.
-            obj.index_object()
+        batch = RelationshipBatch()
+        batch.set_ids(self, relationship, ids)
+        batch.apply()
 
     @property
     def containing_relname(self):
@@ -293,7 +319,11 @@ class ComponentBase(ModelBase):
             root = self
 
         if streams is None:
-            streams = getattr(self, '_v_path_pattern_streams', [])
+            streams = getattr(self, '_v_path_pattern_streams', None) or PathPatternStreams()
+        elif not isinstance(streams, PathPatternStreams):
+            streams = PathPatternStreams(streams)
+
+        log_matches = self.LOG.isEnabledFor(9)
 
         for relname in self.get_faceting_relnames():
             rel = getattr(self, relname, None)
@@ -310,6 +340,17 @@ class ComponentBase(ModelBase):
 
             relpath = "/".join(path + [relname])
 
+            # Pattern streams that continue traversal along relpath.
+            followed = ()
+            if not recurse_all and streams:
+                followed = streams.follow(relpath)
+
+                if log_matches:
+                    for stream in streams:
+                        self.LOG.log(9, "[{}] matching {} against {}: {}".format(
+                            root.meta_type, relpath, [x.pattern for x in stream],
+                            any(stream is x[0] for x in followed)))
+
             # Always include directly-related objects.
             for obj in relobjs:
                 if (self.id, relname, obj.id) in seen:
@@ -326,21 +367,49 @@ class ComponentBase(ModelBase):
                         yield facet
 
                 else:
-                    # Otherwise, look at extra_path defined path pattern streams
-                    for stream in streams:
-                        recurse = any([pattern.match(relpath) for pattern in stream])
-
-                        self.LOG.log(9, "[{}] matching {} against {}: {}".format(root.meta_type, relpath, [x.pattern for x in stream], recurse))
-                        if not recurse:
-                            continue
-
-                        for facet in obj.get_facets(root=root, seen=seen, streams=[stream], path=path, depth=depth + 1):
+                    # Otherwise, follow extra_path defined path pattern streams
+                    for stream in followed:
+                        for facet in obj.get_facets(root=root, seen=seen, streams=stream, path=path, depth=depth + 1):
                             if (self.id, relname, facet.id) in seen:
                                 # avoid a cycle
                                 continue
                             yield facet
                             seen.add((self.id, relname, facet.id))
 
+    def get_facet_fingerprint(self):
+        """Return a fingerprint of what this component's facets depend on.
+
+        Returns None for classes with extra_paths. Their facets depend on
+        objects any number of relationships away, so they aren't
+        fingerprinted.
+
+        Otherwise the fingerprint is built from persistent state, so it
+        changes however the relationships are changed: the primary path of
+        each object in a faceting relationship, and where this component's
+        device is.
+
+        """
+        if getattr(self, '_v_path_pattern_streams', None):
+            return None
+
+        contents = []
+        for relname in self.get_faceting_relnames():
+            rel = getattr(self, relname, None)
+            if not rel or not callable(rel):
+                continue
+
+            if isinstance(rel, ToOneRelationship):
+                obj = rel()
+                contents.append(get_facet_key(obj) if obj else None)
+            else:
+                contents.append(tuple(
+                    get_facet_key(x) for x in rel.objectValuesGen()))
+
+        device = self.device()
+        return (
+            device.getPrimaryId() if device else None,
+            tuple(contents))
+
     def rrdPath(self):
         """Return filesystem path for RRD files for this component.
 
@@ -352,17 +421,34 @@ class ComponentBase(ModelBase):
         This requires that each component have a unique id within the
         device's namespace.
 
+        The path is cached on the component until it, or any of its
+        containers, is renamed or moved. Renaming or moving a container
+        removes the component from it first, which drops the cached path
+        in manage_beforeDelete.
+
         """
-        original = super(ComponentBase, self).rrdPath()
+        key = self.get_rrd_path_key()
+        cached = getattr(aq_base(self), '_v_zpl_rrd_path', None)
+        if key is not None and cached is not None and cached[0] == key:
+            return cached[1]
 
-        try:
-            # Zenoss 5 returns a JSONified dict from rrdPath.
-            json.loads(original)
-        except ValueError:
-            # Zenoss 4 and earlier return a string that starts with "Devices/"
-            return os.path.join('Devices', self.device().id, self.id)
-        else:
-            return original
+        path = get_rrd_path_strategy()(self)
+        if key is not None:
+            self._v_zpl_rrd_path = (key, path)
+
+        return path
+
+    def get_rrd_path_key(self):
+        """Return key that changes when this component's rrdPath may change."""
+        device = self.device()
+        if device is None:
+            return None
+
+        return (
+            self.id,
+            getattr(aq_base(self), '__primary_parent__', None),
+            device.id,
+            getattr(aq_base(device), '__primary_parent__', None))
 
     def getRRDTemplateName(self):
         """Return name of primary template to bind to this component."""
@@ -379,7 +465,21 @@ class ComponentBase(ModelBase):
         defined *-replacement and *-addition monitoring templates that
         can replace or augment the standard templates respectively.
 
+        Bindings are cached per device class and template names. See
+        TemplateBindings.
+
         """
+        device = self.device()
+        device_class = device.deviceClass() if device is not None else None
+
+        return TEMPLATE_BINDINGS.get_templates(
+            (self, device),
+            device_class,
+            tuple(self._templates),
+            self.resolve_rrd_templates)
+
+    def resolve_rrd_templates(self):
+        """Return list of templates to bind to this component uncached."""
         templates = []
 
         for template_name in self._templates:
@@ -400,3 +500,35 @@ class ComponentBase(ModelBase):
                 templates.append(addition)
 
         return templates
+
+
+def metadata_rrd_path(component):
+    """Return Zenoss 5 rrdPath: a JSONified dict of metric metadata."""
+    return super(ComponentBase, component).rrdPath()
+
+
+def flat_rrd_path(component):
+    """Return Zenoss 4 rrdPath with one directory per component."""
+    return os.path.join('Devices', component.device().id, component.id)
+
+
+_rrd_path_strategy = None
+
+
+def get_rrd_path_strategy():
+    """Return function that returns the rrdPath of a component.
+
+    Zenoss 5 and later return metric metadata from rrdPath. Zenoss 4 and
+    earlier return a string that starts with "Devices/", which is
+    flattened to one directory per component. The platform is only
+    detected once.
+
+    """
+    global _rrd_path_strategy
+    if _rrd_path_strategy is None:
+        if has_metricfacade():
+            _rrd_path_strategy = metadata_rrd_path
+        else:
+            _rrd_path_strategy = flat_rrd_path
+
+    return _rrd_path_strategy
@@ -0,0 +1,187 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+import time
+from collections import OrderedDict
+
+import transaction
+from Acquisition import aq_base
+
+from ..helpers.ZenPackLibLog import DEFAULTLOG
+from .DeviceRelations import DEFAULT_BATCH_SIZE
+from .IndexingQueue import IndexingQueue
+
+
+def get_device_path(path):
+    """Return path of the device that contains the object at path."""
+    parts = path.split('/')
+    for i in range(len(parts) - 2, -1, -1):
+        if parts[i] == 'devices':
+            return '/'.join(parts[:i + 2])
+
+    return None
+
+
+class ComponentRemover(object):
+    """Remove all components of types from the catalog paths of them.
+
+    Component paths are grouped by device and containing relationship,
+    and each relationship is handled once, deepest first. A relationship
+    that only contains components being removed is deleted as a whole and
+    recreated empty, otherwise its components are deleted individually.
+
+    zenpacklib catalog writes are queued with IndexingQueue while removing.
+    Before each batch ends they're performed per catalog, and each device
+    catalog left empty is cleared with one call. Between batches of
+    batch_size components the ZODB cache is garbage collected, and the
+    transaction is committed if commit is True. Deleted components are
+    gone from the catalog once committed, so running it again after an
+    interruption continues with the remaining components.
+
+    Each removed component still goes through manage_beforeDelete. That
+    removes its links from remote objects' relationships, and unindexes it
+    from the platform catalogs. Those catalogs have no bulk uncatalog, and
+    suppressing the per-object events would leave the links behind.
+
+    """
+
+    LOG = DEFAULTLOG
+
+    def __init__(self, dmd, types, batch_size=DEFAULT_BATCH_SIZE, commit=False, log=None):
+        self.dmd = dmd
+        self.types = types
+        self.batch_size = max(1, batch_size)
+        self.commit = commit
+        if log is not None:
+            self.LOG = log
+
+        self.timings = OrderedDict((
+            ('search', 0.0),
+            ('remove', 0.0),
+            ('commit', 0.0),
+            ('gc', 0.0),
+            ))
+
+        self.stats = OrderedDict((
+            ('components', 0),
+            ('devices', 0),
+            ('relationships', 0),
+            ('removed', 0),
+            ('missing', 0),
+            ('batches', 0),
+            ))
+
+    def get_relationships(self):
+        """Return [(relationship path, set(ids))] deepest first by device."""
+        from Products.Zuul.interfaces import ICatalogTool
+
+        relationships = {}
+        for brain in ICatalogTool(self.dmd).search(types=self.types):
+            path = brain.getPath()
+            relpath, component_id = path.rsplit('/', 1)
+            relationships.setdefault(relpath, set()).add(component_id)
+            self.stats['components'] += 1
+
+        devices = set(get_device_path(x) for x in relationships)
+        self.stats['devices'] = len(devices)
+        self.stats['relationships'] = len(relationships)
+
+        return sorted(
+            relationships.iteritems(),
+            key=lambda x: (get_device_path(x[0]), -x[0].count('/'), x[0]))
+
+    def run(self):
+        """Remove components in batches. Return stats."""
+        start = time.time()
+        relationships = self.get_relationships()
+        self.timings['search'] += time.time() - start
+
+        queued = IndexingQueue.enabled
+        IndexingQueue.enable()
+        try:
+            pending = 0
+            for relpath, ids in relationships:
+                start = time.time()
+                pending += self.remove_relationship(relpath, ids)
+                self.timings['remove'] += time.time() - start
+
+                if pending >= self.batch_size:
+                    self.end_batch()
+                    pending = 0
+
+            if pending:
+                self.end_batch()
+        finally:
+            if not queued:
+                IndexingQueue.disable()
+
+        self.LOG.info(self.report())
+        return self.stats
+
+    def remove_relationship(self, relpath, ids):
+        """Remove ids from relationship at relpath. Return number removed."""
+        rel = self.dmd.unrestrictedTraverse(relpath, None)
+        if rel is None:
+            self.stats['missing'] += len(ids)
+            return 0
+
+        existing = set(rel.objectIds())
+        missing = ids - existing
+        if missing:
+            self.stats['missing'] += len(missing)
+            self.LOG.error(
+                "Trying to remove non-existent objects {} from {}".format(
+                    ', '.join(sorted(missing)), relpath))
+
+        ids = ids & existing
+        if not ids:
+            return 0
+
+        parent = rel.getPrimaryParent()
+        relname = rel.id
+        schema = dict(getattr(aq_base(parent), '_relations', ()))
+        if ids == existing and relname in schema:
+            parent._delObject(relname)
+            parent._setObject(relname, schema[relname].createRelation(relname))
+        else:
+            for component_id in ids:
+                rel._delObject(component_id)
+
+        self.stats['removed'] += len(ids)
+        return len(ids)
+
+    def end_batch(self):
+        """Perform queued catalog writes, commit and garbage collect."""
+        self.stats['batches'] += 1
+
+        start = time.time()
+        queue = IndexingQueue.get()
+        if queue:
+            queue.flush()
+        self.timings['remove'] += time.time() - start
+
+        if self.commit:
+            start = time.time()
+            transaction.commit()
+            self.timings['commit'] += time.time() - start
+
+        start = time.time()
+        jar = getattr(self.dmd, '_p_jar', None)
+        if jar is not None:
+            jar.cacheGC()
+        self.timings['gc'] += time.time() - start
+
+        self.LOG.info(
+            "Removed {} of {} components".format(
+                self.stats['removed'], self.stats['components']))
+
+    def report(self):
+        """Return one-line summary of stats and per-phase timings."""
+        return "Component removal: {} phases: {}".format(
+            ' '.join('{}={}'.format(k, v) for k, v in self.stats.items()),
+            ' '.join('{}={:.3f}s'.format(k, v) for k, v in self.timings.items()))
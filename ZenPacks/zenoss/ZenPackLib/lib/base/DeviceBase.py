@@ -12,6 +12,7 @@ from zenoss.protocols.protobufs.zep_pb2 import (
     SEVERITY_CRITICAL,
     )
 from .ModelBase import ModelBase
+from .TemplateBindings import TEMPLATE_BINDINGS
 
 
 class DeviceBase(ModelBase):
@@ -72,7 +73,18 @@ class DeviceBase(ModelBase):
         Support user-defined *-replacement and *-addition monitoring
         templates that can replace or augment the standard templates.
 
+        Bindings are cached per device class and template names. See
+        TemplateBindings.
+
         """
+        return TEMPLATE_BINDINGS.get_templates(
+            (self,),
+            self.deviceClass(),
+            tuple(self.zDeviceTemplates),
+            self.resolve_rrd_templates)
+
+    def resolve_rrd_templates(self):
+        """Return list of templates to bind to this device uncached."""
         templates = []
 
         for template in super(ModelBase, self).getRRDTemplates():
@@ -87,9 +99,6 @@ class DeviceBase(ModelBase):
 
             if replacement and replacement not in templates:
                 templates.append(replacement)
-                self.setZenProperty(
-                    'zDeviceTemplates',
-                    self.zDeviceTemplates + [replacement.titleOrId()])
             else:
                 templates.append(template)
 
@@ -98,8 +107,5 @@ class DeviceBase(ModelBase):
 
             if addition and addition not in templates:
                 templates.append(addition)
-                self.setZenProperty(
-                    'zDeviceTemplates',
-                    self.zDeviceTemplates + [addition.titleOrId()])
 
         return templates
@@ -0,0 +1,181 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+import os
+import time
+from collections import OrderedDict
+
+import transaction
+from Acquisition import aq_base
+
+from ..helpers.ZenPackLibLog import DEFAULTLOG
+
+# devices per batch when ZPL_RELATIONS_BATCH isn't set
+DEFAULT_BATCH_SIZE = 1000
+
+
+def get_batch_size(variable='ZPL_RELATIONS_BATCH'):
+    """Return objects per committed batch, or None if batches aren't committed.
+
+    The batch size is set by the named environment variable.
+
+    """
+    try:
+        size = int(os.environ.get(variable) or 0)
+    except ValueError:
+        return None
+
+    return size if size > 0 else None
+
+
+def relations_current(device):
+    """Return True if device has exactly the relationships of its class.
+
+    Each relationship must also be of the class its schema creates.
+
+    """
+    schema = set(x[0] for x in getattr(aq_base(device), '_relations', ()))
+    if schema != set(device.getRelationshipNames()):
+        return False
+
+    return not get_mistyped_relations(device)
+
+
+def get_mistyped_relations(device):
+    """Return names of device's relationships not of their schema's class."""
+    names = []
+    for name, schema in getattr(aq_base(device), '_relations', ()):
+        relation = getattr(aq_base(device), name, None)
+        if relation is None:
+            continue
+
+        if aq_base(relation).__class__ is not schema.relationClass:
+            names.append(name)
+
+    return names
+
+
+class DeviceRelationsBuilder(object):
+    """Build relationships of existing devices after their classes changed.
+
+    Devices whose relationships already match their class are skipped, so
+    only devices of classes that gained or lost relationships are touched.
+    This also makes the build restartable: if it's interrupted after some
+    batches were committed, running it again continues with the devices
+    that weren't updated yet.
+
+    Relationships whose class changed are replaced, because buildRelations
+    only adds and removes them by name. If types is given, only devices
+    of those dotted class names are loaded, as found by the global
+    catalog.
+
+    Devices are processed in batches of batch_size. Between batches the
+    ZODB cache is garbage collected, and the transaction is committed if
+    commit is True. Time spent in each phase is kept in timings.
+
+    """
+
+    LOG = DEFAULTLOG
+
+    def __init__(self, dmd, batch_size=DEFAULT_BATCH_SIZE, commit=False,
+                 log=None, types=None):
+        self.dmd = dmd
+        self.types = types
+        self.batch_size = max(1, batch_size)
+        self.commit = commit
+        if log is not None:
+            self.LOG = log
+
+        self.timings = OrderedDict((
+            ('scan', 0.0),
+            ('build', 0.0),
+            ('commit', 0.0),
+            ('gc', 0.0),
+            ))
+
+        self.stats = OrderedDict((
+            ('devices', 0),
+            ('updated', 0),
+            ('batches', 0),
+            ))
+
+    def run(self):
+        """Build relationships of all devices that need it. Return stats."""
+        pending = 0
+        start = time.time()
+        for device in self.get_devices():
+            self.stats['devices'] += 1
+            if relations_current(device):
+                continue
+
+            self.timings['scan'] += time.time() - start
+            start = time.time()
+            for name in get_mistyped_relations(device):
+                device._delObject(name)
+
+            device.buildRelations()
+            self.stats['updated'] += 1
+            pending += 1
+            self.timings['build'] += time.time() - start
+
+            if pending >= self.batch_size:
+                self.end_batch()
+                pending = 0
+
+            start = time.time()
+
+        self.timings['scan'] += time.time() - start
+        if pending:
+            self.end_batch()
+
+        self.LOG.info(self.report())
+        return self.stats
+
+    def get_devices(self):
+        """Generate devices that may need their relationships built."""
+        if self.types is None:
+            for device in self.dmd.Devices.getSubDevicesGen():
+                yield device
+
+            return
+
+        if not self.types:
+            return
+
+        from Products.Zuul.interfaces import ICatalogTool
+        for result in ICatalogTool(self.dmd.Devices).search(types=self.types):
+            try:
+                yield result.getObject()
+            except Exception as e:
+                self.LOG.warning("Skipping missing device {}: {}".format(
+                    result.getPath(), e))
+
+    def end_batch(self):
+        """Commit and garbage collect the ZODB cache after a batch."""
+        self.stats['batches'] += 1
+
+        if self.commit:
+            start = time.time()
+            transaction.commit()
+            self.timings['commit'] += time.time() - start
+
+        start = time.time()
+        jar = getattr(self.dmd, '_p_jar', None)
+        if jar is not None:
+            jar.cacheGC()
+        self.timings['gc'] += time.time() - start
+
+        self.LOG.info(
+            "Updated relationships of {} devices ({} scanned)".format(
+                self.stats['updated'], self.stats['devices']))
+
+    def report(self):
+        """Return one-line summary of stats and per-phase timings."""
+        return "Device relationships: {} phases: {}".format(
+            ' '.join('{}={}'.format(k, v) for k, v in self.stats.items()),
+            ' '.join('{}={:.3f}s'.format(k, v) for k, v in self.timings.items()))
@@ -0,0 +1,172 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+import os
+import weakref
+from collections import OrderedDict
+
+import transaction
+from Acquisition import aq_base
+
+from ..helpers.ZenPackLibLog import DEFAULTLOG
+
+INDEX = 'index'
+UNINDEX = 'unindex'
+
+
+def uncatalog_objects(catalog, uids):
+    """Uncatalog uids from catalog. Return number of uids uncataloged.
+
+    If uids are everything catalog contains, it's cleared with one call
+    instead of uncataloging each of them.
+
+    """
+    uids = [x for x in set(uids) if catalog.getrid(x) is not None]
+    if uids and len(uids) == len(catalog):
+        catalog.manage_catalogClear()
+    else:
+        for uid in uids:
+            catalog.uncatalog_object(uid)
+
+    return len(uids)
+
+
+class IndexingQueue(object):
+    """Per-transaction queue of zenpacklib catalog writes.
+
+    When enabled, CatalogBase.index_object and unindex_object queue their
+    catalog writes here instead of performing them immediately. Requests
+    are keyed on catalog and primary id, so repeated requests for the same
+    object collapse into one write. If an object is both indexed and
+    unindexed in the same transaction, the unindex wins.
+
+    The queue is flushed by a before-commit hook, and before any
+    catalog_search against a catalog with pending writes so that searches
+    always see the current state.
+
+    The queue is opt-in. Enable it in-process with IndexingQueue.enable()
+    or for all processes by setting the ZPL_INDEXING_QUEUE environment
+    variable.
+
+    """
+
+    LOG = DEFAULTLOG
+    enabled = bool(os.environ.get('ZPL_INDEXING_QUEUE'))
+
+    # Cumulative counters for this process.
+    stats = OrderedDict((
+        ('requested', 0),
+        ('performed', 0),
+        ('flushes', 0),
+        ))
+
+    # {transaction: IndexingQueue}
+    _queues = weakref.WeakKeyDictionary()
+
+    def __init__(self):
+        # {(id(catalog), uid): [action, catalog, obj]}
+        self.pending = OrderedDict()
+        # {id(catalog): number of pending writes}
+        self.catalogs = {}
+
+    @classmethod
+    def enable(cls):
+        """Enable queueing of catalog writes for this process."""
+        cls.enabled = True
+
+    @classmethod
+    def disable(cls):
+        """Flush the current transaction's queue and stop queueing."""
+        queue = cls._queues.get(transaction.get())
+        if queue:
+            queue.flush()
+        cls.enabled = False
+
+    @classmethod
+    def get(cls):
+        """Return queue for current transaction, or None if not enabled."""
+        if not cls.enabled:
+            return None
+
+        txn = transaction.get()
+        queue = cls._queues.get(txn)
+        if queue is None:
+            queue = cls._queues[txn] = cls()
+            txn.addBeforeCommitHook(queue.flush)
+
+        return queue
+
+    @classmethod
+    def flush_catalog(cls, catalog):
+        """Perform pending writes for catalog in the current transaction."""
+        if not cls._queues:
+            return
+
+        queue = cls._queues.get(transaction.get())
+        if queue and id(aq_base(catalog)) in queue.catalogs:
+            queue.flush()
+
+    def index(self, catalog, obj):
+        """Queue cataloging of obj in catalog."""
+        self.request(INDEX, catalog, obj)
+
+    def unindex(self, catalog, obj):
+        """Queue uncataloging of obj from catalog."""
+        self.request(UNINDEX, catalog, obj)
+
+    def request(self, action, catalog, obj):
+        IndexingQueue.stats['requested'] += 1
+
+        catalog_key = id(aq_base(catalog))
+        key = (catalog_key, obj.getPrimaryId())
+        entry = self.pending.get(key)
+        if entry is None:
+            self.pending[key] = [action, catalog, obj]
+            self.catalogs[catalog_key] = self.catalogs.get(catalog_key, 0) + 1
+        elif entry[0] != UNINDEX:
+            # Unindex wins over index.
+            entry[0] = action
+            entry[2] = obj
+
+    def flush(self):
+        """Perform and clear all pending catalog writes.
+
+        Writes are performed one catalog at a time, in the order each
+        catalog was first requested. All of a catalog's unindex requests
+        are performed together by uncatalog_objects.
+
+        """
+        if not self.pending:
+            return
+
+        pending = self.pending
+        self.pending = OrderedDict()
+        self.catalogs = {}
+
+        by_catalog = OrderedDict()
+        for (catalog_key, uid), entry in pending.iteritems():
+            by_catalog.setdefault(catalog_key, []).append((uid, entry))
+
+        for entries in by_catalog.itervalues():
+            catalog = entries[0][1][1]
+            uncatalog_objects(
+                catalog, [uid for uid, x in entries if x[0] == UNINDEX])
+
+            for uid, (action, catalog, obj) in entries:
+                if action != UNINDEX:
+                    catalog.catalog_object(obj, uid)
+
+        IndexingQueue.stats['performed'] += len(pending)
+        IndexingQueue.stats['flushes'] += 1
+
+        self.LOG.debug(
+            "IndexingQueue flushed {} catalog writes ({} requested, "
+            "{} performed since start)".format(
+                len(pending),
+                IndexingQueue.stats['requested'],
+                IndexingQueue.stats['performed']))
@@ -0,0 +1,298 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+import time
+from collections import Counter, OrderedDict
+
+import transaction
+from Acquisition import aq_base
+
+from ..helpers.TemplateDiff import fingerprints_match, template_diff
+from ..helpers.ZenPackLibLog import DEFAULTLOG
+
+# operations applied between savepoints
+DEFAULT_BATCH_SIZE = 100
+
+# kinds of operations, in the order they're planned and applied
+DEVICE_CLASS = 'device class'
+TEMPLATE = 'template'
+EVENT_CLASS = 'event class'
+PROCESS_CLASS_ORGANIZER = 'process class organizer'
+KINDS = (DEVICE_CLASS, TEMPLATE, EVENT_CLASS, PROCESS_CLASS_ORGANIZER)
+
+
+class OrganizerResolver(object):
+    """Resolve organizer paths under a root, looking up each organizer once.
+
+    Paths that share parents, such as the device classes of a ZenPack,
+    are resolved in a single traversal of the organizer tree.
+
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.resolved = {'': root}
+        self.lookups = 0
+
+    def get(self, path):
+        """Return organizer at path, or None if it doesn't exist."""
+        from Products.ZenModel.Organizer import Organizer
+
+        path = path.strip('/')
+        if path in self.resolved:
+            return self.resolved[path]
+
+        parent_path, _, name = path.rpartition('/')
+        parent = self.get(parent_path)
+        organizer = None
+        if parent is not None:
+            self.lookups += 1
+            # aq_base keeps acquisition from finding other organizers.
+            child = getattr(aq_base(parent), name, None)
+            if isinstance(child, Organizer):
+                organizer = child.__of__(parent)
+
+        self.resolved[path] = organizer
+        return organizer
+
+    def add(self, path, organizer):
+        """Record organizer created at path."""
+        # Its parents may have been created along with it.
+        self.resolved = dict((k, v) for k, v in self.resolved.iteritems() if v is not None)
+        self.resolved[path.strip('/')] = organizer
+
+
+class PlannedOperation(object):
+    """An organizer or template operation of an InstallPlan.
+
+    action is 'create' or 'update' for organizers, or 'none' for missing
+    organizers the spec doesn't create. For templates it's 'create' or
+    'check' until estimated, when 'check' becomes 'update', 'unchanged'
+    or 'skip'. cost is the estimated number of objects written.
+
+    """
+
+    def __init__(self, kind, name, spec, action, cost, organizer=None, specparam=None):
+        self.kind = kind
+        self.name = name
+        self.spec = spec
+        self.action = action
+        self.cost = cost
+        self.organizer = organizer
+        self.specparam = specparam
+
+    def __str__(self):
+        return "{:<8} {:<24} {} (~{} objects)".format(
+            self.action, self.kind, self.name, self.cost)
+
+
+def template_cost(spec):
+    """Return number of objects written to create template from spec."""
+    cost = 1 + len(spec.thresholds)
+    for ds_spec in spec.datasources.values():
+        cost += 1 + len(ds_spec.datapoints)
+    for g_spec in spec.graphs.values():
+        cost += 1 + len(g_spec.graphpoints) + len(g_spec.comments or [])
+    return cost
+
+
+def organizer_cost(spec, resolver):
+    """Return number of objects written to create or update spec's organizer."""
+    cost = 0
+    if spec.reset or resolver.get(spec.path) is None:
+        cost += len(spec.zProperties)
+    cost += len(getattr(spec, 'mappings', None) or {})
+    cost += len(getattr(spec, 'process_classes', None) or {})
+    if resolver.get(spec.path) is None:
+        # missing organizers along the path are created too
+        parts = spec.path.strip('/').split('/')
+        while parts and resolver.get('/'.join(parts)) is None:
+            cost += 1
+            parts.pop()
+    return cost
+
+
+class InstallPlan(object):
+    """Organizer and template operations of a ZenPack install.
+
+    build computes the operations without changing anything. The target
+    organizers of each kind are resolved in one traversal and kept with
+    the operations. apply then runs the operations of the given kinds in
+    a deterministic order: device classes by path, so parents are created
+    before their children, templates by device class and name, then event
+    classes and process class organizers by path.
+
+    Operations are applied in batches of batch_size. Between batches a
+    savepoint is made and the ZODB cache is garbage collected.
+
+    """
+
+    LOG = DEFAULTLOG
+
+    def __init__(self, zenpack, app, batch_size=DEFAULT_BATCH_SIZE, log=None):
+        self.zenpack = zenpack
+        self.app = app
+        self.dmd = app.zport.dmd
+        self.batch_size = max(1, batch_size)
+        if log is not None:
+            self.LOG = log
+
+        self.operations = []
+        self.resolvers = {}
+        self.timings = OrderedDict((
+            ('plan', 0.0),
+            ('apply', 0.0),
+            ('savepoint', 0.0),
+            ))
+
+    def resolver(self, kind, spec):
+        if kind not in self.resolvers:
+            self.resolvers[kind] = OrganizerResolver(spec.get_root(self.dmd))
+        return self.resolvers[kind]
+
+    def build(self, estimate=False):
+        """Compute operations and return self.
+
+        With estimate, existing templates are compared with their specs to
+        tell which would be updated. Nothing is changed either way.
+
+        """
+        start = time.time()
+        zenpack = self.zenpack
+        organizer_specs = (
+            (DEVICE_CLASS, zenpack.device_classes),
+            (EVENT_CLASS, zenpack.event_classes),
+            (PROCESS_CLASS_ORGANIZER, zenpack.process_class_organizers),
+            )
+
+        for kind, specs in organizer_specs:
+            for name in sorted(specs):
+                spec = specs[name]
+                resolver = self.resolver(kind, spec)
+                organizer = resolver.get(spec.path)
+                if organizer is not None:
+                    action = 'update'
+                else:
+                    action = 'create' if spec.create else 'none'
+                cost = organizer_cost(spec, resolver) if action != 'none' else 0
+                self.operations.append(
+                    PlannedOperation(kind, name, spec, action, cost, organizer=organizer))
+
+            if kind == DEVICE_CLASS:
+                self.plan_templates(estimate)
+
+        self.timings['plan'] += time.time() - start
+        return self
+
+    def plan_templates(self, estimate):
+        zenpack = self.zenpack
+        for dcname in sorted(zenpack.device_classes):
+            dcspec = zenpack.device_classes[dcname]
+            dcspecparam = zenpack._v_specparams.device_classes.get(dcname)
+            if not dcspec.templates:
+                continue
+
+            deviceclass = self.resolver(DEVICE_CLASS, dcspec).get(dcspec.path)
+            for mtname in sorted(dcspec.templates):
+                mtspec = dcspec.templates[mtname]
+                mtspecparam = dcspecparam.templates.get(mtname)
+                action = 'create'
+                candidate = None
+                if deviceclass is not None:
+                    candidate = (
+                        zenpack.get_object(deviceclass, 'rrdTemplates', '{}-backup'.format(mtname)) or
+                        zenpack.get_object(deviceclass, 'rrdTemplates', mtname))
+                if candidate is not None:
+                    action = 'check'
+                    if estimate:
+                        if fingerprints_match(candidate, mtspecparam):
+                            action = 'skip'
+                        elif template_diff(candidate, mtspec):
+                            action = 'update'
+                        else:
+                            action = 'unchanged'
+
+                cost = template_cost(mtspec) if action in ('create', 'check', 'update') else 0
+                self.operations.append(PlannedOperation(
+                    TEMPLATE, '{}/{}'.format(dcname, mtname), mtspec, action, cost,
+                    specparam=mtspecparam))
+
+    def apply(self, kinds=KINDS):
+        """Apply operations of kinds. Return Counter of template results."""
+        results = Counter()
+        pending = 0
+        for operation in self.operations:
+            if operation.kind not in kinds:
+                continue
+
+            start = time.time()
+            if operation.kind == TEMPLATE:
+                results[self.apply_template(operation)] += 1
+            else:
+                self.apply_organizer(operation)
+            self.timings['apply'] += time.time() - start
+
+            pending += 1
+            if pending >= self.batch_size:
+                self.end_batch()
+                pending = 0
+
+        if pending:
+            self.end_batch()
+
+        return results
+
+    def apply_organizer(self, operation):
+        spec = operation.spec
+        organizer = spec.create_organizer(self.dmd, operation.organizer)
+        if organizer is None:
+            if operation.kind == DEVICE_CLASS:
+                self.LOG.warn("Device Class (%s) not found", spec.path)
+        elif operation.organizer is None:
+            self.resolver(operation.kind, spec).add(spec.path, organizer)
+
+    def apply_template(self, operation):
+        spec = operation.spec
+        dcspec = spec.deviceclass_spec
+        deviceclass = self.resolver(DEVICE_CLASS, dcspec).get(dcspec.path)
+        if deviceclass is None:
+            deviceclass = dcspec.get_organizer(self.dmd)
+        return self.zenpack.update_object(
+            self.app, deviceclass, 'rrdTemplates',
+            spec.name, spec, operation.specparam)
+
+    def end_batch(self):
+        """Make a savepoint and garbage collect the ZODB cache after a batch."""
+        start = time.time()
+        transaction.savepoint(optimistic=True)
+        jar = getattr(self.dmd, '_p_jar', None)
+        if jar is not None:
+            jar.cacheGC()
+        self.timings['savepoint'] += time.time() - start
+
+    def describe(self):
+        """Return the operations and their estimated cost as text."""
+        lines = [str(x) for x in self.operations if x.action != 'none']
+        actions = Counter((x.kind, x.action) for x in self.operations)
+        for kind in KINDS:
+            counts = ', '.join(
+                '{} {}'.format(n, action)
+                for (k, action), n in sorted(actions.items()) if k == kind)
+            if counts:
+                lines.append('{}s: {}'.format(kind.capitalize(), counts))
+
+        lines.append('Estimated cost: {} objects written, {} organizer lookups'.format(
+            sum(x.cost for x in self.operations),
+            sum(x.lookups for x in self.resolvers.values())))
+        return '\n'.join(lines)
+
+    def report(self):
+        """Return one-line summary of per-phase timings."""
+        return "Install plan: {} operations phases: {}".format(
+            len(self.operations),
+            ' '.join('{}={:.3f}s'.format(k, v) for k, v in self.timings.items()))
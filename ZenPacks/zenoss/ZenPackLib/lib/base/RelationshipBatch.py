@@ -0,0 +1,247 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+import time
+from collections import OrderedDict
+from Products.AdvancedQuery import Eq, Or
+from Products.Zuul.catalog.events import IndexingEvent
+from zope.event import notify
+from Products.ZenRelations import ToOneRelationship, ToManyContRelationship
+
+from ..functions import catalog_search
+from ..helpers.ZenPackLibLog import DEFAULTLOG
+
+
+class RelationshipBatch(object):
+    """Batched id-based relationship updates for many components.
+
+    Updates are queued with set_ids (or by passing batch=... to a
+    generated set_<relname> setter) and carried out by apply. All
+    targets of all queued updates are resolved with a single catalog
+    query per device, and every object touched by the batch is indexed
+    once no matter how many of its relationships changed.
+
+    Indexing is coalesced per apply. The zenpacklib catalog writes of
+    index_object go through IndexingQueue when it's enabled, so those
+    are also coalesced across batches in the same transaction. The path
+    IndexingEvent for the platform's catalog is sent once per apply.
+
+    Example usage in a modeler-driven method:
+
+        batch = RelationshipBatch()
+        for volume in device.volumes():
+            volume.set_pool(pool_ids[volume.id], batch=batch)
+            volume.set_snapshots(snapshot_ids[volume.id], batch=batch)
+        stats = batch.apply()
+
+    """
+
+    LOG = DEFAULTLOG
+
+    def __init__(self):
+        # {device: [(component, relationship, set(ids) or id), ...]}
+        self.updates = OrderedDict()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Start a new statistics dictionary for the next apply."""
+        self.stats = OrderedDict((
+            ('components', 0),
+            ('devices', 0),
+            ('queries', 0),
+            ('added', 0),
+            ('removed', 0),
+            ('missing', 0),
+            ('indexed', 0),
+            ('resolve_time', 0.0),
+            ('update_time', 0.0),
+            ('index_time', 0.0),
+            ))
+
+    def __len__(self):
+        return sum(len(x) for x in self.updates.itervalues())
+
+    def set_ids(self, component, relationship, id_or_ids):
+        """Queue update of relationship on component to id_or_ids.
+
+        relationship may be a relationship object or its name. ToOne
+        relationships take a single id (or None), ToMany relationships
+        take an iterable of ids.
+
+        """
+        if isinstance(relationship, basestring):
+            relationship = getattr(component, relationship)
+
+        if isinstance(relationship, ToOneRelationship):
+            target = id_or_ids
+        else:
+            target = set(id_or_ids or ())
+
+        device = component.device()
+        self.updates.setdefault(device, []).append(
+            (component, relationship, target))
+
+    def apply(self):
+        """Apply all queued updates and return statistics dictionary.
+
+        Only the last update queued for each relationship of a component
+        is applied. Each change is computed just before it's applied, so
+        updates to both sides of a relationship see each other's effect.
+
+        """
+        self.reset_stats()
+        touched = OrderedDict()
+
+        for device, updates in self.updates.iteritems():
+            updates = self.deduplicate(updates)
+            self.stats['devices'] += 1
+            self.stats['components'] += len(set(id(x[0]) for x in updates))
+
+            # Objects already related don't need to be looked up.
+            obj_map = {}
+            wanted_ids = set()
+            for component, relationship, target in updates:
+                obj_map.update(self.get_current(relationship))
+                if isinstance(relationship, ToOneRelationship):
+                    wanted_ids.update([target] if target else [])
+                else:
+                    wanted_ids.update(target)
+
+            wanted_ids.difference_update(obj_map)
+
+            start = time.time()
+            obj_map.update(self.resolve(device, wanted_ids))
+            self.stats['resolve_time'] += time.time() - start
+
+            start = time.time()
+            for component, relationship, target in updates:
+                change = self.get_change(relationship, target)
+                if change:
+                    added, removed, current = change
+                    self.update(
+                        relationship, added, removed, current, obj_map, touched)
+            self.stats['update_time'] += time.time() - start
+
+        start = time.time()
+        for obj, path_only in touched.itervalues():
+            # Index remote object. It might have a custom path reporter.
+            notify(IndexingEvent(obj, 'path', False))
+
+            if not path_only:
+                # For componentSearch. Would be nice if we could target
+                # idxs=['getAllPaths'], but there's a chance that it won't
+                # exist yet.
+                obj.index_object()
+
+            self.stats['indexed'] += 1
+        self.stats['index_time'] += time.time() - start
+
+        self.updates.clear()
+
+        self.LOG.debug(
+            "RelationshipBatch applied: {}".format(
+                ", ".join("{}={}".format(k, v) for k, v in self.stats.items())))
+
+        return self.stats
+
+    def deduplicate(self, updates):
+        """Return updates with only the last one for each relationship."""
+        latest = OrderedDict()
+        for component, relationship, target in updates:
+            key = (component.getPrimaryId(), relationship.id)
+            latest.pop(key, None)
+            latest[key] = (component, relationship, target)
+
+        return latest.values()
+
+    def get_current(self, relationship):
+        """Return {id: object} of objects currently in relationship."""
+        if isinstance(relationship, ToOneRelationship):
+            old_obj = relationship()
+            return {old_obj.id: old_obj} if old_obj else {}
+
+        return {o.id: o for o in relationship.objectValuesGen()}
+
+    def get_change(self, relationship, target):
+        """Return (added, removed, current) tuple or None if unchanged."""
+        current = self.get_current(relationship)
+        if isinstance(relationship, ToOneRelationship):
+            if target in current or (not current and not target):
+                return None
+
+            added = set([target]) if target else set()
+            return added, set(current), current
+
+        added = target.difference(current)
+        removed = set(current).difference(target)
+        if not added and not removed:
+            return None
+
+        return added, removed, current
+
+    def resolve(self, device, ids):
+        """Return {id: object} for ids with one catalog query on device."""
+        obj_map = {}
+        if not ids:
+            return obj_map
+
+        query = Or(*[Eq('id', x) for x in ids])
+        self.stats['queries'] += 1
+        for result in catalog_search(device, 'ComponentBase', query):
+            try:
+                obj_map[result.id] = result.getObject()
+            except Exception as e:
+                self.LOG.error("Trying to access non-existent object {}".format(e))
+
+        return obj_map
+
+    def update(self, relationship, added, removed, current, obj_map, touched):
+        """Apply one relationship change and record touched objects."""
+        for id_ in removed:
+            obj = current[id_]
+            self.LOG.debug("Removing {} from {}".format(obj, relationship))
+            if isinstance(relationship, ToOneRelationship):
+                relationship.removeRelation()
+                self.touch(touched, obj.primaryAq(), path_only=True)
+            elif isinstance(relationship, ToManyContRelationship):
+                # The object is deleted altogether; don't index it later.
+                touched.pop(obj.getPrimaryId(), None)
+                relationship.removeRelation(obj)
+            else:
+                relationship.removeRelation(obj)
+                self.touch(touched, obj.primaryAq())
+
+            self.stats['removed'] += 1
+
+        for id_ in added:
+            obj = obj_map.get(id_)
+            if not obj:
+                if isinstance(relationship, ToOneRelationship):
+                    self.LOG.error(
+                        "setIdForRelationship ({}): No target found matching "
+                        "id={}".format(relationship, id_))
+                else:
+                    self.LOG.error(
+                        "setIdsInRelationship ({}): No targets found matching "
+                        "id={}".format(relationship, id_))
+
+                self.stats['missing'] += 1
+                continue
+
+            self.LOG.debug("Adding {} to {}".format(obj, relationship))
+            relationship.addRelation(obj)
+            self.touch(touched, obj)
+            self.stats['added'] += 1
+
+    def touch(self, touched, obj, path_only=False):
+        """Record that obj needs to be indexed once the batch is applied."""
+        key = obj.getPrimaryId()
+        if key in touched:
+            path_only = path_only and touched[key][1]
+
+        touched[key] = (obj, path_only)
@@ -0,0 +1,132 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+from Acquisition import aq_base, aq_parent
+
+
+def get_device_class_chain(device_class):
+    """Return list of device_class and its parent device classes."""
+    chain = []
+    organizer = device_class.primaryAq()
+    while organizer is not None and getattr(aq_base(organizer), 'rrdTemplates', None) is not None:
+        chain.append(organizer)
+        organizer = aq_parent(organizer)
+
+    return chain
+
+
+def get_templates_serials(chain):
+    """Return serials of the rrdTemplates relationships of chain.
+
+    Adding, renaming or removing a template updates the count of its
+    rrdTemplates relationship, which gives the relationship a new serial
+    once committed. None is returned while any of them has uncommitted
+    changes, or if any of them hasn't been stored yet.
+
+    """
+    serials = []
+    for organizer in chain:
+        templates = organizer.rrdTemplates
+        if getattr(templates, '_p_jar', None) is None:
+            return None
+
+        templates._p_activate()
+        if templates._p_changed:
+            return None
+        serials.append(templates._p_serial)
+
+    return tuple(serials)
+
+
+class TemplateBindings(object):
+    """Cache of templates bound by template names within a device class.
+
+    Bindings are keyed by device class path and template names, and record
+    at which level of the device class hierarchy each bound template was
+    found. They're dropped when templates are added, renamed or removed in
+    any of the device classes.
+
+    Only templates found in the device class hierarchy can be cached.
+    Objects with local templates, including those of a component's
+    device, and bindings that include templates found elsewhere are
+    always resolved.
+
+    """
+
+    def __init__(self):
+        # (device class path, names) -> (serials, ((level, template id), ...))
+        self.bindings = {}
+
+    def get_templates(self, objects, device_class, names, resolve):
+        """Return templates bound to names for objects in device_class.
+
+        objects are the bound object and the objects it acquires templates
+        from before device_class. resolve is called to find the templates
+        when the binding isn't cached. It must return the same templates
+        for all objects in device_class that have no local templates.
+
+        """
+        if device_class is None:
+            return resolve()
+
+        if any(self.has_local_templates(x, names) for x in objects):
+            return resolve()
+
+        chain = get_device_class_chain(device_class)
+        serials = get_templates_serials(chain)
+        if serials is None:
+            return resolve()
+
+        key = (device_class.getPrimaryId(), names)
+        cached = self.bindings.get(key)
+        if cached and cached[0] == serials:
+            templates = []
+            for level, template_id in cached[1]:
+                template = chain[level].rrdTemplates._getOb(template_id, None)
+                if template is None:
+                    break
+                templates.append(template)
+            else:
+                return templates
+
+        templates = resolve()
+
+        paths = [x.getPrimaryId() for x in chain]
+        binding = []
+        for template in templates:
+            try:
+                organizer = template.getPrimaryParent().getPrimaryParent()
+                level = paths.index(organizer.getPrimaryId())
+            except (AttributeError, ValueError):
+                return templates
+            binding.append((level, template.id))
+
+        self.bindings[key] = (serials, tuple(binding))
+        return templates
+
+    def has_local_templates(self, obj, names):
+        """Return True if obj contains a template for any of names."""
+        if obj is None:
+            return False
+
+        base = aq_base(obj)
+        for name in names:
+            for template_name in (
+                    name,
+                    '{}-replacement'.format(name),
+                    '{}-addition'.format(name)):
+                if getattr(base, template_name, None) is not None:
+                    return True
+
+        return False
+
+    def clear(self):
+        self.bindings.clear()
+
+
+TEMPLATE_BINDINGS = TemplateBindings()
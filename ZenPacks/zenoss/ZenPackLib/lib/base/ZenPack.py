@@ -11,12 +11,19 @@ from lxml import etree
 import yaml
 import difflib
 import time
-import sys
 
 from Acquisition import aq_base
 from Products.ZenModel.ZenPack import ZenPack as ZenPackBase
 from ..helpers.Dumper import Dumper
 from ..helpers.ZenPackLibLog import ZenPackLibLog, new_log
+from ..helpers.TemplateDiff import (
+    fingerprints_match, reconcile_enabled, set_fingerprints, template_diff)
+from .CatalogBase import CatalogBase
+from .ComponentRemoval import ComponentRemover
+from .InstallPlan import (
+    DEVICE_CLASS, EVENT_CLASS, PROCESS_CLASS_ORGANIZER, TEMPLATE, InstallPlan)
+from .DeviceRelations import (
+    DEFAULT_BATCH_SIZE, DeviceRelationsBuilder, get_batch_size)
 from Products.ZenEvents import ZenEventClasses
 
 LOG = new_log('zpl.ZenPack')
@@ -39,7 +46,7 @@ class ZenPack(ZenPackBase):
     """
     ZenPack loader that handles custom installation and removal tasks.
 
-    NEW_COMPONENT_TYPES AND NEW_RELATIONS will be monkeypatched in
+    NEW_COMPONENT_TYPES, NEW_RELATIONS AND DEVICE_TYPES will be monkeypatched in
     via zenpacklib when this class is instantiated.
     """
     LOG = LOG
@@ -47,20 +54,70 @@ class ZenPack(ZenPackBase):
     def __init__(self, *args, **kwargs):
         super(ZenPack, self).__init__(*args, **kwargs)
 
-    def _buildDeviceRelations(self, app, batch=10):
-        count = 0
-        for d in app.zport.dmd.Devices.getSubDevicesGen():
-            d.buildRelations()
-            count += 1
-            if count % batch == 0:
-                sys.stderr.write('.')
-        if count > batch:
-            sys.stderr.write('\n')
+    def _buildDeviceRelations(self, app, batch=None):
+        """Build relationships of existing devices that need them.
+
+        Setting the ZPL_RELATIONS_BATCH environment variable enables chunked
+        mode, in which the transaction is committed after each batch of
+        that many devices. batch overrides the batch size.
+
+        """
+        size = get_batch_size()
+        builder = DeviceRelationsBuilder(
+            app.zport.dmd,
+            batch_size=batch or size or DEFAULT_BATCH_SIZE,
+            commit=size is not None,
+            log=self.LOG,
+            types=self.get_device_types())
+        builder.run()
         self.LOG.info('Finished adding {} relationships to existing devices'.format(self.id))
 
+    def get_device_types(self):
+        """Return dotted names of device classes whose relationships change.
+
+        Those are this ZenPack's device classes, and the imported device
+        classes it adds relationships to. Returns None, for all devices, if
+        this ZenPack's class doesn't know its device classes.
+
+        """
+        from Products.ZenModel.Device import Device
+        from Products.ZenUtils.Utils import importClass
+
+        device_types = getattr(self, 'DEVICE_TYPES', None)
+        if device_types is None:
+            return None
+
+        types = list(device_types)
+        for module_id in self.NEW_RELATIONS:
+            if issubclass(importClass(module_id), Device):
+                types.append('{}.{}'.format(module_id, module_id.rsplit('.', 1)[-1]))
+
+        return types
+
+    def _removeComponents(self, app, batch=None):
+        """Remove all components of NEW_COMPONENT_TYPES.
+
+        Setting the ZPL_REMOVAL_BATCH environment variable enables chunked
+        mode, in which the transaction is committed after each batch of
+        that many components. batch overrides the batch size.
+
+        """
+        size = get_batch_size('ZPL_REMOVAL_BATCH')
+        remover = ComponentRemover(
+            app.zport.dmd,
+            self.NEW_COMPONENT_TYPES,
+            batch_size=batch or size or DEFAULT_BATCH_SIZE,
+            commit=size is not None,
+            log=self.LOG)
+        remover.run()
+
     def install(self, app):
         self.createZProperties(app)
-        self.create_device_classes(app)
+
+        # Device classes, templates, event classes and process class
+        # organizers are created or updated as planned here.
+        plan = InstallPlan(self, app, log=self.LOG).build()
+        plan.apply((DEVICE_CLASS,))
 
         # Load objects.xml now
         super(ZenPack, self).install(app)
@@ -68,28 +125,19 @@ class ZenPack(ZenPackBase):
             self.LOG.info('Adding {} relationships to existing devices'.format(self.id))
             self._buildDeviceRelations(app)
 
-        # load monitoring templates
-        for dcname, dcspec in self.device_classes.iteritems():
-            dcspecparam = self._v_specparams.device_classes.get(dcname)
-            deviceclass = dcspec.get_organizer(app.zport.dmd)
-
-            for mtname, mtspec in dcspec.templates.iteritems():
-                mtspecparam = dcspecparam.templates.get(mtname)
-                self.update_object(app, deviceclass, 'rrdTemplates', mtname, mtspec, mtspecparam)
+        # load monitoring templates, event classes and process classes
+        results = plan.apply((TEMPLATE, EVENT_CLASS, PROCESS_CLASS_ORGANIZER))
+        if results:
+            self.LOG.info('Monitoring templates: {}'.format(', '.join(
+                '{} {}'.format(results[x], x)
+                for x in ('created', 'updated', 'unchanged', 'skipped'))))
 
-        # Load event classes
-        for ecname, ecspec in self.event_classes.iteritems():
-            ec_org = ecspec.create_organizer(app.zport.dmd)
-
-        # Create Process Classes
-        for psname, psspec in self.process_class_organizers.iteritems():
-            ps_org = psspec.create_organizer(app.zport.dmd)
+        self.LOG.debug(plan.report())
 
     def remove(self, app, leaveObjects=False):
         if self._v_specparams is None:
             return
 
-        from Products.Zuul.interfaces import ICatalogTool
         if leaveObjects:
             # Check whether the ZPL-managed monitoring templates have
             # been modified by the user.  If so, those changes will
@@ -128,18 +176,11 @@ class ZenPack(ZenPackBase):
                 if catObj:
                     self.LOG.info('Removing Catalog {}'.format(catalog))
                     dc._delObject(catalog)
+                    CatalogBase.invalidate_catalog_cache()
 
             if self.NEW_COMPONENT_TYPES:
                 self.LOG.info('Removing {} components'.format(self.id))
-                cat = ICatalogTool(app.zport.dmd)
-                for brain in cat.search(types=self.NEW_COMPONENT_TYPES):
-                    try:
-                        component = brain.getObject()
-                    except Exception as e:
-                        self.LOG.error("Trying to remove non-existent object {}".format(e))
-                        continue
-                    else:
-                        component.getPrimaryParent()._delObject(component.id)
+                self._removeComponents(app)
 
                 # Remove our Device relations additions.
                 from Products.ZenUtils.Utils import importClass
@@ -164,7 +205,12 @@ class ZenPack(ZenPackBase):
         super(ZenPack, self).remove(app, leaveObjects=leaveObjects)
 
     def update_object(self, app, parent, relname, object_id, spec, specparam):
-        """Compare object to be installed to existing objects, optionally creating the new object"""
+        """Compare object to be installed to existing objects, optionally creating the new object
+
+        Return 'created', 'updated', 'unchanged' or 'skipped'. Objects whose
+        recorded fingerprints show they were created from the same spec and
+        haven't been modified since are skipped without comparing them.
+        """
         # this backup should exist if previous installed version of this zenpack uses ZPL 2.0
         backup_target = self.get_object(parent, relname, "{}-backup".format(object_id))
         # otherwise this is the existing object pre-zpl 2.0
@@ -175,6 +221,18 @@ class ZenPack(ZenPackBase):
         if not candidate_target:
             # if no candidate target is found, then this is new to this zenpack
             spec.create(app.zport.dmd)
+            result = 'created'
+        elif fingerprints_match(candidate_target, specparam):
+            # unchanged since it was created from the same spec
+            if backup_target:
+                self.move_object(parent, relname, backup_target.id, object_id)
+            return 'skipped'
+        elif reconcile_enabled():
+            # update the candidate in place rather than replacing it
+            if backup_target:
+                self.move_object(parent, relname, backup_target.id, object_id)
+            edits = self.reconcile_object(app, parent, relname, object_id, spec, specparam)
+            result = 'updated' if edits else 'unchanged'
         else:
             # check the difference between our candidate and the new spec
             # and back up the candidate if there is a difference
@@ -182,6 +240,7 @@ class ZenPack(ZenPackBase):
             # if there was a difference, keep the backup and create the new template
             if diff:
                 spec.create(app.zport.dmd)
+                result = 'updated'
             else:
                 # otherwise just return the backup template to its original location
                 if backup_target:
@@ -189,6 +248,13 @@ class ZenPack(ZenPackBase):
                 # or in the case of the existing object, leave it alone
                 else:
                     pass
+                result = 'unchanged'
+
+        # record what it was created from, so unchanged installs can skip it
+        target = self.get_object(parent, relname, object_id)
+        if target:
+            set_fingerprints(target, specparam)
+        return result
 
     def check_diff(self, app, parent, relname, object, spec, specparam):
         """Return True if object has changed creating preupgrade backup if needed"""
@@ -207,6 +273,21 @@ class ZenPack(ZenPackBase):
                     parent.getDmdKey(), spec.name, self.id, preupgrade_id, diff))
         return True
 
+    def reconcile_object(self, app, parent, relname, object_id, spec, specparam):
+        """Update object in place to match spec, returning TemplateEdits or None if unchanged"""
+        object = self.get_object(parent, relname, object_id)
+        diff = self.object_changed(app, object, spec, specparam)
+        if not diff:
+            return None
+        edits = spec.reconcile(app.zport.dmd)
+        LOG.info("Existing object {}/{} differs from "
+                 "the newer version included with the {} ZenPack.  "
+                 "The existing object was updated in place ({}).  "
+                 "Please review and reconcile any local changes "
+                 "it had: \n{}".format(
+                    parent.getDmdKey(), spec.name, self.id, edits, diff))
+        return edits
+
     def get_object(self, parent, relname, object_id):
         """Attempt to retrieve an object given its id, parent instance, and relation name"""
         rel = getattr(parent, relname, None)
@@ -254,18 +335,12 @@ class ZenPack(ZenPackBase):
             self.rename_object(parent, relname, source_id, dest_id)
 
     def object_changed(self, app, object, spec, specparam):
-        """Compare new and old objects with prototype creation"""
-        # get YAML representation of object
-        object_yaml = yaml.dump(specparam.fromObject(object), Dumper=Dumper)
-
-        # get YAML representation of prototype
-        proto_id = '{}-new'.format(spec.name)
-        proto_object = spec.create(app.zport.dmd, False, proto_id)
-        proto_object_param = specparam.fromObject(proto_object)
-        proto_object_yaml = yaml.dump(proto_object_param, Dumper=Dumper)
-        spec.remove(app.zport.dmd, proto_id)
+        """Compare new and old objects without prototype creation
 
-        return self.get_yaml_diff(object_yaml, proto_object_yaml)
+        The live object is compared field by field with what spec would
+        create, so no objects are created in ZODB.
+        """
+        return template_diff(object, spec)
 
     def object_changed_safe(self, object, specparam):
         """Compare new and old objects without prototype creation 
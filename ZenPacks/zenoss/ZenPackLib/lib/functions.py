@@ -15,41 +15,96 @@ import operator
 import re
 from Products.AdvancedQuery.AdvancedQuery import _BaseQuery as BaseQuery
 
-from Products.ZenModel.Device import Device as BaseDevice
-from Products.Zuul.infos.device import DeviceInfo as BaseDeviceInfo
-from Products.ZenModel.DeviceComponent import DeviceComponent as BaseDeviceComponent
-from Products.Zuul.infos.component import ComponentInfo as BaseComponentInfo
 from .helpers.ZenPackLibLog import DEFAULTLOG
+from .base.IndexingQueue import IndexingQueue
 
 
 # Private Functions #########################################################
 
 
+# (module, class) of the platform classes whose callables are reserved.
+KEYWORD_CLASSES = (
+    ('Products.ZenModel.Device', 'Device'),
+    ('Products.ZenModel.DeviceComponent', 'DeviceComponent'),
+    ('Products.Zuul.infos.device', 'DeviceInfo'),
+    ('Products.Zuul.infos.component', 'ComponentInfo'),
+    )
+
+
 def getZenossKeywords(klasses):
     kwset = set()
     for klass in klasses:
-        for k in klass.__dict__.keys():
-            if callable(getattr(klass, k)):
-                kwset = kwset.union([k])
-        for attribute in dir(klass):
-            if callable(getattr(klass, attribute)):
-                kwset = kwset.union([attribute])
+        kwset.update(
+            attribute for attribute in dir(klass)
+            if callable(getattr(klass, attribute, None)))
     return kwset
 
-ZENOSS_KEYWORDS = getZenossKeywords([BaseDevice,
-                                     BaseDeviceInfo,
-                                     BaseDeviceComponent,
-                                     BaseComponentInfo])
+
+def get_keyword_classes():
+    """Return the classes of KEYWORD_CLASSES."""
+    return [
+        getattr(importlib.import_module(module), name)
+        for module, name in KEYWORD_CLASSES]
+
+
+def build_keyword_owners(klasses=None):
+    """Return (keywords, owners) computed from KEYWORD_CLASSES.
+
+    keywords is the set of callable attribute names of the classes. owners
+    maps each attribute name of the classes to the names of the classes
+    having it, in KEYWORD_CLASSES order.
+
+    """
+    klasses = klasses or get_keyword_classes()
+
+    owners = {}
+    for klass in klasses:
+        for attribute in dir(klass):
+            owners.setdefault(attribute, []).append(klass.__name__)
+
+    return getZenossKeywords(klasses), owners
+
+
+_keyword_owners = None
+
+
+def get_keyword_owners():
+    """Return (keywords, owners) for this platform. See build_keyword_owners.
+
+    The data is built on first use and kept for the life of the process.
+    Importing zenpacklib doesn't require it, only validating YAML does.
+
+    """
+    global _keyword_owners
+    if _keyword_owners is None:
+        _keyword_owners = build_keyword_owners()
+
+    return _keyword_owners
+
+
+class ZenossKeywords(collections.Set):
+    """Set of reserved Zenoss keywords, loaded on first use."""
+
+    def __contains__(self, keyword):
+        return keyword in get_keyword_owners()[0]
+
+    def __iter__(self):
+        return iter(get_keyword_owners()[0])
+
+    def __len__(self):
+        return len(get_keyword_owners()[0])
+
+    def union(self, *others):
+        return get_keyword_owners()[0].union(*others)
+
+
+ZENOSS_KEYWORDS = ZenossKeywords()
 
 JS_WORDS = set(['uuid', 'uid', 'meta_type', 'monitor', 'severity', 'monitored', 'locking'])
 
 
 def find_keyword_cls(keyword):
-    names = []
-    for k in [BaseDevice, BaseDeviceComponent, BaseDeviceInfo, BaseComponentInfo]:
-        if keyword in dir(k):
-            names.append(k.__name__)
-    return names
+    return list(get_keyword_owners()[1].get(keyword, ()))
 
 
 def relname_from_classname(classname, plural=False):
@@ -115,6 +170,9 @@ def catalog_search(scope, name, *args, **kwargs):
         DEFAULTLOG.debug("Catalog {}Search not found at {}.  It should be created when the first included component is indexed".format(name, scope))
         return []
 
+    # Searches must see writes still waiting in the indexing queue.
+    IndexingQueue.flush_catalog(catalog)
+
     if args:
         if isinstance(args[0], BaseQuery):
             return catalog.evalAdvancedQuery(args[0])
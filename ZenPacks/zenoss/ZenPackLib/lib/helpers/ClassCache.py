@@ -0,0 +1,331 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Generated modules caching the attributes of ClassSpec classes.
+
+When enabled by setting the ZPL_CLASS_CACHE environment variable, the
+attributes ClassSpec builds for the model, info interface, info and
+formbuilder classes are written to a Python module in
+$ZENHOME/var/zenpacklib/classcache along with the hash of the spec they
+were built from. Later loads import that module and call its functions
+for the attributes, instead of building them from the specs, as long as
+the hash matches.
+
+Objects returned by factories, such as the properties returned by the
+factories in Spec, are written out as a call to the factory. They must
+be created with source_call, or by a factory decorated with
+source_factory, for the call to be known.
+
+"""
+
+import functools
+import imp
+import importlib
+import inspect
+import math
+import os
+import sys
+from collections import OrderedDict
+
+from zope.i18nmessageid import Message
+from Products.ZenRelations.RelSchema import RelSchema
+from Products.Zuul.infos import ProxyProperty
+
+from .ZenPackLibLog import DEFAULTLOG
+
+# prefix of generated module names
+CLASS_CACHE_MODULE = 'zpl_class_cache'
+
+# attribute holding (factory, args, kwargs) of the call that created an object
+SOURCE_ATTRIBUTE = '_zpl_source'
+
+# ClassSpec attribute kinds in the order they're written
+CLASS_CACHE_KINDS = ('model', 'iinfo', 'info', 'formbuilder')
+
+
+class SourceError(Exception):
+    """Raised for values that can't be written as Python source."""
+
+
+def class_cache_enabled():
+    """Return True if the class cache is enabled."""
+    return bool(os.environ.get('ZPL_CLASS_CACHE'))
+
+
+def import_symbol(module, name):
+    """Return name from module. Used by generated modules."""
+    return getattr(importlib.import_module(module), name)
+
+
+def tag_source(obj, factory, args=(), kwargs=None):
+    """Record that obj was returned by factory(*args, **kwargs) and return it.
+
+    The call of a property is recorded on its getter.
+
+    """
+    target = obj.fget if isinstance(obj, property) else obj
+    try:
+        setattr(target, SOURCE_ATTRIBUTE, (factory, tuple(args), kwargs or {}))
+    except (AttributeError, TypeError):
+        pass
+
+    return obj
+
+
+def get_source_call(obj):
+    """Return (factory, args, kwargs) recorded for obj or None."""
+    target = obj.fget if isinstance(obj, property) else obj
+    return getattr(target, SOURCE_ATTRIBUTE, None)
+
+
+def source_call(factory, *args, **kwargs):
+    """Return factory(*args, **kwargs) tagged with the call."""
+    return tag_source(factory(*args, **kwargs), factory, args, kwargs)
+
+
+def source_factory(func):
+    """Decorate func to tag the objects it returns with their call."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return tag_source(func(*args, **kwargs), wrapper, args, kwargs)
+
+    return wrapper
+
+
+class SourceWriter(object):
+    """Write values as Python expressions.
+
+    Classes and functions are referenced by aliases bound at the top of
+    the generated module. They're collected in symbols as values are
+    written.
+
+    """
+
+    def __init__(self):
+        # (module, name) -> alias
+        self.symbols = OrderedDict()
+
+    def symbol(self, obj):
+        """Return expression for an importable class, function or classmethod."""
+        if inspect.ismethod(obj) and inspect.isclass(obj.im_self):
+            return '{}.{}'.format(self.symbol(obj.im_self), obj.__name__)
+
+        module = getattr(obj, '__module__', None)
+        name = getattr(obj, '__name__', None)
+        if not module or not name or \
+                getattr(sys.modules.get(module), name, None) is not obj:
+            raise SourceError("{!r} can't be imported".format(obj))
+
+        alias = self.symbols.get((module, name))
+        if alias is None:
+            alias = self.symbols[(module, name)] = '_{}_{}'.format(
+                name, len(self.symbols))
+
+        return alias
+
+    def call(self, factory, args=(), kwargs=None):
+        """Return expression calling factory."""
+        arguments = [self.value(x) for x in args]
+        arguments.extend(
+            '{}={}'.format(k, self.value(v))
+            for k, v in sorted((kwargs or {}).items()))
+
+        return '{}({})'.format(self.symbol(factory), ', '.join(arguments))
+
+    def value(self, value):
+        """Return expression for value."""
+        source = get_source_call(value)
+        if source:
+            return self.call(*source)
+
+        # Message is a unicode subclass carrying its translation domain.
+        if isinstance(value, Message):
+            return self.call(Message, (unicode(value),), {
+                'domain': value.domain,
+                'default': value.default,
+                'mapping': value.mapping})
+
+        if value is None or type(value) in (bool, int, long, str, unicode):
+            return repr(value)
+
+        if type(value) is float:
+            if math.isnan(value) or math.isinf(value):
+                return "float('{!r}')".format(value)
+            return repr(value)
+
+        if type(value) is tuple:
+            if len(value) == 1:
+                return '({},)'.format(self.value(value[0]))
+            return '({})'.format(', '.join(self.value(x) for x in value))
+
+        if type(value) is list:
+            return '[{}]'.format(', '.join(self.value(x) for x in value))
+
+        if type(value) is OrderedDict:
+            return self.call(OrderedDict, (value.items(),))
+
+        if type(value) is dict:
+            return '{{{}}}'.format(', '.join(
+                '{}: {}'.format(self.value(k), self.value(v))
+                for k, v in sorted(value.items())))
+
+        if isinstance(value, ProxyProperty):
+            return self.call(type(value), (value.propertyName,))
+
+        if isinstance(value, RelSchema):
+            return self.call(
+                type(value),
+                (value.remoteType, value.remoteClass, value.remoteName))
+
+        if inspect.isclass(value) or inspect.isfunction(value):
+            return self.symbol(value)
+
+        raise SourceError("{!r} has no known source".format(value))
+
+
+def render_class_cache(spec_hash, attributes):
+    """Return source of a class cache module.
+
+    attributes is a {classname: {kind: attribute dict}} mapping. The
+    module has a function returning each attribute dict, and an ATTRIBUTES
+    mapping of the same shape with those functions as values. Attribute
+    dicts that can't be written are skipped and logged.
+
+    """
+    writer = SourceWriter()
+    functions = []
+    mapping = OrderedDict()
+
+    for classname, kinds in attributes.iteritems():
+        for kind, class_attributes in kinds.iteritems():
+            try:
+                items = [
+                    '        {!r}: {},'.format(k, writer.value(v))
+                    for k, v in sorted(class_attributes.items())]
+            except SourceError as e:
+                DEFAULTLOG.debug(
+                    "Not caching {} {} attributes: {}".format(classname, kind, e))
+                continue
+
+            function_name = '_{}_{}'.format(classname, kind)
+            functions.append('def {}():\n    return {{\n{}\n    }}\n'.format(
+                function_name, '\n'.join(items)))
+            mapping.setdefault(classname, []).append((kind, function_name))
+
+    lines = [
+        '# Generated by zenpacklib from the ZenPack\'s YAML. Do not edit.',
+        '# It is written again whenever the YAML changes.',
+        'from ZenPacks.zenoss.ZenPackLib.lib.helpers.ClassCache import import_symbol',
+        '',
+        'SPEC_HASH = {!r}'.format(spec_hash),
+        '',
+    ]
+
+    for (module, name), alias in writer.symbols.iteritems():
+        lines.append('{} = import_symbol({!r}, {!r})'.format(alias, module, name))
+
+    lines.append('\n')
+    lines.append('\n\n'.join(functions))
+    lines.append('\nATTRIBUTES = {')
+    for classname, kinds in mapping.iteritems():
+        lines.append('    {!r}: {{'.format(classname))
+        for kind, function_name in kinds:
+            lines.append('        {!r}: {},'.format(kind, function_name))
+        lines.append('    },')
+    lines.append('}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def get_class_cache_path(zenpack_name, directory=None):
+    """Return path of the ZenPack's class cache module.
+
+    The module is in $ZENHOME/var/zenpacklib/classcache unless another
+    directory is given.
+
+    """
+    if directory is None:
+        from Products.ZenUtils.Utils import zenPath
+        directory = zenPath('var', 'zenpacklib', 'classcache')
+
+    return os.path.join(directory, '{}.py'.format(zenpack_name))
+
+
+def update_source_digest(digest, classes):
+    """Update digest with the source files of classes and their bases.
+
+    Files are identified by their path, size and modification time.
+
+    """
+    paths = set()
+    for kls in classes:
+        for base in inspect.getmro(kls):
+            module = sys.modules.get(getattr(base, '__module__', None))
+            path = getattr(module, '__file__', None)
+            if path:
+                if path.endswith(('.pyc', '.pyo')):
+                    path = path[:-1]
+                paths.add(path)
+
+    for path in sorted(paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+
+        digest.update('\0{}\0{}\0{}'.format(path, stat.st_size, stat.st_mtime))
+
+
+def load_class_cache(path, spec_hash):
+    """Return ATTRIBUTES of the class cache module at path.
+
+    Returns None if there is no module or if it wasn't generated from a
+    spec with spec_hash.
+
+    """
+    if not os.path.isfile(path):
+        return None
+
+    module_name = '{}_{}'.format(
+        CLASS_CACHE_MODULE,
+        os.path.splitext(os.path.basename(path))[0].replace('.', '_'))
+    try:
+        module = imp.load_source(module_name, path)
+    except Exception as e:
+        DEFAULTLOG.debug("Ignoring unloadable class cache {}: {}".format(path, e))
+        return None
+
+    if getattr(module, 'SPEC_HASH', None) != spec_hash:
+        DEFAULTLOG.debug("Ignoring outdated class cache {}".format(path))
+        return None
+
+    return getattr(module, 'ATTRIBUTES', None)
+
+
+def write_class_cache(path, spec_hash, attributes):
+    """Write class cache module to path. Failures are only logged."""
+    tmp_path = '{}.{}'.format(path, os.getpid())
+    try:
+        source = render_class_cache(spec_hash, attributes)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(tmp_path, 'w') as f:
+            f.write(source)
+        os.rename(tmp_path, path)
+
+        # Don't let a stale compiled module shadow the new source.
+        for compiled in (path + 'c', path + 'o'):
+            if os.path.exists(compiled):
+                os.remove(compiled)
+    except Exception as e:
+        DEFAULTLOG.debug("Unable to write class cache {}: {}".format(path, e))
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
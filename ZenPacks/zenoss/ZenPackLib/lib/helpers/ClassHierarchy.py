@@ -0,0 +1,174 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+
+class ClassHierarchy(object):
+    """Inheritance index of a ZenPack's ClassSpecs.
+
+    The index is built from the bases of each ClassSpec. Only bases that
+    are classes of the same ZenPack are part of it. Bases given as types,
+    such as zenpacklib.Component, are left out.
+
+    Ancestors, descendants and MROs are computed once per class. Merged
+    property and relationship maps are rebuilt when the properties or
+    relationships dict of the class or any ancestor is replaced, and after
+    invalidate() is called. invalidate() must be called when those dicts
+    are changed in place. ZenPackSpec.create() calls it.
+
+    """
+
+    def __init__(self, classes):
+        self.classes = classes
+        self.size = len(classes)
+
+        # name -> position in classes, to return names in classes order
+        self.positions = dict((name, i) for i, name in enumerate(classes))
+
+        # name -> names of direct bases and subclasses
+        self.bases = {}
+        self.children = dict((name, []) for name in classes)
+        for name, spec in classes.iteritems():
+            self.bases[name] = tuple(
+                x for x in spec.bases
+                if not isinstance(x, type) and x in classes)
+
+            for base in self.bases[name]:
+                if name not in self.children[base]:
+                    self.children[base].append(name)
+
+        self._ancestors = {}
+        self._descendants = {}
+        self._mro = {}
+        self._properties = {}
+        self._relationships = {}
+
+    def is_current(self, classes):
+        """Return True if this index was built for classes."""
+        return classes is self.classes and len(classes) == self.size
+
+    def invalidate(self):
+        """Forget merged property and relationship maps."""
+        self._properties.clear()
+        self._relationships.clear()
+
+    def ordered(self, names):
+        """Return names in the order of classes."""
+        return sorted(names, key=self.positions.get)
+
+    def ancestors(self, name):
+        """Return list of ancestor names in order of nearest proximity.
+
+        Bases come before their own bases, depth first, and each ancestor
+        is listed only once.
+
+        """
+        ancestors = self._ancestors.get(name)
+        if ancestors is None:
+            # Guard against cyclic bases while this class is in progress.
+            self._ancestors[name] = []
+
+            ancestors, seen = [], set([name])
+            for base in self.bases.get(name, ()):
+                for ancestor in [base] + self.ancestors(base):
+                    if ancestor not in seen:
+                        seen.add(ancestor)
+                        ancestors.append(ancestor)
+
+            self._ancestors[name] = ancestors
+
+        return ancestors
+
+    def descendants(self, name):
+        """Return list of all direct and indirect subclass names."""
+        descendants = self._descendants.get(name)
+        if descendants is None:
+            found, pending = set(), list(self.children.get(name, ()))
+            while pending:
+                child = pending.pop()
+                if child not in found and child != name:
+                    found.add(child)
+                    pending.extend(self.children[child])
+
+            descendants = self._descendants[name] = self.ordered(found)
+
+        return descendants
+
+    def mro(self, name):
+        """Return C3 linearization of name and its ancestors.
+
+        Falls back to name followed by its ancestors in order of nearest
+        proximity if the bases can't be linearized.
+
+        """
+        mro = self._mro.get(name)
+        if mro is None:
+            self._mro[name] = [name] + self.ancestors(name)
+
+            sequences = [list(self.mro(x)) for x in self.bases.get(name, ())]
+            sequences.append(list(self.bases.get(name, ())))
+            mro = [name]
+            while True:
+                sequences = [x for x in sequences if x]
+                if not sequences:
+                    break
+
+                for sequence in sequences:
+                    head = sequence[0]
+                    if not any(head in x[1:] for x in sequences):
+                        break
+                else:
+                    mro = [name] + self.ancestors(name)
+                    break
+
+                mro.append(head)
+                for sequence in sequences:
+                    if sequence[0] == head:
+                        del sequence[0]
+
+            self._mro[name] = mro
+
+        return mro
+
+    def inherited_properties(self, name):
+        """Return {name: ClassPropertySpec} of class and its ancestors.
+
+        Properties of later bases override those of earlier bases, and the
+        class' own properties override all of them. The returned dict is
+        shared and must not be modified.
+
+        """
+        return self.get_inherited(name, 'properties', self._properties)
+
+    def inherited_relationships(self, name):
+        """Return {name: ClassRelationshipSpec} of class and its ancestors.
+
+        Merged like inherited_properties.
+
+        """
+        return self.get_inherited(name, 'relationships', self._relationships)
+
+    def get_inherited(self, name, attribute, cache):
+        sources = [
+            getattr(self.classes[x], attribute)
+            for x in [name] + self.ancestors(name)]
+
+        merged, cached_sources = cache.get(name, (None, ()))
+        if len(sources) != len(cached_sources) or \
+                any(x is not y for x, y in zip(sources, cached_sources)):
+            # Guard against cyclic bases while this class is in progress.
+            cache[name] = ({}, sources)
+
+            merged = {}
+            for base in self.bases.get(name, ()):
+                merged.update(self.get_inherited(base, attribute, cache))
+
+            merged.update(sources[0])
+            cache[name] = (merged, sources)
+
+        return merged
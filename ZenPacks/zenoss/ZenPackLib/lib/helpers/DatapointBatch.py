@@ -0,0 +1,273 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Batched fetching of datapoint-backed property values.
+
+Methods generated for properties with a datapoint look up the value of
+that datapoint for a single object. Listing a page of components would
+make one metric request per component and property. prefetch_datapoints
+instead fetches the datapoints of a whole page with one request to a
+DatapointBackend, and keeps the values for the rest of the current
+transaction, which is the current request, for the generated methods to
+read.
+
+When enabled by setting the ZPL_DATAPOINT_BATCH environment variable,
+pages of components listed by DeviceFacade are prefetched this way.
+
+"""
+
+import os
+import threading
+import time
+import weakref
+
+import transaction
+from Acquisition import aq_base
+
+from .ZenPackLibLog import DEFAULTLOG
+from ..utils import has_metricfacade
+
+# returned by DatapointCache.get for values that weren't prefetched
+MISSING = object()
+
+
+class DatapointBackend(object):
+    """Source of latest datapoint values for many objects at once."""
+
+    def fetch(self, objects, datapoints):
+        """Return {primary id: {datapoint: value}} for objects."""
+        raise NotImplementedError
+
+
+class MetricFacadeBackend(DatapointBackend):
+    """Fetch values with a single metric service query."""
+
+    def fetch(self, objects, datapoints):
+        from Products.Zuul import getFacade
+
+        keys = dict((x.getResourceKey(), x.getPrimaryId()) for x in objects)
+        facade = getFacade('metric', objects[0].getDmd())
+        results = facade.getMultiValues(
+            list(objects), list(datapoints), returnSet="LAST")
+
+        return dict(
+            (keys[key], values)
+            for key, values in results.iteritems()
+            if key in keys)
+
+
+class RRDBackend(DatapointBackend):
+    """Fetch values with one RRD query per object.
+
+    Used when the metric facade isn't available. All datapoints of an
+    object are still fetched together.
+
+    """
+
+    def fetch(self, objects, datapoints):
+        results = {}
+        start = time.time() - 1800
+        for obj in objects:
+            try:
+                results[obj.getPrimaryId()] = obj.getRRDValues(
+                    list(datapoints), start=start)
+            except Exception as e:
+                DEFAULTLOG.debug(
+                    "Unable to fetch datapoints for {}: {}".format(
+                        obj.getPrimaryId(), e))
+
+        return results
+
+
+class LocalDatapointBackend(DatapointBackend):
+    """In-memory stand-in for the metric service.
+
+    Values are set with set_value. Each fetch is counted in requests, and
+    takes latency seconds to simulate the round trip to a metric service.
+
+    """
+
+    def __init__(self, latency=0):
+        self.values = {}
+        self.requests = 0
+        self.latency = latency
+
+    def set_value(self, obj, datapoint, value):
+        self.values.setdefault(obj.getPrimaryId(), {})[datapoint] = value
+
+    def fetch(self, objects, datapoints):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        results = {}
+        for obj in objects:
+            values = self.values.get(obj.getPrimaryId(), {})
+            results[obj.getPrimaryId()] = dict(
+                (x, values[x]) for x in datapoints if x in values)
+
+        return results
+
+
+class DatapointCache(threading.local):
+    """Prefetched datapoint values of the current thread's transaction.
+
+    Each request has its own transaction, so values are only used by the
+    request that fetched them.
+
+    """
+
+    def __init__(self):
+        # weak reference to the transaction entries were stored in
+        self.transaction = None
+        # primary id -> {datapoint: value}
+        self.entries = {}
+
+    def current(self):
+        """Return entries of the current transaction."""
+        txn = transaction.get()
+        if self.transaction is None or self.transaction() is not txn:
+            self.transaction = weakref.ref(txn)
+            self.entries = {}
+
+        return self.entries
+
+    def update(self, results, datapoints):
+        """Store fetched results. Datapoints without a value are stored as None."""
+        entries = self.current()
+        for key, values in results.iteritems():
+            entries[key] = dict((x, values.get(x)) for x in datapoints)
+
+    def get(self, obj, datapoint):
+        """Return prefetched value of datapoint for obj or MISSING."""
+        if not self.entries:
+            return MISSING
+
+        entry = self.current().get(obj.getPrimaryId())
+        if entry is None:
+            return MISSING
+
+        return entry.get(datapoint, MISSING)
+
+    def clear(self):
+        self.transaction = None
+        self.entries = {}
+
+
+DATAPOINT_CACHE = DatapointCache()
+
+_backend = None
+
+
+def get_datapoint_backend():
+    """Return DatapointBackend used by prefetch_datapoints."""
+    global _backend
+    if _backend is None:
+        _backend = MetricFacadeBackend() if has_metricfacade() else RRDBackend()
+    return _backend
+
+
+def set_datapoint_backend(backend):
+    """Use backend for prefetch_datapoints. None restores the default."""
+    global _backend
+    _backend = backend
+
+
+def datapoint_batch_enabled():
+    """Return True if DeviceFacade pages are prefetched."""
+    return bool(os.environ.get('ZPL_DATAPOINT_BATCH'))
+
+
+def fetch_datapoints(objects, datapoints):
+    """Return {primary id: {datapoint: value}} fetched with one backend request.
+
+    The values are also kept for the methods generated for datapoint
+    properties to read. Returns None if the values couldn't be fetched.
+
+    """
+    objects = list(objects)
+    datapoints = sorted(set(datapoints))
+    if not objects or not datapoints:
+        return {}
+
+    try:
+        results = get_datapoint_backend().fetch(objects, datapoints)
+    except Exception as e:
+        DEFAULTLOG.debug("Unable to prefetch datapoints: {}".format(e))
+        return None
+
+    DATAPOINT_CACHE.update(results, datapoints)
+    return results
+
+
+def prefetch_datapoints(objects, datapoints):
+    """Fetch datapoints for all objects with one backend request.
+
+    The values are read by the methods generated for datapoint properties
+    for the rest of the current transaction. Returns False if the values
+    couldn't be fetched.
+
+    """
+    return fetch_datapoints(objects, datapoints) is not None
+
+
+def patch_bulk_metric_loading():
+    """Prefetch datapoints of pages with zenpacklib objects listed by DeviceFacade.
+
+    Only patches DeviceFacade.bulkLoadMetricData if enabled. It's called
+    with the infos of each page of components. If the page has zenpacklib
+    objects, the datapoints of all of its infos are fetched with one
+    request. They're set as the infos' bulk-loaded properties as the
+    original method would, and kept for datapoint properties to read.
+    Other pages, and pages that couldn't be fetched, are passed on to the
+    original method.
+
+    """
+    if not datapoint_batch_enabled():
+        return
+
+    try:
+        from Products.Zuul.facades.devicefacade import DeviceFacade
+    except ImportError:
+        return
+
+    original = getattr(DeviceFacade, 'bulkLoadMetricData', None)
+    if original is None or getattr(original, 'zpl_batched', False):
+        return
+
+    from ..base.ModelBase import ModelBase
+
+    def bulkLoadMetricData(self, infos):
+        by_id, datapoints, batched = {}, set(), False
+        for info in infos:
+            obj = getattr(info, '_object', None)
+            if obj is None:
+                return original(self, infos)
+
+            by_id[obj.getPrimaryId()] = info
+            datapoints.update(getattr(info, 'dataPointsToFetch', None) or ())
+            batched = batched or isinstance(aq_base(obj), ModelBase)
+
+        if not batched:
+            return original(self, infos)
+
+        results = fetch_datapoints([x._object for x in infos], datapoints)
+        if results is None:
+            return original(self, infos)
+
+        for key, values in results.iteritems():
+            info = by_id.get(key)
+            if info is None or not hasattr(info, 'setBulkLoadProperty'):
+                continue
+            for datapoint, value in values.iteritems():
+                info.setBulkLoadProperty(datapoint, value)
+
+    bulkLoadMetricData.zpl_batched = True
+    bulkLoadMetricData.zpl_original = original
+    DeviceFacade.bulkLoadMetricData = bulkLoadMetricData
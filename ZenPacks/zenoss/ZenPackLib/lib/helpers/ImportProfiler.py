@@ -0,0 +1,112 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Per-module import time profiler.
+
+Run as a script with the name of the module to import. The profile must
+be taken in a fresh process, so this module only uses the standard library.
+
+    python ImportProfiler.py ZenPacks.zenoss.ZenPackLib.zenpacklib
+
+"""
+
+import __builtin__
+import importlib
+import os
+import sys
+import time
+
+
+class ImportProfiler(object):
+    """Record the time taken by each import that loads new modules.
+
+    For each such import the cumulative time and the time spent in the
+    module itself, excluding nested imports, are recorded.
+
+    """
+
+    def __init__(self):
+        self.timings = []
+        self.stack = []
+        self.original_import = None
+
+    def install(self):
+        self.original_import = __builtin__.__import__
+        __builtin__.__import__ = self.profiled_import
+
+    def uninstall(self):
+        __builtin__.__import__ = self.original_import
+
+    def profiled_import(self, name, globals=None, locals=None, fromlist=None, level=-1):
+        modules = len(sys.modules)
+        nested = [0.0]
+        self.stack.append(nested)
+        start = time.time()
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.time() - start
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1][0] += elapsed
+
+            if len(sys.modules) > modules:
+                self.timings.append((
+                    self.get_module_name(name, globals),
+                    elapsed,
+                    elapsed - nested[0]))
+
+    def get_module_name(self, name, globals):
+        """Return absolute name of imported module if it can be determined."""
+        package = (globals or {}).get('__package__') or \
+            (globals or {}).get('__name__', '').rpartition('.')[0]
+
+        if package:
+            relative = '{}.{}'.format(package, name) if name else package
+            if sys.modules.get(relative) is not None:
+                return relative
+
+        return name
+
+    def report(self, limit=30, stream=None):
+        """Write the slowest imports by their own time to stream."""
+        stream = stream or sys.stdout
+        total = sum(x[2] for x in self.timings)
+
+        stream.write("{:>10} {:>10}  {}\n".format("self (ms)", "cum. (ms)", "module"))
+        for name, cumulative, own in sorted(
+                self.timings, key=lambda x: x[2], reverse=True)[:limit]:
+            stream.write("{:10.1f} {:10.1f}  {}\n".format(
+                own * 1000, cumulative * 1000, name))
+
+        stream.write("{:10.1f} {:>10}  total ({} imports)\n".format(
+            total * 1000, "", len(self.timings)))
+
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else args
+    if not args:
+        sys.exit("usage: {} MODULE [LIMIT]".format(os.path.basename(__file__)))
+
+    # Running as a script puts this directory first on sys.path.
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [x for x in sys.path if os.path.abspath(x or '.') != here]
+
+    profiler = ImportProfiler()
+    profiler.install()
+    try:
+        importlib.import_module(args[0])
+    finally:
+        profiler.uninstall()
+
+    profiler.report(limit=int(args[1]) if len(args) > 1 else 30)
+
+
+if __name__ == '__main__':
+    main()
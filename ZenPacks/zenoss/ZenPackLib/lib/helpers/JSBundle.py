@@ -0,0 +1,209 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Static bundles of the JavaScript generated for a ZenPack.
+
+When enabled by setting the ZPL_JS_BUNDLE environment variable, the
+global and device JavaScript snippets ZenPackSpec generates are written
+once to files named by the hash of their contents, in
+$ZENHOME/var/zenpacklib/js/<ZenPack>. A manifest records the hash of the
+spec they were generated from. Later loads use the files named in the
+manifest, without generating the snippets, as long as the hash matches.
+If the files can't be written the inline snippets are used as before.
+
+The files are served by JSBundleView rather than inline with each page.
+Their names change whenever their contents do, so it tells browsers to
+cache them for a year.
+
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+from email.utils import formatdate
+
+from Products.Five.browser import BrowserView
+from zExceptions import NotFound
+
+from .ZenPackLibLog import DEFAULTLOG
+
+# name of manifest within a ZenPack's bundle directory
+JS_BUNDLE_MANIFEST = 'manifest.json'
+
+# bundle names in the order they're loaded
+JS_BUNDLE_NAMES = ('global', 'device')
+
+# IJavaScriptSrcManager viewlet weights of bundles. The generated code
+# extends Zenoss.component classes, so bundles must load after the
+# platform's own JavaScript, which ZenUI3 registers at lower weights. They
+# load before the ZenPack's own global.js (20), device.js (21), and
+# device class specific JavaScript (22), which may use what they define.
+JS_BUNDLE_WEIGHTS = {'global': 18, 'device': 19}
+
+# seconds browsers may cache bundles for
+JS_BUNDLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# {filename: path} of bundles served by JSBundleView
+JS_BUNDLE_PATHS = {}
+
+
+def js_bundle_enabled():
+    """Return True if JavaScript bundles are enabled."""
+    return bool(os.environ.get('ZPL_JS_BUNDLE'))
+
+
+def get_js_bundle_path(zenpack_name, directory=None):
+    """Return path of the ZenPack's bundle directory.
+
+    The directory is in $ZENHOME/var/zenpacklib/js unless another
+    directory is given.
+
+    """
+    if directory is None:
+        from Products.ZenUtils.Utils import zenPath
+        directory = zenPath('var', 'zenpacklib', 'js')
+
+    return os.path.join(directory, zenpack_name)
+
+
+def get_js_bundle_filename(name, snippet):
+    """Return content-hashed filename of bundle name containing snippet."""
+    return 'zpl-{}-{}.js'.format(
+        name, hashlib.sha1(snippet).hexdigest()[:16])
+
+
+def load_js_bundle(path, spec_hash):
+    """Return {name: filename} of the bundles in path.
+
+    Returns None if there is no manifest, if it wasn't written for a spec
+    with spec_hash, or if any of the bundles it names is missing. The
+    filename is None for bundles that were empty.
+
+    """
+    manifest_path = os.path.join(path, JS_BUNDLE_MANIFEST)
+    try:
+        with open(manifest_path, 'rb') as f:
+            manifest = json.load(f)
+    except IOError:
+        return None
+    except Exception as e:
+        DEFAULTLOG.debug("Ignoring unreadable JavaScript bundle manifest {}: {}".format(
+            manifest_path, e))
+        return None
+
+    if manifest.get('spec_hash') != spec_hash:
+        DEFAULTLOG.debug("Ignoring outdated JavaScript bundles in {}".format(path))
+        return None
+
+    bundles = manifest.get('bundles') or {}
+    for filename in bundles.itervalues():
+        if filename and not os.path.isfile(os.path.join(path, filename)):
+            DEFAULTLOG.debug("Ignoring incomplete JavaScript bundles in {}".format(path))
+            return None
+
+    return dict((str(k), v and str(v)) for k, v in bundles.iteritems())
+
+
+def write_js_bundle(path, spec_hash, snippets):
+    """Write {name: snippet} bundles and their manifest to path.
+
+    Return {name: filename} of the written bundles, or None if they
+    couldn't be written. Failures are only logged. Bundles no longer
+    named by the manifest are removed.
+
+    """
+    bundles = {}
+    tmp_paths = []
+    try:
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        for name, snippet in snippets.iteritems():
+            if not snippet:
+                bundles[name] = None
+                continue
+
+            if isinstance(snippet, unicode):
+                snippet = snippet.encode('utf-8')
+
+            filename = get_js_bundle_filename(name, snippet)
+            bundles[name] = filename
+            tmp_paths.append(write_file(
+                os.path.join(path, filename), snippet))
+
+        tmp_paths.append(write_file(
+            os.path.join(path, JS_BUNDLE_MANIFEST),
+            json.dumps({'spec_hash': spec_hash, 'bundles': bundles}, sort_keys=True)))
+    except Exception as e:
+        DEFAULTLOG.debug("Unable to write JavaScript bundles to {}: {}".format(path, e))
+        for tmp_path in tmp_paths:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+        return None
+
+    # The manifest is renamed last so it never names a missing bundle.
+    for tmp_path in tmp_paths:
+        os.rename(tmp_path, tmp_path.rsplit('.', 1)[0])
+
+    current = set(x for x in bundles.itervalues() if x)
+    for old_path in glob.glob(os.path.join(path, 'zpl-*.js')):
+        if os.path.basename(old_path) not in current:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    return bundles
+
+
+def write_file(path, data):
+    """Write data to a temporary file next to path and return its path."""
+    tmp_path = '{}.{}'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+
+    return tmp_path
+
+
+def register_js_bundle(path, filename):
+    """Serve bundle filename in path by JSBundleView."""
+    JS_BUNDLE_PATHS[filename] = os.path.join(path, filename)
+
+
+class JSBundleView(BrowserView):
+    """Serve the JavaScript bundle named by the view's name.
+
+    Registered once for each bundle, as a view named by its filename.
+
+    """
+
+    def __call__(self):
+        path = JS_BUNDLE_PATHS.get(self.__name__)
+        if not path:
+            raise NotFound(self.__name__)
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except IOError:
+            raise NotFound(self.__name__)
+
+        response = self.request.response
+        response.setHeader('Content-Type', 'application/javascript; charset=utf-8')
+        response.setHeader(
+            'Cache-Control', 'public, max-age={}'.format(JS_BUNDLE_MAX_AGE))
+        response.setHeader(
+            'Expires', formatdate(time.time() + JS_BUNDLE_MAX_AGE, usegmt=True))
+
+        return data
@@ -0,0 +1,62 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+import re
+
+
+class PathPatternStreams(list):
+    """List of compiled extra_paths pattern streams.
+
+    Each stream is a list of regular expressions as built by ClassSpec.
+    Whether traversal continues along a relationship path only depends on
+    the path and the stream, so the outcome of matching a path against the
+    streams is computed once per path and remembered. This turns the
+    streams into a lazily built automaton whose transitions are keyed on
+    relationship path, and get_facets only follows the edges it allows.
+
+    """
+
+    def __init__(self, streams=()):
+        super(PathPatternStreams, self).__init__(streams)
+        self._transitions = {}
+        self._singles = None
+
+    @classmethod
+    def from_extra_paths(cls, extra_paths):
+        """Return PathPatternStreams compiled from extra_paths tuples."""
+        streams = cls()
+        for pattern_tuple in extra_paths:
+            pattern_stream = []
+            for i, _ in enumerate(pattern_tuple, start=1):
+                pattern = "^" + "/".join(pattern_tuple[0:i])
+                # If we match these patterns, keep going.
+                pattern_stream.append(re.compile(pattern))
+            if pattern_stream:
+                # indicate that we've hit the end of the path.
+                pattern_stream.append(re.compile("/?$"))
+
+            streams.append(pattern_stream)
+
+        return streams
+
+    def follow(self, relpath):
+        """Return tuple of single-stream PathPatternStreams matching relpath.
+
+        Traversal continues along relpath once for each returned stream.
+
+        """
+        transition = self._transitions.get(relpath)
+        if transition is None:
+            if self._singles is None:
+                self._singles = [PathPatternStreams([x]) for x in self]
+
+            transition = self._transitions[relpath] = tuple(
+                single for stream, single in zip(self, self._singles)
+                if any(pattern.match(relpath) for pattern in stream))
+
+        return transition
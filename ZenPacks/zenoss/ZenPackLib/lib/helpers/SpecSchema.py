@@ -0,0 +1,85 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+import re
+from collections import OrderedDict
+
+
+DICT_SPECS_PARAMETER = re.compile(r'^dict\(SpecsParameter\((.*)\)\)$')
+SPECS_PARAMETER = re.compile(r'^SpecsParameter\((.*)\)$')
+
+
+class SpecSchema(object):
+    """Parameter schema of a Spec class as used by the YAML loader.
+
+    Everything the loader needs to know about a Spec class' parameters is
+    derived from its init_params once, the first time the class is seen,
+    and shared by every node constructed afterwards.
+
+    """
+
+    _schemas = {}
+    _classes = {}
+
+    def __init__(self, spec_class):
+        self.spec_class = spec_class
+        self.params = spec_class.init_params
+
+        # YAML key -> parameter name
+        self.yaml_params = OrderedDict()
+
+        # Parameters of type ExtraParams
+        self.extra_params = []
+
+        # Parameter name -> spec type name of SpecsParameter parameters
+        self.specs_params = {}
+
+        # Parameter name -> spec type name of dict(SpecsParameter) parameters
+        self.dict_specs_params = {}
+
+        for key, attributes in self.params.items():
+            self.yaml_params[attributes.get('yaml_param')] = key
+
+            type_ = attributes.get('type') or ''
+            if type_ == 'ExtraParams':
+                self.extra_params.append(key)
+                continue
+
+            match = DICT_SPECS_PARAMETER.match(type_)
+            if match:
+                self.dict_specs_params[key] = match.group(1)
+                continue
+
+            match = SPECS_PARAMETER.match(type_)
+            if match:
+                self.specs_params[key] = match.group(1)
+
+    @classmethod
+    def get(cls, spec_class):
+        """Return SpecSchema for spec_class."""
+        schema = cls._schemas.get(spec_class)
+        if schema is None:
+            schema = cls._schemas[spec_class] = cls(spec_class)
+
+        return schema
+
+    @classmethod
+    def get_spec_class(cls, name):
+        """Return Spec subclass named name or None if there is none.
+
+        Spec subclasses defined after the last lookup are picked up by
+        looking through the subclasses again when name isn't known.
+
+        """
+        spec_class = cls._classes.get(name)
+        if spec_class is None:
+            from ..spec.Spec import Spec
+            cls._classes = {x.__name__: x for x in Spec.get_subclasses()}
+            spec_class = cls._classes.get(name)
+
+        return spec_class
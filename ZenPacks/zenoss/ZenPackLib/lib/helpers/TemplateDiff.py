@@ -0,0 +1,550 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Structural comparison of monitoring template specs with live templates.
+
+A template is unchanged when the parameters exported from it with
+RRDTemplateSpecParams.fromObject are the same as those that would be
+exported from a template newly created from its RRDTemplateSpec.
+ExpectedTemplate builds the latter without creating the template: every
+object RRDTemplateSpec.create would add is stood in for by a transient
+instance of its class that is never added to a container, the same kind
+of sample object fromObject compares against. The properties of each are
+set by the apply_to method of its spec, which the spec's create method
+uses too. Nothing is stored or catalogued.
+
+Both parameter trees are compared by a digest of their fields, in which
+nested parameters are included by their own digest. The YAML diff for the
+log is only rendered for templates that differ.
+
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+
+import yaml
+from Acquisition import aq_base
+
+from .Dumper import Dumper
+from ..spec.GraphPointSpec import GRAPHPOINT_TYPES
+from ..params.SpecParams import SpecParams
+from ..params.RRDTemplateSpecParams import RRDTemplateSpecParams
+from ..params.RRDThresholdSpecParams import RRDThresholdSpecParams
+from ..params.RRDDatasourceSpecParams import RRDDatasourceSpecParams
+from ..params.RRDDatapointSpecParams import RRDDatapointSpecParams
+from ..params.GraphDefinitionSpecParams import GraphDefinitionSpecParams
+from ..params.GraphPointSpecParams import GraphPointSpecParams
+
+
+def canonical(value):
+    """Return a hashable, order-stable form of a parameter value."""
+    if isinstance(value, SpecParams):
+        return param_digest(value)
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    if isinstance(value, OrderedDict):
+        return tuple((canonical(k), canonical(v)) for k, v in value.iteritems())
+    if isinstance(value, dict):
+        return tuple(sorted((canonical(k), canonical(v)) for k, v in value.iteritems()))
+    if isinstance(value, (list, tuple)):
+        return tuple(canonical(x) for x in value)
+    return value
+
+
+def param_fields(param):
+    """Return (name, value) of the exported fields of param."""
+    fields = [(x, getattr(param, x, None)) for x in param.init_params]
+    if isinstance(param, RRDDatapointSpecParams):
+        fields.append(('shorthand', param.shorthand))
+    return fields
+
+
+def param_digest(param):
+    """Return digest of param and its nested parameters."""
+    digest = getattr(param, '_digest', None)
+    if digest is None:
+        data = tuple((name, canonical(value)) for name, value in param_fields(param))
+        digest = hashlib.sha1(repr(data)).hexdigest()
+        param._digest = digest
+    return digest
+
+
+def spec_fingerprint(specparam):
+    """Return fingerprint of template spec parameters.
+
+    The zenpacklib version is included, as it decides what templates are
+    created from the same parameters.
+
+    """
+    from ZenPacks.zenoss.ZenPackLib import zenpacklib
+    digest = hashlib.sha1(zenpacklib.__version__)
+    digest.update(param_digest(specparam))
+    return digest.hexdigest()
+
+
+def contents_fingerprint(template):
+    """Return fingerprint of the parameters exported from template.
+
+    This exports every threshold, datasource, datapoint, graph and graph
+    point of template, so its cost grows with the size of the template.
+
+    """
+    return param_digest(RRDTemplateSpecParams.fromObject(template))
+
+
+def set_fingerprints(template, specparam):
+    """Record fingerprints of specparam and of template's contents on template."""
+    template.zpl_spec_fingerprint = spec_fingerprint(specparam)
+    template.zpl_contents_fingerprint = contents_fingerprint(template)
+
+
+def fingerprints_match(template, specparam):
+    """Return True if template was created from specparam and is unmodified.
+
+    The spec fingerprint is checked first, so templates whose spec changed
+    are told apart in constant time, without reading their contents.
+    Templates whose spec is unchanged are still exported once by
+    contents_fingerprint to detect edits made since they were installed.
+    That is O(size of the template). It's cheaper than the full compare,
+    which also builds the expected template and renders YAML.
+
+    ZODB offers no cheaper marker of a template's contents. Edits to a
+    datapoint or graph point only change that object's record, and the
+    serials of new and changed objects are only assigned once the
+    install's transaction commits.
+
+    """
+    stored_spec = getattr(aq_base(template), 'zpl_spec_fingerprint', None)
+    stored_contents = getattr(aq_base(template), 'zpl_contents_fingerprint', None)
+    if not stored_spec or not stored_contents:
+        return False
+    if stored_spec != spec_fingerprint(specparam):
+        return False
+    return stored_contents == contents_fingerprint(template)
+
+
+def yaml_diff(existing, expected):
+    """Return unified diff of the YAML of two parameter trees, or None."""
+    from ..base.ZenPack import ZenPack
+    return ZenPack.get_yaml_diff(
+        yaml.dump(existing, Dumper=Dumper),
+        yaml.dump(expected, Dumper=Dumper))
+
+
+def template_diff(template, spec):
+    """Return YAML diff between template and what spec would create, or None."""
+    existing = RRDTemplateSpecParams.fromObject(template)
+    expected = ExpectedTemplate(template, spec).params()
+    if param_digest(existing) == param_digest(expected):
+        return None
+
+    # Values that hash differently can still be the same YAML, such as
+    # str and unicode, so the YAML is what decides.
+    return yaml_diff(existing, expected)
+
+
+def adds_datapoints(datasource_class):
+    """Return True if datasource_class adds datapoints of its own."""
+    from Products.ZenModel.RRDDataSource import RRDDataSource
+    method = getattr(datasource_class, 'addDataPoints', None)
+    if method is None:
+        return False
+    base = getattr(RRDDataSource, 'addDataPoints', None)
+    return getattr(method, 'im_func', method) is not getattr(base, 'im_func', base)
+
+
+class ExpectedTemplate(object):
+    """Parameters of the template RRDTemplateSpec.create would create.
+
+    template is the live template being compared. It's only read: to find
+    the threshold and datasource classes available, and for values that
+    Zenoss assigns itself rather than the spec:
+
+    - threshold graph points added by includeThresholds, of which only
+      presence, legend and color are compared, and the graph point
+      sequences of their graphs.
+    - datapoints added by datasource types that add their own.
+
+    The transient objects are kept in objects, keyed by relationship name
+    and id, with datapoints keyed by datasource id too, and the template
+    itself by 'template'.
+
+    """
+
+    def __init__(self, template, spec):
+        self.template = template
+        self.spec = spec
+        self.objects = {}
+
+    def params(self):
+        """Return RRDTemplateSpecParams as exported from the new template."""
+        spec = self.spec
+        template = aq_base(self.template).__class__(self.template.id)
+        spec.apply_to(template)
+        self.objects['template'] = template
+
+        params = RRDTemplateSpecParams.fromObject(template)
+        params.thresholds = self.thresholds()
+        params.datasources = self.datasources()
+        params.graphs = self.graphs(params.thresholds)
+        return params
+
+    def live(self, relname, id):
+        """Return live object id in relationship relname of template."""
+        return getattr(self.template, relname)._getOb(id, None)
+
+    def thresholds(self):
+        classes = dict((y, x) for x, y in self.template.getThresholdClasses())
+        thresholds = {}
+        for name, th_spec in self.spec.thresholds.items():
+            if th_spec.dsnames is None:
+                raise ValueError("%s: threshold has no dsnames attribute", th_spec)
+
+            cls = classes.get(th_spec.type_)
+            if not cls:
+                if th_spec.optional:
+                    continue
+                raise ValueError("'%s' is an invalid threshold type. Valid types: %s" %
+                                 (th_spec.type_, ', '.join(classes)))
+
+            threshold = cls(name)
+            th_spec.apply_to(threshold)
+            self.objects['thresholds', name] = threshold
+
+            thresholds[name] = RRDThresholdSpecParams.fromObject(threshold)
+        return thresholds
+
+    def datasources(self):
+        options = dict(self.template.getDataSourceOptions())
+        classes = dict((x.__name__, x) for x in self.template.getDataSourceClasses())
+        datasources = {}
+        for name, ds_spec in self.spec.datasources.items():
+            if not ds_spec.sourcetype:
+                raise ValueError('No type for %s/%s. Valid types: %s' % (
+                                 self.template.id, name, ', '.join(options)))
+
+            option = options.get(ds_spec.sourcetype)
+            if not option:
+                raise ValueError("%s is an invalid datasource type. Valid types: %s" % (
+                                 ds_spec.sourcetype, ', '.join(options)))
+
+            cls = classes[option.split('.')[0]]
+            datasource = cls(name)
+            datasource.sourcetype = ds_spec.sourcetype
+            ds_spec.apply_to(datasource, option)
+            self.objects['datasources', name] = datasource
+
+            params = RRDDatasourceSpecParams.fromObject(datasource)
+            params.datapoints = self.datapoints(ds_spec, self.live('datasources', name), cls)
+            datasources[name] = params
+        return datasources
+
+    def datapoints(self, ds_spec, live_ds, datasource_class):
+        from Products.ZenModel.RRDDataPoint import RRDDataPoint
+
+        datapoints = {}
+        for name, dp_spec in ds_spec.datapoints.items():
+            live_dp = live_ds.datapoints._getOb(name, None) if live_ds else None
+            cls = aq_base(live_dp).__class__ if live_dp else RRDDataPoint
+            datapoint = cls(name)
+            dp_spec.apply_to(datapoint)
+            self.objects['datapoints', ds_spec.name, name] = datapoint
+
+            params = RRDDatapointSpecParams.fromObject(datapoint)
+            params.aliases = dict(dp_spec.aliases or {})
+            datapoints[name] = params
+
+        # Datapoints the datasource added itself aren't in the spec.
+        if live_ds and adds_datapoints(datasource_class):
+            for live_dp in live_ds.datapoints():
+                if live_dp.id not in datapoints:
+                    datapoints[live_dp.id] = RRDDatapointSpecParams.fromObject(live_dp)
+
+        return datapoints
+
+    def graphs(self, thresholds):
+        from Products.ZenModel.GraphDefinition import GraphDefinition
+
+        graphs = {}
+        for i, (name, g_spec) in enumerate(self.spec.graphs.items()):
+            live_graph = self.live('graphDefs', name)
+            graph = GraphDefinition(name)
+            g_spec.apply_to(graph, sequence=i)
+
+            params = GraphDefinitionSpecParams.fromObject(graph)
+            params.graphpoints = self.graphpoints(g_spec, graph, live_graph, thresholds)
+            graphs[name] = params
+        return graphs
+
+    def graphpoints(self, g_spec, graph, live_graph, thresholds):
+        from Products.ZenModel.CommentGraphPoint import CommentGraphPoint
+        from Products.ZenModel.DataPointGraphPoint import DataPointGraphPoint
+        from Products.ZenModel.ThresholdGraphPoint import ThresholdGraphPoint
+
+        def live_gp(id):
+            return live_graph.graphPoints._getOb(id, None) if live_graph else None
+
+        graphpoints = []
+        sequence = 0
+        for comment_text in g_spec.comments or []:
+            sequence += 1
+            comment = CommentGraphPoint('comment-{}'.format(sequence))
+            comment.sequence = len(graphpoints)
+            comment.text = comment_text
+            graphpoints.append(comment)
+
+        threshold_gps = []
+        for gp_name, gp_spec in g_spec.graphpoints.items():
+            sequence += 1
+            cls = GRAPHPOINT_TYPES.get(gp_spec.type_, DataPointGraphPoint)
+            graphpoint = cls(gp_name)
+            gp_spec.apply_to(graphpoint, sequence=sequence)
+            graphpoints.append(graphpoint)
+
+            if not gp_spec.includeThresholds:
+                continue
+
+            # Threshold graph points are added by Zenoss for the thresholds
+            # of the graph point's datapoint that aren't graphed yet.
+            graphed = set(getattr(x, 'threshId', None) for x in graphpoints + threshold_gps)
+            added = []
+            for th_name in sorted(thresholds):
+                if th_name in graphed or gp_spec.dpName not in (thresholds[th_name].dsnames or []):
+                    continue
+                existing = live_gp(th_name)
+                if isinstance(aq_base(existing), ThresholdGraphPoint):
+                    thresh_gp = aq_base(existing).__class__(th_name)
+                    for prop in existing._properties:
+                        setattr(thresh_gp, prop['id'], getattr(existing, prop['id'], None))
+                else:
+                    thresh_gp = ThresholdGraphPoint(th_name)
+                    thresh_gp.threshId = th_name
+                added.append(thresh_gp)
+
+            gp_spec.apply_threshold_legends(added)
+            threshold_gps.extend(added)
+
+        if threshold_gps:
+            # Zenoss sequences the graph points of such graphs itself.
+            for graphpoint in graphpoints:
+                existing = live_gp(graphpoint.id)
+                if existing:
+                    graphpoint.sequence = existing.sequence
+            graphpoints.extend(threshold_gps)
+
+        # Exported in the order of graphPoints(), by id, then by sequence.
+        graphpoints.sort(key=lambda x: x.id)
+        graphpoints.sort(key=lambda x: x.sequence)
+        return OrderedDict(
+            (x.id, GraphPointSpecParams.fromObject(x, graph)) for x in graphpoints)
+
+
+def reconcile_enabled():
+    """Return True if templates are to be updated in place on install.
+
+    Enabled by setting the ZPL_TEMPLATE_RECONCILE environment variable.
+
+    """
+    return bool(os.environ.get('ZPL_TEMPLATE_RECONCILE'))
+
+
+def copy_properties(ob, source, names=()):
+    """Set properties of ob that differ from those of source.
+
+    Return True if any property was set.
+
+    """
+    names = set(names) | set(x['id'] for x in source._properties)
+    changed = False
+    for name in sorted(names):
+        value = getattr(source, name, None)
+        if getattr(ob, name, None) != value:
+            setattr(ob, name, value)
+            changed = True
+    return changed
+
+
+class TemplateEdits(object):
+    """Counts of the edits made to reconcile a template, by kind of object."""
+
+    KINDS = ('template', 'thresholds', 'datasources', 'datapoints', 'graphs')
+    ACTIONS = ('added', 'removed', 'replaced', 'updated', 'unchanged')
+
+    def __init__(self):
+        self.counts = dict((x, dict.fromkeys(self.ACTIONS, 0)) for x in self.KINDS)
+
+    def add(self, kind, action):
+        self.counts[kind][action] += 1
+
+    @property
+    def changed(self):
+        """Return number of objects added, removed, replaced or updated."""
+        return sum(
+            n for x in self.counts.values()
+            for action, n in x.items() if action != 'unchanged')
+
+    def __str__(self):
+        parts = []
+        for kind in self.KINDS:
+            counts = ', '.join(
+                '{} {}'.format(self.counts[kind][x], x)
+                for x in self.ACTIONS if self.counts[kind][x])
+            if counts:
+                parts.append('{}: {}'.format(kind, counts))
+        return '; '.join(parts)
+
+
+class TemplateReconciler(object):
+    """Update a template in place to match its RRDTemplateSpec.
+
+    Objects that already match the spec are left alone, keeping their
+    identity. Objects of the right class have the properties that differ
+    set, datapoint aliases are added and removed individually, and only
+    objects whose class or type changed are deleted and created again.
+    Graphs aren't bound by devices, so a graph that differs is created
+    again as a whole.
+
+    """
+
+    def __init__(self, spec, template):
+        self.spec = spec
+        self.template = template
+        self.expected = ExpectedTemplate(template, spec)
+        self.edits = TemplateEdits()
+
+    def run(self):
+        """Reconcile the template and return TemplateEdits."""
+        params = self.expected.params()
+        objects = self.expected.objects
+
+        if copy_properties(self.template, objects['template'],
+                           ('targetPythonClass', 'description')):
+            self.edits.add('template', 'updated')
+        else:
+            self.edits.add('template', 'unchanged')
+
+        self.reconcile_thresholds(params.thresholds)
+        self.reconcile_datasources(params.datasources)
+        self.reconcile_graphs(params.graphs)
+        return self.edits
+
+    def reconcile_thresholds(self, expected):
+        template = self.template
+        live = dict((x.id, x) for x in template.thresholds())
+        for name in sorted(expected):
+            th_spec = self.spec.thresholds[name]
+            threshold = live.pop(name, None)
+            shadow = self.expected.objects['thresholds', name]
+            if threshold is None:
+                th_spec.create(self.spec, template)
+                self.edits.add('thresholds', 'added')
+            elif aq_base(threshold).__class__ is not shadow.__class__:
+                template.thresholds._delObject(name)
+                th_spec.create(self.spec, template)
+                self.edits.add('thresholds', 'replaced')
+            elif param_digest(RRDThresholdSpecParams.fromObject(threshold)) == param_digest(expected[name]):
+                self.edits.add('thresholds', 'unchanged')
+            else:
+                copy_properties(threshold, shadow, ('dsnames', 'eventClass', 'severity'))
+                self.edits.add('thresholds', 'updated')
+
+        for name in sorted(live):
+            template.thresholds._delObject(name)
+            self.edits.add('thresholds', 'removed')
+
+    def reconcile_datasources(self, expected):
+        template = self.template
+        live = dict((x.id, x) for x in template.datasources())
+        for name in sorted(expected):
+            ds_spec = self.spec.datasources[name]
+            datasource = live.pop(name, None)
+            shadow = self.expected.objects['datasources', name]
+            if datasource is None:
+                ds_spec.create(self.spec, template)
+                self.edits.add('datasources', 'added')
+                self.edits.counts['datapoints']['added'] += len(ds_spec.datapoints)
+            elif aq_base(datasource).__class__ is not shadow.__class__ or \
+                    datasource.sourcetype != shadow.sourcetype:
+                template.datasources._delObject(name)
+                ds_spec.create(self.spec, template)
+                self.edits.add('datasources', 'replaced')
+                self.edits.counts['datapoints']['added'] += len(ds_spec.datapoints)
+            elif param_digest(RRDDatasourceSpecParams.fromObject(datasource)) == param_digest(expected[name]):
+                self.edits.add('datasources', 'unchanged')
+                self.edits.counts['datapoints']['unchanged'] += len(expected[name].datapoints)
+            else:
+                names = ('enabled', 'component', 'eventClass', 'eventKey',
+                         'severity', 'commandTemplate')
+                if copy_properties(datasource, shadow, names):
+                    self.edits.add('datasources', 'updated')
+                else:
+                    self.edits.add('datasources', 'unchanged')
+                self.reconcile_datapoints(ds_spec, datasource, expected[name].datapoints)
+
+        for name in sorted(live):
+            template.datasources._delObject(name)
+            self.edits.add('datasources', 'removed')
+
+    def reconcile_datapoints(self, ds_spec, datasource, expected):
+        live = dict((x.id, x) for x in datasource.datapoints())
+        for name in sorted(expected):
+            datapoint = live.pop(name, None)
+            shadow = self.expected.objects.get(('datapoints', ds_spec.name, name))
+            if shadow is None:
+                # added by the datasource itself, and taken from it
+                self.edits.add('datapoints', 'unchanged')
+            elif datapoint is None:
+                ds_spec.datapoints[name].create(ds_spec, datasource)
+                self.edits.add('datapoints', 'added')
+            elif aq_base(datapoint).__class__ is not shadow.__class__:
+                datasource.datapoints._delObject(name)
+                ds_spec.datapoints[name].create(ds_spec, datasource)
+                self.edits.add('datapoints', 'replaced')
+            elif param_digest(RRDDatapointSpecParams.fromObject(datapoint)) == param_digest(expected[name]):
+                self.edits.add('datapoints', 'unchanged')
+            else:
+                names = ('rrdtype', 'createCmd', 'isrow', 'rrdmin', 'rrdmax', 'description')
+                copy_properties(datapoint, shadow, names)
+                self.reconcile_aliases(datapoint, expected[name].aliases)
+                self.edits.add('datapoints', 'updated')
+
+        for name in sorted(live):
+            datasource.datapoints._delObject(name)
+            self.edits.add('datapoints', 'removed')
+
+    def reconcile_aliases(self, datapoint, expected):
+        live = dict((x.id, x) for x in datapoint.aliases())
+        for alias_id, alias in live.items():
+            if alias_id not in expected:
+                datapoint.removeAlias(alias_id)
+            elif alias.formula != expected[alias_id]:
+                alias.formula = expected[alias_id]
+        for alias_id, formula in expected.items():
+            if alias_id not in live:
+                datapoint.addAlias(alias_id, formula)
+
+    def reconcile_graphs(self, expected):
+        template = self.template
+        live = dict((x.id, x) for x in template.graphDefs())
+        for i, (name, g_spec) in enumerate(self.spec.graphs.items()):
+            graph = live.pop(name, None)
+            if graph is None:
+                g_spec.create(self.spec, template, sequence=i)
+                self.edits.add('graphs', 'added')
+            elif param_digest(GraphDefinitionSpecParams.fromObject(graph)) == param_digest(expected[name]):
+                self.edits.add('graphs', 'unchanged')
+            else:
+                template.graphDefs._delObject(name)
+                g_spec.create(self.spec, template, sequence=i)
+                self.edits.add('graphs', 'replaced')
+
+        for name in sorted(live):
+            template.graphDefs._delObject(name)
+            self.edits.add('graphs', 'removed')
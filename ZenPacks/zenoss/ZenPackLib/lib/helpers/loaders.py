@@ -12,9 +12,12 @@ import re
 import sys
 import importlib
 import keyword
+import cPickle
+from cStringIO import StringIO
 from collections import OrderedDict
 from ..functions import ZENOSS_KEYWORDS, JS_WORDS, relname_from_classname, find_keyword_cls
 from .ZenPackLibLog import ZPLOG, DEFAULTLOG
+from .SpecSchema import SpecSchema
 from ..base.types import Severity, multiline
 
 
@@ -26,7 +29,7 @@ class OrderedLoader(yaml.Loader):
 
     """
     def __init__(self, *args, **kwargs):
-        yaml.Loader.__init__(self, *args, **kwargs)
+        self.init_base_loader(*args, **kwargs)
 
         self.add_constructor(
             u'tag:yaml.org,2002:map',
@@ -39,6 +42,10 @@ class OrderedLoader(yaml.Loader):
         self.add_constructor(u'!ZenPackSpec', type(self).dict_constructor)
         self.add_path_resolver(u'!ZenPackSpec', [])
 
+    def init_base_loader(self, stream):
+        """Initialize the underlying YAML parser, constructor and resolver."""
+        yaml.Loader.__init__(self, stream)
+
     def dict_constructor(self, node):
         """constructor for OrderedDict"""
         return OrderedDict(self.construct_pairs(node))
@@ -56,6 +63,11 @@ class ZenPackSpecLoader(OrderedLoader):
     QUIET = False
     LEVEL = 0
 
+    # When True, construct_zenpackspec keeps the ZenPackSpec parameters
+    # pickled in spec_params_pickle for the compiled spec cache.
+    PICKLE_PARAMS = False
+    spec_params_pickle = None
+
     def __init__(self, *args, **kwargs):
         OrderedLoader.__init__(self, *args, **kwargs)
 
@@ -83,8 +95,7 @@ class ZenPackSpecLoader(OrderedLoader):
 
     def construct_specsparameters(self, node, spectype):
         """constructor for SpecsParameters"""
-        from ..spec.Spec import Spec
-        spec_class = {x.__name__: x for x in Spec.get_subclasses()}.get(spectype, None)
+        spec_class = SpecSchema.get_spec_class(spectype)
 
         if not spec_class:
             self.yaml_error(yaml.constructor.ConstructorError(
@@ -100,7 +111,7 @@ class ZenPackSpecLoader(OrderedLoader):
                 node.start_mark))
             return
 
-        param_defs = spec_class.init_params
+        param_defs = SpecSchema.get(spec_class).params
         specs = OrderedDict()
         for spec_key_node, spec_value_node in node.value:
             try:
@@ -126,7 +137,8 @@ class ZenPackSpecLoader(OrderedLoader):
             return dict(shorthand=self.construct_scalar(node))
 
         # dictionary of class initialization parameters
-        param_defs = cls.init_params
+        schema = SpecSchema.get(cls)
+        param_defs = schema.params
         # create new dictionary containing instance parameters
         params = {}
         # raise an error if this won't parse correctly
@@ -145,20 +157,17 @@ class ZenPackSpecLoader(OrderedLoader):
 
         extra_params = None
         # map attribute keys to yaml parameters if they differ
-        param_name_map = {}
-        for key, attributes in param_defs.items():
-            yaml_key = attributes.get('yaml_param')
-            param_name_map[yaml_key] = key
+        param_name_map = schema.yaml_params
+        for key in schema.extra_params:
             # ensure that extra parameters are only defined once
-            if attributes.get('type') == 'ExtraParams':
-                if extra_params:
-                    self.yaml_error(yaml.constructor.ConstructorError(
-                        None, None,
-                        "Only one ExtraParams parameter may be specified.",
-                        node.start_mark))
-                extra_params = key
-                # set this to an empty dict for now
-                params[extra_params] = {}
+            if extra_params:
+                self.yaml_error(yaml.constructor.ConstructorError(
+                    None, None,
+                    "Only one ExtraParams parameter may be specified.",
+                    node.start_mark))
+            extra_params = key
+            # set this to an empty dict for now
+            params[extra_params] = {}
 
         for key_node, value_node in node.value:
             yaml_key = self.construct_object(key_node)
@@ -204,9 +213,8 @@ class ZenPackSpecLoader(OrderedLoader):
                 elif expected_type == 'float' and not isinstance(yaml_value, float):
                     yaml_value = self.construct_yaml_float(value_node)
                 elif expected_type.startswith("dict(SpecsParameter("):
-                    m = re.match('^dict\(SpecsParameter\((.*)\)\)$', expected_type)
-                    if m:
-                        spectype = m.group(1)
+                    spectype = schema.dict_specs_params.get(key)
+                    if spectype:
                         if not isinstance(node, yaml.MappingNode):
                             self.yaml_error(yaml.constructor.ConstructorError(
                                 None, None,
@@ -266,13 +274,9 @@ class ZenPackSpecLoader(OrderedLoader):
                 elif expected_type == 'multiline':
                     yaml_value = self.construct_python_str(value_node)
 
-                elif re.match('^SpecsParameter\((.*)\)$', expected_type):
-                    m = re.match('^SpecsParameter\((.*)\)$', expected_type)
-                    if m:
-                        spectype = m.group(1)
-                        yaml_value = self.construct_specsparameters(value_node, spectype)
-                    else:
-                        raise Exception("Unhandled type '{}'".format(expected_type))
+                elif key in schema.specs_params:
+                    spectype = schema.specs_params[key]
+                    yaml_value = self.construct_specsparameters(value_node, spectype)
                 else:
                     if expected_type != type(yaml_value).__name__:
                         if not isinstance(yaml_value, OrderedDict) and \
@@ -303,6 +307,8 @@ class ZenPackSpecLoader(OrderedLoader):
 
         from ..spec.ZenPackSpec import ZenPackSpec
         params = self.construct_spec(ZenPackSpec, node)
+        if self.PICKLE_PARAMS and not getattr(self, 'yaml_errored', False):
+            self.spec_params_pickle = dump_spec_params(params)
         params['zplog'] = self.LOG
         name = params.pop("name")
 
@@ -474,7 +480,7 @@ class ZenPackSpecLoader(OrderedLoader):
                 None, None,
                 "Found reserved keyword '{}' while processing {}".format(key, cls.__name__),
                 start_mark))
-        elif key in ZENOSS_KEYWORDS.union(JS_WORDS):
+        elif key in JS_WORDS or key in ZENOSS_KEYWORDS:
             # should be ok to use a zenoss word to define these
             # some items, like sysUpTime are pretty common datapoints
             if cls.__name__ not in ['RRDDatasourceSpec',
@@ -500,6 +506,36 @@ class ZenPackSpecLoader(OrderedLoader):
         return None
 
 
+def dump_spec_params(params):
+    """Return pickled ZenPackSpec parameters or None if they can't be.
+
+    Classes are pickled by name and resolved with str_to_class when loaded,
+    the same as when they are referenced by name in YAML.
+
+    """
+    def persistent_id(obj):
+        if isinstance(obj, type):
+            return "{}.{}".format(obj.__module__, obj.__name__)
+
+    out = StringIO()
+    pickler = cPickle.Pickler(out, cPickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = persistent_id
+    try:
+        pickler.dump(params)
+    except Exception as e:
+        DEFAULTLOG.debug("Unable to pickle ZenPackSpec parameters: {}".format(e))
+        return None
+
+    return out.getvalue()
+
+
+def load_spec_params(data):
+    """Return ZenPackSpec parameters pickled by dump_spec_params."""
+    unpickler = cPickle.Unpickler(StringIO(data))
+    unpickler.persistent_load = ZenPackSpecLoader('').str_to_class
+    return unpickler.load()
+
+
 class WarningLoader(ZenPackSpecLoader):
     """
         These subclasses exist so that each copy of zenpacklib installed on a
@@ -512,3 +548,46 @@ class WarningLoader(ZenPackSpecLoader):
 
 
 yaml.add_path_resolver(u'!ZenPackSpec', [], Loader=ZenPackSpecLoader)
+
+
+LIBYAML = hasattr(yaml, 'CParser')
+
+if LIBYAML:
+    class CParserMixin(yaml.CParser):
+        """Replaces the pure-Python parser of a loader with libyaml.
+
+        Must be the first base class so that the CParser methods take
+        precedence over those of the pure-Python Reader, Scanner, Parser
+        and Composer. Constructors, resolvers and source marks work the
+        same as with the pure-Python loaders.
+
+        """
+
+        def __init__(self, stream):
+            # CParser.__init__ precedes the loader's own __init__ in the MRO.
+            # Skip past it so the custom constructors still get registered.
+            super(yaml.CParser, self).__init__(stream)
+
+        def init_base_loader(self, stream):
+            yaml.CParser.__init__(self, stream)
+            yaml.constructor.Constructor.__init__(self)
+            yaml.resolver.Resolver.__init__(self)
+
+    class COrderedLoader(CParserMixin, OrderedLoader):
+        """OrderedLoader using libyaml."""
+
+    class CZenPackSpecLoader(CParserMixin, ZenPackSpecLoader):
+        """ZenPackSpecLoader using libyaml."""
+
+    class CWarningLoader(CParserMixin, WarningLoader):
+        """WarningLoader using libyaml."""
+
+    FastOrderedLoader = COrderedLoader
+    FastZenPackSpecLoader = CZenPackSpecLoader
+    FastWarningLoader = CWarningLoader
+
+else:
+    # libyaml isn't available. Fall back to the pure-Python loaders.
+    FastOrderedLoader = OrderedLoader
+    FastZenPackSpecLoader = ZenPackSpecLoader
+    FastWarningLoader = WarningLoader
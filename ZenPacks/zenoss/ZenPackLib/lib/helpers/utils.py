@@ -6,17 +6,29 @@
 # License.zenoss under the directory where your Zenoss product is installed.
 #
 ##############################################################################
+import imp
 import os
+import hashlib
 from collections import OrderedDict, Mapping
 import yaml
 import time
-from .ZenPackLibLog import DEFAULTLOG
+from .ZenPackLibLog import DEFAULTLOG, ZPLOG
 from .Dumper import Dumper
-from .loaders import OrderedLoader, ZenPackSpecLoader
+from .loaders import (
+    OrderedLoader, ZenPackSpecLoader, FastOrderedLoader, FastZenPackSpecLoader,
+    load_spec_params)
+from .ClassCache import class_cache_enabled
+from .JSBundle import js_bundle_enabled
 from ..base.ZenPack import ZenPack
 import inspect
 
 
+# minimum number of YAML documents to parse in worker processes
+LOAD_WORKERS_MIN_DOCS = 4
+
+# compiled spec cache written next to YAML files when ZPL_SPEC_CACHE is set
+SPEC_CACHE_FILENAME = '.zpl_spec_cache'
+
 # list of yaml sections with DEFAULTS capability
 YAML_HAS_DEFAULTS = ['classes', 'properties', 'thresholds', 'datasources',
                      'datapoints', 'graphs', 'relationships', 'graphpoints', 'zProperties']
@@ -49,12 +61,7 @@ def load_yaml(yaml_doc=None, verbose=False, level=0):
     if isinstance(yaml_doc, list):
         if len(yaml_doc) == 1:
             return load_yaml(yaml_doc[0], verbose, level)
-        # build python dict of merged YAML data
-        cfg_data = get_merged_docs(yaml_doc)
-        # once loaded, optimize
-        optimized_yaml = get_optimized_yaml(cfg_data)
-        # resubmit merged YAML
-        return load_yaml(optimized_yaml, verbose, level)
+        return load_yaml_multi(yaml_doc)
 
     else:
         # load all YAML files in a directory
@@ -74,7 +81,9 @@ def load_yaml(yaml_doc=None, verbose=False, level=0):
     try:
         if os.path.isfile(yaml_doc):
             DEFAULTLOG.debug("Loading YAML from {}".format(yaml_doc))
-        CFG = load_yaml_single(yaml_doc)
+        CFG = load_spec_cached(
+            [yaml_doc],
+            lambda pickle_params: construct_yaml_single(yaml_doc, pickle_params))
     except Exception as e:
         DEFAULTLOG.error(e)
 
@@ -87,6 +96,368 @@ def load_yaml(yaml_doc=None, verbose=False, level=0):
     return CFG
 
 
+def load_yaml_multi(docs):
+    """Return created ZenPackSpec from multiple YAML files or strings.
+
+    Each document is parsed into a node graph, in parallel worker
+    processes when there are enough of them. The node graphs are merged
+    the same way get_merged_docs merges loaded data, and the ZenPackSpec
+    is constructed from the merged graph in a single pass.
+
+    Per-phase timings are logged and kept in the load_timings attribute of
+    the returned ZenPackSpec.
+
+    """
+    timings = OrderedDict()
+
+    def construct(pickle_params):
+        start = time.time()
+        nodes = compose_yaml_docs(docs)
+        timings['parse'] = time.time() - start
+
+        start = time.time()
+        node = get_merged_nodes(docs, nodes)
+        timings['merge'] = time.time() - start
+
+        CFG, params_pickle = None, None
+        start = time.time()
+        try:
+            if node is not None:
+                loader = FastZenPackSpecLoader('')
+                loader.PICKLE_PARAMS = pickle_params
+                try:
+                    CFG = loader.construct_document(node)
+                    params_pickle = loader.spec_params_pickle
+                finally:
+                    loader.dispose()
+        except Exception as e:
+            DEFAULTLOG.error(e)
+        timings['construct'] = time.time() - start
+
+        return CFG, params_pickle
+
+    start = time.time()
+    CFG = load_spec_cached(docs, construct)
+    if 'construct' not in timings:
+        timings['cache'] = time.time() - start
+
+    if not CFG:
+        DEFAULTLOG.error("Unable to load {}".format(docs))
+        return CFG
+
+    start = time.time()
+    CFG.create()
+    timings['create'] = time.time() - start
+
+    CFG.load_timings = timings
+    DEFAULTLOG.debug("Loaded {} from {} documents in {:0.2f}s ({})".format(
+        CFG.name,
+        len(docs),
+        sum(timings.values()),
+        ", ".join("{} {:0.2f}s".format(k, v) for k, v in timings.items())))
+
+    return CFG
+
+
+def construct_yaml_single(yaml_doc, pickle_params=False):
+    """Return (ZenPackSpec, pickled parameters) from a file or string."""
+    if os.path.isfile(yaml_doc):
+        stream = open(yaml_doc, 'r')
+    else:
+        stream = yaml_doc
+
+    loader = FastZenPackSpecLoader(stream)
+    loader.PICKLE_PARAMS = pickle_params
+    try:
+        return loader.get_single_data(), loader.spec_params_pickle
+    finally:
+        loader.dispose()
+        if stream is not yaml_doc:
+            stream.close()
+
+
+def spec_cache_enabled():
+    """Return True if the compiled spec cache is enabled.
+
+    The cache is opt-in. Enable it by setting the ZPL_SPEC_CACHE
+    environment variable.
+
+    """
+    return bool(os.environ.get('ZPL_SPEC_CACHE'))
+
+
+def get_spec_cache(docs):
+    """Return (path, key) of compiled spec cache for docs.
+
+    Returns (None, None) if the cache is disabled, or if any of docs isn't
+    a file. The key is a hash of the zenpacklib version and the names and
+    contents of all YAML files.
+
+    """
+    if not spec_cache_enabled():
+        return None, None
+
+    key = get_spec_hash(docs)
+    if not key:
+        return None, None
+
+    path = os.path.join(
+        os.path.dirname(os.path.abspath(docs[0])), SPEC_CACHE_FILENAME)
+
+    return path, key
+
+
+def get_spec_hash(docs):
+    """Return hash of the zenpacklib version and YAML files docs.
+
+    Returns None if there are no docs or if any of them isn't a file.
+
+    """
+    if not docs or not all(os.path.isfile(x) for x in docs):
+        return None
+
+    from ZenPacks.zenoss.ZenPackLib import zenpacklib
+
+    digest = hashlib.sha1()
+    digest.update(zenpacklib.__version__)
+    for doc in docs:
+        digest.update('\0{}\0'.format(os.path.basename(doc)))
+        with open(doc, 'rb') as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def load_spec_cached(docs, construct):
+    """Return ZenPackSpec for docs, using compiled spec cache if enabled.
+
+    On a cache hit the ZenPackSpec is created from cached parameters
+    without parsing or validating YAML. Otherwise construct is called
+    with pickle_params and must return a (ZenPackSpec, pickled parameters)
+    tuple. The cache is then written if the parameters could be pickled.
+
+    The spec_hash of the returned ZenPackSpec is set when the class cache
+    or JavaScript bundles are enabled.
+
+    """
+    path, key = get_spec_cache(docs)
+    CFG = read_spec_cache(path, key) if path else None
+
+    if not CFG:
+        CFG, params_pickle = construct(pickle_params=path is not None)
+        if CFG and path and params_pickle:
+            write_spec_cache(path, key, params_pickle)
+
+    if CFG and (class_cache_enabled() or js_bundle_enabled()):
+        CFG.spec_hash = key or get_spec_hash(docs)
+
+    return CFG
+
+
+def read_spec_cache(path, key):
+    """Return ZenPackSpec from compiled spec cache or None."""
+    try:
+        with open(path, 'rb') as f:
+            if f.readline().rstrip('\n') != key:
+                DEFAULTLOG.debug("Ignoring outdated spec cache {}".format(path))
+                return None
+            params = load_spec_params(f.read())
+    except IOError:
+        return None
+    except Exception as e:
+        DEFAULTLOG.debug("Ignoring unreadable spec cache {}: {}".format(path, e))
+        return None
+
+    from ..spec.ZenPackSpec import ZenPackSpec
+
+    name = params.pop('name')
+    params['zplog'] = ZPLOG.add_log(
+        name,
+        quiet=ZenPackSpecLoader.QUIET,
+        level=ZenPackSpecLoader.LEVEL)
+
+    DEFAULTLOG.debug("Loading {} from spec cache {}".format(name, path))
+    return ZenPackSpec(name, **params)
+
+
+def write_spec_cache(path, key, params_pickle):
+    """Write compiled spec cache. Failures are only logged."""
+    tmp_path = '{}.{}'.format(path, os.getpid())
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(key + '\n')
+            f.write(params_pickle)
+        os.rename(tmp_path, path)
+    except Exception as e:
+        DEFAULTLOG.debug("Unable to write spec cache {}: {}".format(path, e))
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def compose_yaml_doc(yaml_doc, portable=False):
+    """Return YAML node graph for a file or string.
+
+    If portable is True, the source buffers referenced by node marks are
+    dropped so the graph can be cheaply sent between processes.
+
+    """
+    if os.path.isfile(yaml_doc):
+        with open(yaml_doc, 'r') as f:
+            node = yaml.compose(f, Loader=FastZenPackSpecLoader)
+    else:
+        node = yaml.compose(yaml_doc, Loader=FastZenPackSpecLoader)
+
+    if portable and node is not None:
+        seen = set()
+        pending = [node]
+        while pending:
+            n = pending.pop()
+            if id(n) in seen:
+                continue
+            seen.add(id(n))
+            for mark in (n.start_mark, n.end_mark):
+                if mark is not None:
+                    mark.buffer = None
+            if isinstance(n, yaml.MappingNode):
+                for key_node, value_node in n.value:
+                    pending.extend((key_node, value_node))
+            elif isinstance(n, yaml.SequenceNode):
+                pending.extend(n.value)
+
+    return node
+
+
+def compose_portable_yaml_doc(yaml_doc):
+    """Return portable YAML node graph. Used by worker processes."""
+    return compose_yaml_doc(yaml_doc, portable=True)
+
+
+def get_load_workers(count):
+    """Return number of worker processes to parse count documents with.
+
+    Documents are parsed in this process unless the ZPL_LOAD_WORKERS
+    environment variable is set to a number of workers, or to "auto" for
+    one worker per CPU. Fewer than LOAD_WORKERS_MIN_DOCS documents are
+    always parsed in this process.
+
+    ZenPacks load their YAML while they're being imported. Waiting for
+    worker processes while the import lock is held can deadlock, so
+    documents are also parsed in this process then.
+
+    """
+    if count < LOAD_WORKERS_MIN_DOCS:
+        return 0
+
+    workers = os.environ.get('ZPL_LOAD_WORKERS')
+    if not workers:
+        return 0
+
+    if imp.lock_held():
+        DEFAULTLOG.debug("Parsing YAML in this process during import")
+        return 0
+
+    if workers == 'auto':
+        import multiprocessing
+        try:
+            workers = multiprocessing.cpu_count()
+        except NotImplementedError:
+            workers = 1
+
+    try:
+        workers = min(int(workers), count)
+    except ValueError:
+        return 0
+
+    return workers if workers > 1 else 0
+
+
+def compose_yaml_docs(docs):
+    """Return list of YAML node graphs for docs in the same order."""
+    workers = get_load_workers(len(docs))
+    if workers:
+        import multiprocessing
+        try:
+            pool = multiprocessing.Pool(workers)
+            try:
+                return pool.map(compose_portable_yaml_doc, docs)
+            finally:
+                pool.terminate()
+                pool.join()
+        except Exception as e:
+            DEFAULTLOG.debug(
+                "Parsing YAML in worker processes failed, "
+                "falling back to serial parsing: {}".format(e))
+
+    return [compose_yaml_doc(doc) for doc in docs]
+
+
+def get_merged_nodes(docs, nodes):
+    """Return recursively merged YAML node graph.
+
+    Mappings are merged and sequences are extended in the same way that
+    get_merged_docs merges loaded data.
+
+    """
+    def node_key(node):
+        return (node.tag, node.value)
+
+    def merge_node(target, source):
+        index = {}
+        for i, (key_node, _) in enumerate(target.value):
+            if isinstance(key_node, yaml.ScalarNode):
+                index[node_key(key_node)] = i
+
+        for key_node, value_node in source.value:
+            i = None
+            if isinstance(key_node, yaml.ScalarNode):
+                i = index.get(node_key(key_node))
+
+            if i is None:
+                if isinstance(key_node, yaml.ScalarNode):
+                    index[node_key(key_node)] = len(target.value)
+                target.value.append((key_node, value_node))
+                continue
+
+            target_value = target.value[i][1]
+            if (isinstance(target_value, yaml.MappingNode) and
+                    isinstance(value_node, yaml.MappingNode)):
+                merge_node(target_value, value_node)
+            elif (isinstance(target_value, yaml.SequenceNode) and
+                    isinstance(value_node, yaml.SequenceNode)):
+                target_value.value.extend(value_node.value)
+            else:
+                target.value[i] = (target.value[i][0], value_node)
+
+    def get_name(node):
+        for key_node, value_node in node.value:
+            if isinstance(key_node, yaml.ScalarNode) and key_node.value == 'name':
+                return value_node.value
+
+    new = None
+    for doc, node in zip(docs, nodes):
+        if not isinstance(node, yaml.MappingNode):
+            continue
+
+        if new is None:
+            new = node
+            continue
+
+        # check for conflicting zenpack ids
+        zp_id = get_name(new)
+        if zp_id:
+            name = get_name(node)
+            if name and name != zp_id:
+                DEFAULTLOG.error('Skipping {} since conflicting ZenPack names '\
+                    'found: {} vs {}'.format(doc, zp_id, name))
+                continue
+
+        merge_node(new, node)
+
+    return new
+
+
 def load_yaml_single(yaml_doc, loader=ZenPackSpecLoader):
     '''return YAML loaded from string or file with given loader.'''
     # if it's a string
@@ -113,7 +484,7 @@ def get_merged_docs(docs=None):
     new = {}
     for doc in docs:
         zp_id = new.get('name')
-        cfg = load_yaml_single(doc, loader=OrderedLoader)
+        cfg = load_yaml_single(doc, loader=FastOrderedLoader)
         # check for conflicting zenpack ids
         if zp_id:
             name = cfg.get('name')
@@ -9,6 +9,7 @@
 import os
 import os.path
 import sys
+import subprocess
 import yaml
 import collections
 import logging
@@ -93,6 +94,14 @@ class ZPLCommand(ZenScriptBase):
                     dest="paths",
                     action="store_true",
                     help="print possible facet paths for a given device and whether currently filtered.")
+        group.add_option("--profile-import",
+                    dest="profile_import",
+                    action="store_true",
+                    help="print per-module import times of zenpacklib")
+        group.add_option("--plan",
+                    dest="plan",
+                    action="store_true",
+                    help="print the organizer and template operations an install of ZENPACK would make")
 
         self.parser.add_option_group(group)
 
@@ -143,6 +152,9 @@ class ZPLCommand(ZenScriptBase):
         self.options.filename = None
         self.options.zenpack = None
         self.options.device = None
+        if self.options.profile_import:
+            return
+
         # check that necessary options are supplied
         # requires filename
         if len(self.args) != 1:
@@ -163,7 +175,8 @@ class ZPLCommand(ZenScriptBase):
                 self.parser.error(msg)
 
         if self.options.dump or self.options.create or\
-           self.options.dump_event_classes or self.options.dump_process_classes:
+           self.options.dump_event_classes or self.options.dump_process_classes or\
+           self.options.plan:
             self.parser.usage = "%prog [options] ZENPACKNAME"
             if len(self.args) != 1:
                 self.parser.error('No ZenPack given')
@@ -182,7 +195,10 @@ class ZPLCommand(ZenScriptBase):
             if not self.is_valid_zenpack():
                 self.parser.error('{} was not found'.format(self.options.zenpack))
 
-        if self.options.create:
+        if self.options.profile_import:
+            self.profile_import()
+
+        elif self.options.create:
             self.create_zenpack_srcdir(self.options.zenpack)
 
         elif self.options.dump:
@@ -206,6 +222,9 @@ class ZPLCommand(ZenScriptBase):
         elif self.options.dump_process_classes:
             self.dump_process_classes(self.options.zenpack)
 
+        elif self.options.plan:
+            self.print_install_plan(self.options.zenpack)
+
     def optimize(self, filename):
         '''return formatted YAML with DEFAULTS optimized'''
         try:
@@ -226,6 +245,38 @@ class ZPLCommand(ZenScriptBase):
         except Exception, e:
             DEFAULTLOG.exception(e)
 
+    def profile_import(self):
+        """Print per-module import times of zenpacklib.
+
+        zenpacklib is already imported in this process, so it is imported
+        again in a new one.
+
+        """
+        from ..helpers import ImportProfiler
+        script = os.path.splitext(ImportProfiler.__file__)[0] + '.py'
+        sys.exit(subprocess.call([sys.executable, script, zenpacklib.__name__]))
+
+    def print_install_plan(self, zenpack_name):
+        """Print the operations an install of the ZenPack would make.
+
+        Nothing is changed. Existing templates are compared with their
+        specs to tell which would be updated.
+
+        """
+        from ..base.InstallPlan import InstallPlan
+
+        self.connect()
+        zenpack = self.dmd.ZenPackManager.packs._getOb(zenpack_name, None)
+        if zenpack is None:
+            DEFAULTLOG.error("ZenPack '{}' not found.".format(zenpack_name))
+            return
+        if getattr(zenpack, '_v_specparams', None) is None:
+            DEFAULTLOG.error("ZenPack '{}' doesn't use zenpacklib.".format(zenpack_name))
+            return
+
+        plan = InstallPlan(zenpack, self.dmd.getPhysicalRoot())
+        print plan.build(estimate=True).describe()
+
     def validate_zenpack_name(self, zenpack_name):
         """Ensure that ZenPack name conforms with convention"""
         zenpack_name_parts = zenpack_name.split('.')
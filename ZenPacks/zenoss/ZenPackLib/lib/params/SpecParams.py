@@ -10,6 +10,7 @@ from ..spec.Spec import Spec
 from ..helpers.ZenPackLibLog import DEFAULTLOG
 from ..base.ClassProperty import ClassProperty
 import copy
+from collections import OrderedDict
 
 class SpecParams(object):
     """SpecParams"""
@@ -48,8 +49,14 @@ class SpecParams(object):
         except Exception:
             raise Exception("Spec Base Not Found for %s" % cls.__name__)
 
-        params = copy.deepcopy(spec_base.init_params)
-        for p in params:
-            params[p]['type'] = params[p]['type'].replace("Spec)", "SpecParams)")
+        # Only the parameter dicts and mutable defaults need copying, so
+        # avoid a deepcopy of the whole schema.
+        params = OrderedDict()
+        for p, attributes in spec_base.init_params.iteritems():
+            attributes = dict(attributes)
+            attributes['type'] = attributes['type'].replace("Spec)", "SpecParams)")
+            if isinstance(attributes.get('default'), (dict, list)):
+                attributes['default'] = copy.copy(attributes['default'])
+            params[p] = attributes
 
         return params
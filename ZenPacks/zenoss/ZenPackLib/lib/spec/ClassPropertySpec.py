@@ -10,6 +10,7 @@ from Products.Zuul.form import schema
 from Products.Zuul.utils import ZuulMessageFactory as _t
 from Products.Zuul.infos import ProxyProperty
 from ..helpers.OrderAndValue import OrderAndValue
+from ..helpers.ClassCache import source_call
 from .Spec import Spec, MethodInfoProperty, EnumInfoProperty
 
 
@@ -213,7 +214,8 @@ class ClassPropertySpec(Spec):
             return {}
 
         return {
-            self.name: schema_map[self.type_](
+            self.name: source_call(
+                schema_map[self.type_],
                 title=_t(self.label),
                 alwaysEditable=self.editable,
                 order=self.scaled_order)
@@ -12,6 +12,7 @@ from Products.ZenRelations.RelSchema import ToManyCont, ToOne
 
 from .Spec import Spec, RelationshipInfoProperty, RelationshipLengthProperty
 from ..helpers.OrderAndValue import OrderAndValue
+from ..helpers.ClassCache import source_call
 
 
 class ClassRelationshipSpec(Spec):
@@ -184,13 +185,15 @@ class ClassRelationshipSpec(Spec):
 
         if isinstance(self.schema, (ToOne)):
             if (self.label or remote_spec.label) != 'Device':
-                schemas[self.name] = schema.Entity(
+                schemas[self.name] = source_call(
+                    schema.Entity,
                     title=_t(self.label or remote_spec.label),
                     group="Overview",
                     order=self.scaled_order)
         else:
             relname_count = '{}_count'.format(self.name)
-            schemas[relname_count] = schema.Int(
+            schemas[relname_count] = source_call(
+                schema.Int,
                 title=_t(u'Number of {}'.format(self.label or remote_spec.plural_label)),
                 group="Overview",
                 order=self.scaled_order)
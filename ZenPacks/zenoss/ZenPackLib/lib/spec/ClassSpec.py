@@ -7,10 +7,8 @@
 #
 ##############################################################################
 import os
-import math
-import re
-import time
 import copy
+from collections import OrderedDict
 from zope.interface import classImplements
 from Products.Zuul.decorators import memoize
 from Products.Zuul.utils import ZuulMessageFactory as _t
@@ -21,38 +19,27 @@ from Products.Zuul.infos import InfoBase, ProxyProperty
 from Products.Zuul.interfaces import IInfo
 from Products.Zuul.catalog.interfaces import IPathReporter
 
+from ..helpers.PathPatternStreams import PathPatternStreams
+from ..helpers.ClassCache import source_call
 from ..wrapper.ComponentFormBuilder import ComponentFormBuilder
 from ..wrapper.ComponentPathReporter import ComponentPathReporter
-from ..utils import impact_installed, dynamicview_installed, has_metricfacade, FACET_BLACKLIST
+from ..utils import impact_installed, dynamicview_installed, FACET_BLACKLIST
 
 from ..gsm import get_gsm
 from ..functions import pluralize, get_symbol_name, relname_from_classname, \
     get_zenpack_path, ordered_values
 
 from ..base.Component import Component, HWComponent, Service
+from ..base.ComponentBase import get_property_coercers
 from ..base.Device import Device
 from ..zuul import schema_map
 
-from .Spec import Spec, DeviceInfoStatusProperty, \
+from .Spec import Spec, DeviceInfoStatusProperty, DatapointMethod, \
     RelationshipInfoProperty, RelationshipGetter, RelationshipSetter
 from .ClassPropertySpec import ClassPropertySpec
 from .ClassRelationshipSpec import ClassRelationshipSpec
 from .ImpactTriggerSpec import ImpactTriggerSpec
 
-DYNAMICVIEW_INSTALLED = dynamicview_installed()
-if DYNAMICVIEW_INSTALLED:
-    from ZenPacks.zenoss.DynamicView.interfaces import IRelatable, IRelationsProvider
-    from ZenPacks.zenoss.DynamicView.interfaces import IGroupMappingProvider
-    from ..dynamicview import DynamicViewRelatable, DynamicViewRelationsProvider, DynamicViewGroupMappingProvider
-
-IMPACT_INSTALLED = impact_installed()
-if IMPACT_INSTALLED:
-    from ZenPacks.zenoss.Impact.impactd.interfaces import IRelationshipDataProvider, INodeTriggers
-    from ..impact import ImpactRelationshipDataProvider
-    from ..base.BaseTriggers import BaseTriggers
-
-HAS_METRICFACADE = has_metricfacade()
-
 GSM = get_gsm()
 
 
@@ -108,6 +95,7 @@ class ClassSpec(Spec):
     _info_schema_class = None
     _info_class = None
     _formbuilder_class = None
+    cached_attributes = None
     _icon_url = None
     _datapoints_to_fetch = None
     _plumbed = False
@@ -316,49 +304,42 @@ class ClassSpec(Spec):
             self.dynamicview_relations = dict(dynamicview_relations)
 
         # Paths
-        self.path_pattern_streams = []
         if extra_paths is not None:
             self.extra_paths = extra_paths
-            for pattern_tuple in extra_paths:
-                # Each item in extra_paths is expressed as a tuple of
-                # regular expression patterns that are matched
-                # in order against the actual relationship path structure
-                # as it is traversed and built up get_facets.
-                #
-                # To facilitate matching, we construct a compiled set of
-                # regular expressions that can be matched against the
-                # entire path string, from root to leaf.
-                #
-                # So:
-                #
-                #   ('orgComponent', '(parentOrg)+')
-                # is transformed into a "pattern stream", which is a list
-                # of regexps that can be applied incrementally as we traverse
-                # the possible paths:
-                #   (re.compile(^orgComponent),
-                #    re.compile(^orgComponent/(parentOrg)+),
-                #    re.compile(^orgComponent/(parentOrg)+/?$')
-                #
-                # Once traversal embarks upon a stream, these patterns are
-                # matched in order as the traversal proceeds, with the
-                # first one to fail causing recursion to stop.
-                # When the final one is matched, then the objects on that
-                # relation are matched.  Note that the final one may
-                # match multiple times if recursive relationships are
-                # in play.
-
-                pattern_stream = []
-                for i, _ in enumerate(pattern_tuple, start=1):
-                    pattern = "^" + "/".join(pattern_tuple[0:i])
-                    # If we match these patterns, keep going.
-                    pattern_stream.append(re.compile(pattern))
-                if pattern_stream:
-                    # indicate that we've hit the end of the path.
-                    pattern_stream.append(re.compile("/?$"))
-
-                self.path_pattern_streams.append(pattern_stream)
+            # Each item in extra_paths is expressed as a tuple of
+            # regular expression patterns that are matched
+            # in order against the actual relationship path structure
+            # as it is traversed and built up get_facets.
+            #
+            # To facilitate matching, we construct a compiled set of
+            # regular expressions that can be matched against the
+            # entire path string, from root to leaf.
+            #
+            # So:
+            #
+            #   ('orgComponent', '(parentOrg)+')
+            # is transformed into a "pattern stream", which is a list
+            # of regexps that can be applied incrementally as we traverse
+            # the possible paths:
+            #   (re.compile(^orgComponent),
+            #    re.compile(^orgComponent/(parentOrg)+),
+            #    re.compile(^orgComponent/(parentOrg)+/?$')
+            #
+            # Once traversal embarks upon a stream, these patterns are
+            # matched in order as the traversal proceeds, with the
+            # first one to fail causing recursion to stop.
+            # When the final one is matched, then the objects on that
+            # relation are matched.  Note that the final one may
+            # match multiple times if recursive relationships are
+            # in play.
+            #
+            # The result of matching a path is remembered by the
+            # PathPatternStreams, so each path is only matched once.
+            self.path_pattern_streams = source_call(
+                PathPatternStreams.from_extra_paths, extra_paths)
         else:
             self.extra_paths = []
+            self.path_pattern_streams = PathPatternStreams()
 
     @property
     def scaled_order(self):
@@ -371,6 +352,7 @@ class ClassSpec(Spec):
             # if we don't have it, create our own copy
             if prop_name not in self.properties:
                 self.properties[prop_name] = copy.copy(prop_spec)
+                self.zenpack.class_hierarchy.invalidate()
                 this_prop_spec = self.properties[prop_name]
                 this_prop_spec.class_spec = self
 
@@ -405,6 +387,7 @@ class ClassSpec(Spec):
                     self.LOG.error("Removing invalid display config for relationship {} from  {}.{}".format(
                         relname, self.zenpack.name, self.name))
                     self.relationships.pop(relname)
+                    self.zenpack.class_hierarchy.invalidate()
                     continue
                 relationship.plumb()
             self._plumbed = True
@@ -428,6 +411,7 @@ class ClassSpec(Spec):
             # add if it's not already here
             if relname not in self.relationships:
                 self.relationships[relname] = found_rel
+                self.zenpack.class_hierarchy.invalidate()
             else:
                 # otherwise ensure it has a schema
                 if not self.relationships[relname].schema:
@@ -453,24 +437,17 @@ class ClassSpec(Spec):
 
     def get_base_specs(self, bases=None):
         '''Return ClassSpec bases in order of nearest proximity'''
+        ancestors = self.zenpack.class_hierarchy.ancestors(self.name)
         if not bases:
-            bases = []
-        for base in self.bases:
-            base_cls = self.zenpack.classes.get(base)
-            if not base_cls:
-                continue
+            return list(ancestors)
+        for base in ancestors:
             if base not in bases:
                 bases.append(base)
-            bases = base_cls.get_base_specs(bases)
         return bases
 
     def get_descendant_specs(self):
         """Return ClassSpec descendants of this class"""
-        descendents = []
-        for cls in self.zenpack.classes.values():
-            if self.name in cls.bases:
-                descendents.append(cls.name)
-        return descendents
+        return list(self.zenpack.class_hierarchy.children.get(self.name, ()))
 
     @property
     @memoize
@@ -516,12 +493,13 @@ class ClassSpec(Spec):
         return tuple(base_specs)
 
     def subclass_specs(self):
-        subclass_specs = []
-        for class_spec in self.zenpack.classes.values():
-            if self in class_spec.base_class_specs(recursive=True):
-                subclass_specs.append(class_spec)
+        """Return ClassSpecs with this class in base_class_specs(recursive=True)."""
+        hierarchy = self.zenpack.class_hierarchy
+        names = set(hierarchy.children.get(self.name, ()))
+        for name in list(names):
+            names.update(hierarchy.children[name])
 
-        return subclass_specs
+        return [self.zenpack.classes[x] for x in hierarchy.ordered(names)]
 
     @property
     def filter_hide_from_class_specs(self):
@@ -538,26 +516,12 @@ class ClassSpec(Spec):
         return specs
 
     def inherited_properties(self):
-        properties = {}
-        for base in self.bases:
-            if not isinstance(base, type):
-                class_spec = self.zenpack.classes[base]
-                properties.update(class_spec.inherited_properties())
-
-        properties.update(self.properties)
-
-        return properties
+        """Return shared {name: ClassPropertySpec} including inherited properties."""
+        return self.zenpack.class_hierarchy.inherited_properties(self.name)
 
     def inherited_relationships(self):
-        relationships = {}
-        for base in self.bases:
-            if not isinstance(base, type):
-                class_spec = self.zenpack.classes[base]
-                relationships.update(class_spec.inherited_relationships())
-
-        relationships.update(self.relationships)
-
-        return relationships
+        """Return shared {name: ClassRelationshipSpec} including inherited relationships."""
+        return self.zenpack.class_hierarchy.inherited_relationships(self.name)
 
     def is_a(self, type_):
         """Return True if this class is a subclass of type_."""
@@ -659,8 +623,77 @@ class ClassSpec(Spec):
             self._model_schema_class = self.create_model_schema_class()
         return self._model_schema_class
 
+    def get_class_attributes(self, kind, build):
+        """Return attributes of kind from the class cache or from build()."""
+        if self.cached_attributes and kind in self.cached_attributes:
+            return self.cached_attributes[kind]()
+        return build()
+
+    def get_class_cache_attributes(self):
+        """Return {kind: attributes} of this class for the class cache."""
+        return OrderedDict((
+            ('model', self.get_model_schema_attributes()),
+            ('iinfo', self.get_iinfo_schema_attributes()),
+            ('info', self.get_info_schema_attributes()),
+            ('formbuilder', self.get_formbuilder_attributes()),
+            ))
+
     def create_model_schema_class(self):
         """Create and return model schema class."""
+        attributes = self.get_class_attributes(
+            'model', self.get_model_schema_attributes)
+
+        properties = []
+        templates = []
+        device_catalogs = {}
+        global_catalogs = {}
+
+        # First inherit from bases.
+        for base in self.resolved_bases:
+            if hasattr(base, '_properties'):
+                properties.extend(base._properties)
+            if hasattr(base, '_templates'):
+                templates.extend(base._templates)
+            if hasattr(base, '_device_catalogs'):
+                device_catalogs.update(base._device_catalogs)
+            if hasattr(base, '_global_catalogs'):
+                global_catalogs.update(base._global_catalogs)
+
+        # Then add local properties, templates and catalog indexes.
+        properties.extend(attributes['_properties'])
+        templates.extend(attributes['_templates'])
+        for catalogs, local_catalogs in (
+                (device_catalogs, attributes['_device_catalogs']),
+                (global_catalogs, attributes['_global_catalogs'])):
+            for name, indexes in local_catalogs.iteritems():
+                catalogs[name] = dict(catalogs.get(name, {}), **indexes)
+
+        attributes['_properties'] = tuple(properties)
+        # Built once here so that ComponentBase.__setattr__ is a lookup.
+        attributes['_property_coercers'] = (
+            attributes['_properties'],
+            get_property_coercers(attributes['_properties']))
+        attributes['_templates'] = tuple(templates)
+        attributes['_device_catalogs'] = device_catalogs
+        attributes['_global_catalogs'] = global_catalogs
+
+        # Add link provider
+        attributes['link_providers'] = self.zenpack.link_providers
+
+        attributes['LOG'] = self.LOG
+        return self.create_schema_class(
+            self.schema_name,
+            self.name,
+            self.resolved_bases,
+            attributes)
+
+    def get_model_schema_attributes(self):
+        """Return model schema class attributes defined by this spec.
+
+        Properties, templates and catalogs inherited from bases are added
+        by create_model_schema_class.
+
+        """
         attributes = {
             'zenpack_name': self.zenpack.name,
             'meta_type': self.meta_type,
@@ -681,21 +714,9 @@ class ClassSpec(Spec):
 
         properties = []
         relations = []
-        templates = []
         device_catalogs = {}
         global_catalogs = {}
 
-        # First inherit from bases.
-        for base in self.resolved_bases:
-            if hasattr(base, '_properties'):
-                properties.extend(base._properties)
-            if hasattr(base, '_templates'):
-                templates.extend(base._templates)
-            if hasattr(base, '_device_catalogs'):
-                device_catalogs.update(base._device_catalogs)
-            if hasattr(base, '_global_catalogs'):
-                global_catalogs.update(base._global_catalogs)
-
         # Add local properties and catalog indexes.
         for name, spec in self.properties.iteritems():
             if spec.api_backendtype == 'property':
@@ -704,21 +725,10 @@ class ClassSpec(Spec):
 
             elif spec.datapoint:
                 # Provide a method to look up the datapoint and get the value from rrd
-                def datapoint_method(self, default=spec.datapoint_default, cached=spec.datapoint_cached, datapoint=spec.datapoint):
-                    if cached:
-                        r = self.cacheRRDValue(datapoint, default=default)
-                    else:
-                        if HAS_METRICFACADE:
-                            r = self.getFetchedDataPoint(datapoint)
-                        else:
-                            r = self.getRRDValue(datapoint, start=time.time() - 1800)
-
-                    if r is not None:
-                        if not math.isnan(float(r)):
-                            return r
-                    return default
-
-                attributes[name] = datapoint_method
+                attributes[name] = DatapointMethod(
+                    spec.datapoint,
+                    default=spec.datapoint_default,
+                    cached=spec.datapoint_cached)
 
             else:
                 # api backendtype is 'method', and it is assumed that this
@@ -738,16 +748,10 @@ class ClassSpec(Spec):
                 index_type = index_spec.get('type', 'field')
 
                 if index_scope in ('both', 'device'):
-                    if self.name in device_catalogs:
-                        device_catalogs[self.name][index_name] = index_type
-                    else:
-                        device_catalogs[self.name] = {index_name: index_type}
+                    device_catalogs.setdefault(self.name, {})[index_name] = index_type
 
                 if index_scope in ('both', 'global'):
-                    if self.name in global_catalogs:
-                        global_catalogs[self.name][index_name] = index_type
-                    else:
-                        global_catalogs[self.name] = {index_name: index_type}
+                    global_catalogs.setdefault(self.name, {})[index_name] = index_type
 
         # Add local relations.
         for name, spec in self.relationships.iteritems():
@@ -759,12 +763,9 @@ class ClassSpec(Spec):
             attributes['get_{}'.format(name)] = RelationshipGetter(name)
             attributes['set_{}'.format(name)] = RelationshipSetter(name)
 
-        # Add local templates.
-        templates.extend(self.monitoring_templates)
-
         attributes['_properties'] = tuple(properties)
         attributes['_v_local_relations'] = tuple(relations)
-        attributes['_templates'] = tuple(templates)
+        attributes['_templates'] = tuple(self.monitoring_templates)
         attributes['_device_catalogs'] = device_catalogs
         attributes['_global_catalogs'] = global_catalogs
 
@@ -775,20 +776,11 @@ class ClassSpec(Spec):
 
         attributes['dynamicview_relations'] = self.dynamicview_relations
 
-        # Add link provider
-        attributes['link_providers'] = self.zenpack.link_providers
-
         # And facet patterns.
         if self.path_pattern_streams:
             attributes['_v_path_pattern_streams'] = self.path_pattern_streams
 
-        attributes['LOG'] = self.LOG
-        return self.create_schema_class(
-            self.schema_name,
-            self.name,
-            self.resolved_bases,
-            attributes)
-
+        return attributes
 
     @property
     def model_class(self):
@@ -821,6 +813,14 @@ class ClassSpec(Spec):
         if not bases:
             bases = [self.get_interfaces_base()]
 
+        return self.create_schema_class(
+            self.schema_name,
+            'I{}Info'.format(self.name),
+            tuple(bases),
+            self.get_class_attributes('iinfo', self.get_iinfo_schema_attributes))
+
+    def get_iinfo_schema_attributes(self):
+        """Return I<name>Info schema class attributes."""
         attributes = {}
 
         for spec in self.inherited_properties().itervalues():
@@ -832,7 +832,8 @@ class ClassSpec(Spec):
             if relspec and not relspec.details_display:
                 continue
 
-            attributes[relname] = schema.Entity(
+            attributes[relname] = source_call(
+                schema.Entity,
                 title=_t(spec.label),
                 group="Overview",
                 order=3 + i / 100.0)
@@ -840,11 +841,7 @@ class ClassSpec(Spec):
         for spec in self.inherited_relationships().itervalues():
             attributes.update(spec.iinfo_schemas)
 
-        return self.create_schema_class(
-            self.schema_name,
-            'I{}Info'.format(self.name),
-            tuple(bases),
-            attributes)
+        return attributes
 
     @property
     def iinfo_class(self):
@@ -874,13 +871,23 @@ class ClassSpec(Spec):
             if base_classname in self.zenpack.classes:
                 bases.append(self.zenpack.classes[base_classname].info_class)
 
-        attributes = {}
-
         if not bases:
             bases = [self.get_info_base()]
-            if self.is_device:
-                # Override how status is determined for devices.
-                attributes["status"] = DeviceInfoStatusProperty()
+
+        return self.create_schema_class(
+            self.schema_name,
+            '{}Info'.format(self.name),
+            tuple(bases),
+            self.get_class_attributes('info', self.get_info_schema_attributes))
+
+    def get_info_schema_attributes(self):
+        """Return <name>Info schema class attributes."""
+        attributes = {}
+
+        if self.is_device and not any(
+                x in self.zenpack.classes for x in self.bases):
+            # Override how status is determined for devices.
+            attributes["status"] = DeviceInfoStatusProperty()
 
         attributes.update({
             'class_label': ProxyProperty('class_label'),
@@ -904,11 +911,7 @@ class ClassSpec(Spec):
 
         attributes['dataPointsToFetch'] = self.datapoints_to_fetch
 
-        return self.create_schema_class(
-            self.schema_name,
-            '{}Info'.format(self.name),
-            tuple(bases),
-            attributes)
+        return attributes
 
     @property
     def info_class(self):
@@ -939,7 +942,19 @@ class ClassSpec(Spec):
         Includes rendering hints for ComponentFormBuilder.
 
         """
-        bases = (ComponentFormBuilder,)
+        formbuilder = self.create_class(
+            self.symbol_name,
+            self.schema_name,
+            '{}FormBuilder'.format(self.name),
+            (ComponentFormBuilder,),
+            self.get_class_attributes('formbuilder', self.get_formbuilder_attributes))
+
+        classImplements(formbuilder, IFormBuilder)
+
+        return formbuilder
+
+    def get_formbuilder_attributes(self):
+        """Return FormBuilder subclass attributes."""
         attributes = {}
         renderer = {}
 
@@ -955,16 +970,7 @@ class ClassSpec(Spec):
         attributes['renderer'] = renderer
         attributes['zenpack_id_prefix'] = self.zenpack.id_prefix
 
-        formbuilder = self.create_class(
-            self.symbol_name,
-            self.schema_name,
-            '{}FormBuilder'.format(self.name),
-            tuple(bases),
-            attributes)
-
-        classImplements(formbuilder, IFormBuilder)
-
-        return formbuilder
+        return attributes
 
     def create_registered(self):
         GSM.registerAdapter(self.info_class, (self.model_class,), self.iinfo_class)
@@ -976,12 +982,17 @@ class ClassSpec(Spec):
         self.register_impact_adapters()
 
     def register_dynamicview_adapters(self):
-        if not DYNAMICVIEW_INSTALLED:
+        # DynamicView is only imported once a class needs its adapters.
+        if not self.dynamicview_views:
             return
 
-        if not self.dynamicview_views:
+        if not dynamicview_installed():
             return
 
+        from ZenPacks.zenoss.DynamicView.interfaces import IRelatable, IRelationsProvider
+        from ZenPacks.zenoss.DynamicView.interfaces import IGroupMappingProvider
+        from ..dynamicview import DynamicViewRelatable, DynamicViewRelationsProvider, DynamicViewGroupMappingProvider
+
         GSM.registerAdapter(
             DynamicViewRelatable,
             (self.model_class,),
@@ -1000,9 +1011,17 @@ class ClassSpec(Spec):
     def register_impact_adapters(self):
         """Register Impact adapters."""
 
-        if not IMPACT_INSTALLED:
+        # Impact is only imported once a class needs its adapters.
+        if not (self.impacts or self.impacted_by or self.impact_triggers):
             return
 
+        if not impact_installed():
+            return
+
+        from ZenPacks.zenoss.Impact.impactd.interfaces import IRelationshipDataProvider, INodeTriggers
+        from ..impact import ImpactRelationshipDataProvider
+        from ..base.BaseTriggers import BaseTriggers
+
         if self.impacts or self.impacted_by:
             GSM.registerSubscriptionAdapter(
                 ImpactRelationshipDataProvider,
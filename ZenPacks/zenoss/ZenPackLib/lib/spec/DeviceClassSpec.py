@@ -67,9 +67,9 @@ class DeviceClassSpec(OrganizerSpec):
         """Return the root object for this organizer."""
         return dmd.Devices
 
-    def create_organizer(self, dmd):
+    def create_organizer(self, dmd, organizer=None):
         """Return existing or new device class organizer"""
-        dc_org = super(DeviceClassSpec, self).create_organizer(dmd)
+        dc_org = super(DeviceClassSpec, self).create_organizer(dmd, organizer)
         if not dc_org:
             return
         self.register_devtype(dc_org)
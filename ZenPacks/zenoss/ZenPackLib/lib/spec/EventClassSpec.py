@@ -63,9 +63,9 @@ class EventClassSpec(OrganizerSpec):
         self.mappings = self.specs_from_param(
             EventClassMappingSpec, 'mappings', mappings, zplog=self.LOG)
 
-    def create_organizer(self, dmd):
+    def create_organizer(self, dmd, organizer=None):
         """Return existing or new event class organizer"""
-        ec_org = super(EventClassSpec, self).create_organizer(dmd)
+        ec_org = super(EventClassSpec, self).create_organizer(dmd, organizer)
         if not ec_org:
             return
 
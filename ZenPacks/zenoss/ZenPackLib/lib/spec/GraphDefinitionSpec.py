@@ -86,7 +86,26 @@ class GraphDefinitionSpec(Spec):
     def create(self, templatespec, template, sequence=None):
         graph = template.manage_addGraphDefinition(self.name)
         self.speclog.debug("adding graph")
+        self.apply_to(graph, sequence=sequence)
 
+        graphpoint_sequence = 0
+        if self.comments:
+            self.speclog.debug("adding {} comments".format(len(self.comments)))
+            for comment_text in self.comments:
+                graphpoint_sequence += 1
+                comment = graph.createGraphPoint(
+                    CommentGraphPoint,
+                    'comment-{}'.format(graphpoint_sequence))
+
+                comment.text = comment_text
+
+        self.speclog.debug("adding {} graphpoints".format(len(self.graphpoints)))
+        for graphpoint_id, graphpoint_spec in self.graphpoints.items():
+            graphpoint_sequence += 1
+            graphpoint_spec.create(self, graph, sequence=graphpoint_sequence)
+
+    def apply_to(self, graph, sequence=None):
+        """Set the properties of this spec on graph. Graph points aren't added."""
         if sequence:
             graph.sequence = sequence
         if self.description is not None:
@@ -109,19 +128,3 @@ class GraphDefinitionSpec(Spec):
             graph.custom = self.custom
         if self.hasSummary is not None:
             graph.hasSummary = self.hasSummary
-
-        graphpoint_sequence = 0
-        if self.comments:
-            self.speclog.debug("adding {} comments".format(len(self.comments)))
-            for comment_text in self.comments:
-                graphpoint_sequence += 1
-                comment = graph.createGraphPoint(
-                    CommentGraphPoint,
-                    'comment-{}'.format(graphpoint_sequence))
-
-                comment.text = comment_text
-
-        self.speclog.debug("adding {} graphpoints".format(len(self.graphpoints)))
-        for graphpoint_id, graphpoint_spec in self.graphpoints.items():
-            graphpoint_sequence += 1
-            graphpoint_spec.create(self, graph, sequence=graphpoint_sequence)
@@ -140,6 +140,15 @@ class GraphPointSpec(Spec):
         type_ = GRAPHPOINT_TYPES.get(self.type_, 'DataPointGraphPoint')
         graphpoint = graph.createGraphPoint(type_, self.name)
         self.speclog.debug("adding graphpoint")
+        self.apply_to(graphpoint, sequence=sequence)
+
+        if self.includeThresholds:
+            self.apply_threshold_legends(
+                graph.addThresholdsForDataPoint(self.dpName))
+
+    def apply_to(self, graphpoint, sequence=None):
+        """Set the properties of this spec on graphpoint."""
+        type_ = GRAPHPOINT_TYPES.get(self.type_, 'DataPointGraphPoint')
 
         if self.dpName:
             graphpoint.dpName = self.dpName
@@ -157,15 +166,15 @@ class GraphPointSpec(Spec):
                 else:
                     raise ValueError("%s is not a valid property for graphoint of type %s" % (param, type_))
 
-        if self.includeThresholds:
-            thresh_gps = graph.addThresholdsForDataPoint(self.dpName)
-            for thresh_gp in thresh_gps:
-                entry = self.thresholdLegends.get(thresh_gp.id)
-                if not entry:
-                    continue
-                legend = entry.get('legend')
-                color = entry.get('color')
-                if legend:
-                    thresh_gp.legend = legend
-                if color:
-                    thresh_gp.color = str(color)
+    def apply_threshold_legends(self, thresh_gps):
+        """Set thresholdLegends on threshold graph points added for this one."""
+        for thresh_gp in thresh_gps:
+            entry = self.thresholdLegends.get(thresh_gp.id)
+            if not entry:
+                continue
+            legend = entry.get('legend')
+            color = entry.get('color')
+            if legend:
+                thresh_gp.legend = legend
+            if color:
+                thresh_gp.color = str(color)
@@ -76,24 +76,31 @@ class OrganizerSpec(Spec):
             if organizer.getOrganizerName().lstrip("/") == self.path:
                 return organizer
 
-    def create_organizer(self, dmd):
-        """Return organizer whether existing or new"""
-        org_obj = self.get_organizer(dmd)
+    def create_organizer(self, dmd, organizer=None):
+        """Return organizer whether existing or new
+
+        organizer is the existing organizer, if the caller already looked
+        it up.
+        """
+        org_obj = organizer
+        if org_obj is None:
+            org_obj = self.get_organizer(dmd)
 
         if org_obj:
             if self.reset:
-                self.set_zproperties(dmd)
+                self.set_zproperties(dmd, org_obj)
         else:
             if self.create:
                 org_obj = self.get_root(dmd).createOrganizer(self.path)
                 org_obj.zpl_managed = True
-                self.set_zproperties(dmd)
+                self.set_zproperties(dmd, org_obj)
 
         return org_obj
 
-    def set_zproperties(self, dmd):
+    def set_zproperties(self, dmd, org_obj=None):
         """Set zProperties on a given Organizer according to the Spec"""
-        org_obj = self.get_organizer(dmd)
+        if org_obj is None:
+            org_obj = self.get_organizer(dmd)
         for zprop, value in self.zProperties.iteritems():
             if org_obj.getPropertyType(zprop) is None and org_obj.getProperty(zprop) is None:
                 self.LOG.error(
@@ -58,9 +58,9 @@ class ProcessClassOrganizerSpec(OrganizerSpec):
         self.process_classes = self.specs_from_param(
             ProcessClassSpec, 'process_classes', process_classes, zplog=self.LOG)
 
-    def create_organizer(self, dmd):
+    def create_organizer(self, dmd, organizer=None):
         """Return existing or new process class organizer"""
-        ps_org = super(ProcessClassOrganizerSpec, self).create_organizer(dmd)
+        ps_org = super(ProcessClassOrganizerSpec, self).create_organizer(dmd, organizer)
         if not ps_org:
             return
 
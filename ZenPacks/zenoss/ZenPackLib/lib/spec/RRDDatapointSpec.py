@@ -212,8 +212,19 @@ class RRDDatapointSpec(Spec):
 
     def create(self, datasource_spec, datasource):
         datapoint = datasource.manage_addRRDDataPoint(self.name)
+        self.speclog.debug("adding datapoint of type {}".format(
+            datapoint.__class__.__name__))
+        self.apply_to(datapoint)
+
+        self.speclog.debug("adding {} aliases".format(len(self.aliases)))
+        for alias_id, formula in self.aliases.items():
+            datapoint.addAlias(alias_id, formula)
+            self.speclog.debug("adding alias".format(alias_id))
+            self.speclog.debug("formula = {}".format(formula))
+
+    def apply_to(self, datapoint):
+        """Set the properties of this spec on datapoint. Aliases aren't added."""
         type_ = datapoint.__class__.__name__
-        self.speclog.debug("adding datapoint of type {}".format(type_))
 
         if self.rrdtype is not None:
             datapoint.rrdtype = self.rrdtype
@@ -233,9 +244,3 @@ class RRDDatapointSpec(Spec):
                     setattr(datapoint, param, value)
                 else:
                     raise ValueError("%s is not a valid property for datapoint of type %s" % (param, type_))
-
-        self.speclog.debug("adding {} aliases".format(len(self.aliases)))
-        for alias_id, formula in self.aliases.items():
-            datapoint.addAlias(alias_id, formula)
-            self.speclog.debug("adding alias".format(alias_id))
-            self.speclog.debug("formula = {}".format(formula))
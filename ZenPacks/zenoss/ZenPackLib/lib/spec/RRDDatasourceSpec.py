@@ -89,7 +89,19 @@ class RRDDatasourceSpec(Spec):
 
         datasource = template.manage_addRRDDataSource(self.name, type_)
         self.speclog.debug("adding datasource")
+        self.apply_to(datasource, type_)
 
+        self.speclog.debug("adding {} datapoints".format(len(self.datapoints)))
+        for datapoint_id, datapoint_spec in self.datapoints.items():
+            datapoint_spec.create(self, datasource)
+
+    def apply_to(self, datasource, type_):
+        """Set the properties of this spec on datasource of type_.
+
+        type_ is the datasource option, such as BasicDataSource.SNMP.
+        Datapoints aren't added.
+
+        """
         if self.enabled is not None:
             datasource.enabled = self.enabled
         if self.component is not None:
@@ -114,7 +126,3 @@ class RRDDatasourceSpec(Spec):
                         setattr(datasource, param, value)
                 else:
                     raise ValueError("%s is not a valid property for datasource of type %s" % (param, type_))
-
-        self.speclog.debug("adding {} datapoints".format(len(self.datapoints)))
-        for datapoint_id, datapoint_spec in self.datapoints.items():
-            datapoint_spec.create(self, datasource)
@@ -136,10 +136,7 @@ class RRDTemplateSpec(Spec):
         if not existing_template:
             self.speclog.debug("adding template")
 
-        if self.targetPythonClass is not None:
-            template.targetPythonClass = self.targetPythonClass
-        if self.description is not None:
-            template.description = self.description
+        self.apply_to(template)
 
         self.speclog.debug("adding {} thresholds".format(len(self.thresholds)))
         for threshold_id, threshold_spec in self.thresholds.items():
@@ -156,6 +153,44 @@ class RRDTemplateSpec(Spec):
         if not addToZenPack:
             return template
 
+    def apply_to(self, template):
+        """Set the properties of this spec on template. Contents aren't added."""
+        if self.targetPythonClass is not None:
+            template.targetPythonClass = self.targetPythonClass
+        if self.description is not None:
+            template.description = self.description
+
+    def reconcile(self, dmd, addToZenPack=True, id=None):
+        """Update existing template in place to match this spec.
+
+        Unlike create, the template isn't deleted and created again. Only
+        the objects that differ from the spec are added, removed or
+        updated. The template is created if it doesn't exist.
+
+        Return TemplateEdits with the counts of edits made.
+        """
+        from ..helpers.TemplateDiff import TemplateEdits, TemplateReconciler
+
+        device_class = dmd.Devices.createOrganizer(self.deviceclass_spec.path)
+        t_id = id or self.name
+
+        template = device_class.rrdTemplates._getOb(t_id, None)
+        if not template:
+            self.create(dmd, addToZenPack, id)
+            edits = TemplateEdits()
+            edits.add('template', 'added')
+            return edits
+
+        self.speclog.debug("reconciling template")
+        template.zpl_managed = True
+        if addToZenPack and not template.pack():
+            zenpack_name = self.deviceclass_spec.zenpack_spec.name
+            template.addToZenPack(pack=zenpack_name)
+
+        edits = TemplateReconciler(self, template).run()
+        self.speclog.debug("reconciled template ({})".format(edits))
+        return edits
+
     def remove(self, dmd, id=None):
         device_class = self.deviceclass_spec.get_organizer(dmd)
         if not device_class:
@@ -71,10 +71,7 @@ class RRDThresholdSpec(Spec):
         if self.dsnames is None:
             raise ValueError("%s: threshold has no dsnames attribute", self)
 
-        # Shorthand for datapoints that have the same name as their datasource.
-        for i, dsname in enumerate(self.dsnames):
-            if '_' not in dsname:
-                self.dsnames[i] = '_'.join((dsname, dsname))
+        self.normalize_dsnames()
 
         threshold_types = dict((y, x) for x, y in template.getThresholdClasses())
         type_ = threshold_types.get(self.type_)
@@ -88,8 +85,20 @@ class RRDThresholdSpec(Spec):
 
         threshold = template.manage_addRRDThreshold(self.name, self.type_)
         self.speclog.debug("adding threshold")
+        self.apply_to(threshold)
+
+    def normalize_dsnames(self):
+        """Expand shorthand for datapoints named like their datasource."""
+        for i, dsname in enumerate(self.dsnames):
+            if '_' not in dsname:
+                self.dsnames[i] = '_'.join((dsname, dsname))
+
+    def apply_to(self, threshold):
+        """Set the properties of this spec on threshold."""
+        type_ = threshold.__class__
 
         if self.dsnames is not None:
+            self.normalize_dsnames()
             threshold.dsnames = self.dsnames
         if self.eventClass is not None:
             threshold.eventClass = self.eventClass
@@ -122,6 +122,7 @@ class RelationshipSchemaSpec(Spec):
             else:
                 spec.relationships[relname] = ClassRelationshipSpec(spec, relname, schema)
                 spec.relationships[relname].remote_spec = remote_spec
+                self.zenpack_spec.class_hierarchy.invalidate()
         # if ClassSpec doesn't exist, then we are modifying an imported class
         else:
             kls = self.zenpack_spec.imported_classes.get(classname)
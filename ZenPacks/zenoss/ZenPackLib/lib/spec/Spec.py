@@ -7,7 +7,9 @@
 #
 ##############################################################################
 import inspect
+import math
 import re
+import time
 import logging
 import itertools
 import operator
@@ -22,10 +24,20 @@ from zope.interface.interface import InterfaceClass
 from Products.Zuul.interfaces import IInfo
 
 from ..functions import fix_kwargs, create_module
+from ..utils import has_metricfacade
 from ..helpers.ZenPackLibLog import DEFAULTLOG
+from ..helpers.ClassCache import source_factory
+from ..helpers.DatapointBatch import DATAPOINT_CACHE, MISSING
 from ..base.ClassProperty import ClassProperty
 
 
+# Parameter definitions in the docstring of Spec.__init__ methods.
+INIT_PARAMS_DOC = re.compile(
+    "^\s*:(type|param|yaml_param|yaml_block_style)\s+(\S+):\s*(.*)$",
+    re.MULTILINE)
+
+
+@source_factory
 def MethodInfoProperty(method_name, entity=False, enum=None):
     """Return a property with the Infos for object(s) returned by a method.
 
@@ -55,6 +67,7 @@ def MethodInfoProperty(method_name, entity=False, enum=None):
 
     return property(getter)
 
+@source_factory
 def EnumInfoProperty(data, enum):
     """Return a property filtered via an enum."""
     def getter(self, data, enum):
@@ -70,6 +83,7 @@ def EnumInfoProperty(data, enum):
 
     return property(lambda x: getter(x, data, enum))
 
+@source_factory
 def DeviceInfoStatusProperty():
     """Return property for DeviceBaseInfo.status."""
     def getter(self):
@@ -78,6 +92,34 @@ def DeviceInfoStatusProperty():
 
     return property(getter)
 
+@source_factory
+def DatapointMethod(datapoint, default=None, cached=True):
+    """Return method returning the latest value of datapoint or default.
+
+    Values prefetched by prefetch_datapoints for the current request are
+    used when available.
+
+    """
+    metricfacade = has_metricfacade()
+
+    def datapoint_method(self, default=default, cached=cached, datapoint=datapoint):
+        r = DATAPOINT_CACHE.get(self, datapoint)
+        if r is MISSING:
+            if cached:
+                r = self.cacheRRDValue(datapoint, default=default)
+            elif metricfacade:
+                r = self.getFetchedDataPoint(datapoint)
+            else:
+                r = self.getRRDValue(datapoint, start=time.time() - 1800)
+
+        if r is not None:
+            if not math.isnan(float(r)):
+                return r
+        return default
+
+    return datapoint_method
+
+@source_factory
 def RelationshipGetter(relationship_name):
     """Return getter for id or ids in relationship_name."""
     def getter(self):
@@ -95,12 +137,21 @@ def RelationshipGetter(relationship_name):
 
     return getter
 
+@source_factory
 def RelationshipSetter(relationship_name):
-    """Return setter for id or ides in relationship_name."""
-    def setter(self, id_or_ids):
+    """Return setter for id or ides in relationship_name.
+
+    If a RelationshipBatch is given as batch, the update is queued on it
+    instead of being applied immediately.
+
+    """
+    def setter(self, id_or_ids, batch=None):
         try:
             relationship = getattr(self, relationship_name)
-            if isinstance(relationship, ToManyRelationship):
+            if batch is not None:
+                if isinstance(relationship, (ToManyRelationship, ToOneRelationship)):
+                    batch.set_ids(self, relationship, id_or_ids)
+            elif isinstance(relationship, ToManyRelationship):
                 self.setIdsInRelationship(relationship, id_or_ids)
             elif isinstance(relationship, ToOneRelationship):
                 self.setIdForRelationship(relationship, id_or_ids)
@@ -112,6 +163,7 @@ def RelationshipSetter(relationship_name):
 
     return setter
 
+@source_factory
 def RelationshipInfoProperty(relationship_name):
     """Return a property with the Infos for object(s) in the relationship.
 
@@ -128,6 +180,7 @@ def RelationshipInfoProperty(relationship_name):
 
     return property(getter)
 
+@source_factory
 def RelationshipLengthProperty(relationship_name):
     """Return a property representing number of objects in relationship."""
     def getter(self):
@@ -295,11 +348,7 @@ class Spec(object):
             defaults = {}
 
         params = OrderedDict()
-        for op, param, value in re.findall(
-            "^\s*:(type|param|yaml_param|yaml_block_style)\s+(\S+):\s*(.*)$",
-            cls.__init__.__doc__,
-            flags=re.MULTILINE
-        ):
+        for op, param, value in INIT_PARAMS_DOC.findall(cls.__init__.__doc__):
             if param not in params:
                 params[param] = {'description': None,
                                  'type': None,
@@ -8,6 +8,7 @@
 ##############################################################################
 import os
 import collections
+import hashlib
 import importlib
 import inspect
 import operator
@@ -15,14 +16,16 @@ import types
 from Products.Five import zcml
 from Products.ZenUtils.Utils import monkeypatch
 from Products.Zuul.routers.device import DeviceRouter
-from zope.publisher.interfaces.browser import IDefaultBrowserLayer
-from zope.viewlet.interfaces import IViewlet
-from zope.browser.interfaces import IBrowserView
-from Products.ZenUI3.browser.interfaces import IMainSnippetManager
 from Products.ZenModel.interfaces import IExpandedLinkProvider
-from Products.ZenUI3.utils.javascript import JavaScriptSnippet
 from ..utils import dynamicview_installed
 from ..functions import get_symbol_name, get_zenpack_path
+from ..helpers.ClassHierarchy import ClassHierarchy
+from ..helpers.DatapointBatch import patch_bulk_metric_loading
+from ..helpers.ClassCache import class_cache_enabled, load_class_cache, \
+    write_class_cache, get_class_cache_path, update_source_digest
+from ..helpers.JSBundle import JS_BUNDLE_NAMES, JS_BUNDLE_WEIGHTS, \
+    js_bundle_enabled, load_js_bundle, write_js_bundle, get_js_bundle_path, \
+    register_js_bundle
 from ..resources.templates import JS_LINK_FROM_GRID
 from ..gsm import get_gsm
 from ..base.Device import Device
@@ -37,8 +40,6 @@ from .ProcessClassOrganizerSpec import ProcessClassOrganizerSpec
 from .LinkProviderSpec import LinkProviderSpec
 from ..links import DeviceLinkProvider
 
-DYNAMICVIEW_INSTALLED = dynamicview_installed()
-
 GSM = get_gsm()
 
 
@@ -95,7 +96,11 @@ class ZenPackSpec(Spec):
     _device_js_snippet = None
     _dynamicview_nav_js_snippet = None
     _zenpack_module = None
+    _class_hierarchy = None
     imported_classes = {}
+    spec_hash = None
+    js_bundles = None
+    created = False
 
     def __init__(
             self,
@@ -219,6 +224,14 @@ class ZenPackSpec(Spec):
             class_.update_inherited_relation_parameters()
             class_.plumb_class_relations()
 
+    @property
+    def class_hierarchy(self):
+        """Return ClassHierarchy index of classes."""
+        hierarchy = self._class_hierarchy
+        if hierarchy is None or not hierarchy.is_current(self.classes):
+            hierarchy = self._class_hierarchy = ClassHierarchy(self.classes)
+        return hierarchy
+
     @property
     def ordered_classes(self):
         """Return ordered list of ClassSpec instances."""
@@ -228,24 +241,160 @@ class ZenPackSpec(Spec):
 
     def create(self):
         """Implement specification."""
+        # Specs may have been changed since inherited maps were merged.
+        self.class_hierarchy.invalidate()
+
         self.create_zenpack_class()
 
         for spec in self.zProperties.itervalues():
             spec.create()
 
+        update_class_cache = self.use_class_cache()
+
         for spec in self.classes.itervalues():
             schema = spec.model_schema_class
 
         for spec in self.classes.itervalues():
             spec.create_registered()
 
+        if update_class_cache:
+            self.update_class_cache()
+
         self.create_product_names()
         self.create_ordered_component_tree()
-        self.create_global_js_snippet()
-        self.create_device_js_snippet()
+        if not self.use_js_bundle():
+            self.create_global_js_snippet()
+            self.create_device_js_snippet()
         self.register_browser_resources()
+        self.register_js_bundles()
         self.apply_platform_patches()
         self.register_link_providers()
+        self.created = True
+
+    @property
+    def class_cache_hash(self):
+        """Return hash of everything cached class attributes depend on.
+
+        That's the spec as loaded from YAML, the meta_type of imported
+        classes this ZenPack's classes have relationships with, and the
+        source files of those classes and of imported base classes.
+
+        Returns None once the spec has been created. It may have been
+        changed since it was loaded, such as by the ZenPack's __init__.py
+        before creating it again, and the hash wouldn't cover that.
+
+        """
+        if not self.spec_hash or self.created:
+            return None
+
+        remote_classes = set(
+            relationship.schema.remoteClass
+            for spec in self.classes.itervalues()
+            for relationship in spec.relationships.itervalues()
+            if relationship.schema)
+
+        imported = []
+        digest = hashlib.sha1(self.spec_hash)
+        for classname in sorted(remote_classes):
+            kls = self.imported_classes.get(classname)
+            if kls:
+                digest.update('\0{}\0{}'.format(
+                    classname, getattr(kls, 'meta_type', '')))
+                imported.append(kls)
+
+        for spec in self.classes.itervalues():
+            imported.extend(x for x in spec.bases if isinstance(x, type))
+
+        update_source_digest(digest, imported)
+        return digest.hexdigest()
+
+    def use_class_cache(self):
+        """Use class cache for class attributes if it matches this spec.
+
+        Returns True if the class cache is enabled, but missing or
+        outdated, so it should be updated once the classes are created.
+
+        """
+        if not class_cache_enabled():
+            return False
+
+        spec_hash = self.class_cache_hash
+        if not spec_hash:
+            for spec in self.classes.itervalues():
+                spec.cached_attributes = None
+            return False
+
+        attributes = load_class_cache(get_class_cache_path(self.name), spec_hash)
+        if attributes is None:
+            self.LOG.debug("Class cache doesn't match spec, building classes")
+            return True
+
+        for name, spec in self.classes.iteritems():
+            spec.cached_attributes = attributes.get(name)
+
+        return False
+
+    def update_class_cache(self):
+        """Write class attributes to the class cache module."""
+        write_class_cache(
+            get_class_cache_path(self.name),
+            self.class_cache_hash,
+            collections.OrderedDict(
+                (name, spec.get_class_cache_attributes())
+                for name, spec in self.classes.iteritems()))
+
+    @property
+    def js_bundle_hash(self):
+        """Return hash of everything JavaScript bundles depend on.
+
+        That's what class attributes depend on, and whether DynamicView
+        is installed.
+
+        """
+        spec_hash = self.class_cache_hash
+        if not spec_hash:
+            return None
+
+        return hashlib.sha1('{}\0dynamicview={}'.format(
+            spec_hash, dynamicview_installed())).hexdigest()
+
+    def use_js_bundle(self):
+        """Use JavaScript bundles instead of inline snippets if enabled.
+
+        Bundles matching this spec are reused. Otherwise the snippets are
+        generated and written as new bundles. Returns True if bundles are
+        available, and False if snippets should be created as before.
+
+        Bundles are never used once the spec has been created, because
+        js_bundle_hash doesn't cover changes made to it since.
+
+        """
+        self.js_bundles = None
+        if not js_bundle_enabled():
+            return False
+
+        spec_hash = self.js_bundle_hash
+        if not spec_hash:
+            return False
+
+        path = get_js_bundle_path(self.name)
+        bundles = load_js_bundle(path, spec_hash)
+        if bundles is None:
+            self.LOG.debug("JavaScript bundles don't match spec, generating them")
+            bundles = write_js_bundle(path, spec_hash, {
+                'global': self.global_js_snippet,
+                'device': self.device_js_snippet,
+                })
+
+        if bundles is None:
+            return False
+
+        for filename in bundles.itervalues():
+            if filename:
+                register_js_bundle(path, filename)
+
+        self.js_bundles = bundles
+        return True
 
     def register_link_providers(self):
         if not self.link_providers:
@@ -372,9 +521,68 @@ class ZenPackSpec(Spec):
                     directory=resource_path,
                     directives=''.join(directives)))
 
+    def register_js_bundles(self):
+        """Register views serving JavaScript bundles and viewlets loading them.
+
+        Bundles are loaded after the platform's JavaScript, and before
+        the ZenPack's own JavaScript resources. See JS_BUNDLE_WEIGHTS.
+
+        """
+        if not self.js_bundles:
+            return
+
+        targets = {
+            'global': ['*'],
+            'device': [
+                '{}.{}'.format(x.__module__, x.__name__)
+                for x in self.get_device_js_classes()],
+            }
+
+        directives = []
+        for name in JS_BUNDLE_NAMES:
+            filename = self.js_bundles.get(name)
+            if not filename:
+                continue
+
+            directives.append(
+                '<page'
+                '    name="{filename}"'
+                '    for="*"'
+                '    class="ZenPacks.zenoss.ZenPackLib.lib.helpers.JSBundle.JSBundleView"'
+                '    permission="zope.Public"'
+                '    />'
+                .format(filename=filename))
+
+            for for_ in targets[name]:
+                directives.append(
+                    '<viewlet'
+                    '    name="js-{zenpack_name}-zpl-{name}"'
+                    '    paths="/@@{filename}"'
+                    '    for="{for_}"'
+                    '    weight="{weight}"'
+                    '    manager="Products.ZenUI3.browser.interfaces.IJavaScriptSrcManager"'
+                    '    class="Products.ZenUI3.browser.javascript.JavaScriptSrcBundleViewlet"'
+                    '    permission="zope.Public"'
+                    '    />'
+                    .format(
+                        name=name,
+                        filename=filename,
+                        for_=for_,
+                        weight=JS_BUNDLE_WEIGHTS[name],
+                        zenpack_name=self.name))
+
+        zcml.load_string(
+            '<configure xmlns="http://namespaces.zope.org/browser">'
+            '<include package="Products.Five" file="meta.zcml"/>'
+            '<include package="Products.Five.viewlet" file="meta.zcml"/>'
+            '{directives}'
+            '</configure>'
+            .format(directives=''.join(directives)))
+
     def apply_platform_patches(self):
         """Apply necessary patches to platform code."""
         self.apply_zen21467_patch()
+        patch_bulk_metric_loading()
 
     def apply_zen21467_patch(self):
         """Patch cause of ZEN-21467 issue.
@@ -395,6 +603,13 @@ class ZenPackSpec(Spec):
 
     def create_js_snippet(self, name, snippet, classes=None):
         """Create, register and return JavaScript snippet for given classes."""
+        # The UI machinery is only imported once a snippet is created.
+        from zope.publisher.interfaces.browser import IDefaultBrowserLayer
+        from zope.viewlet.interfaces import IViewlet
+        from zope.browser.interfaces import IBrowserView
+        from Products.ZenUI3.browser.interfaces import IMainSnippetManager
+        from Products.ZenUI3.utils.javascript import JavaScriptSnippet
+
         if isinstance(classes, (list, tuple)):
             classes = tuple(classes)
         else:
@@ -435,11 +650,16 @@ class ZenPackSpec(Spec):
 
     def create_global_js_snippet(self):
         """Create and register global JavaScript snippet."""
+        return self.create_js_snippet('global', self.global_js_snippet)
+
+    @property
+    def global_js_snippet(self):
+        """Return global JavaScript snippet for ZenPack."""
         snippets = []
         for spec in self.ordered_classes:
             snippets.append(spec.global_js_snippet)
 
-        snippet = (
+        return (
             "(function(){{\n"
             "var ZC = Ext.ns('Zenoss.component');\n"
             "{snippets}"
@@ -447,14 +667,17 @@ class ZenPackSpec(Spec):
             .format(
                 snippets=''.join(snippets)))
 
-        return self.create_js_snippet('global', snippet)
-
     def create_device_js_snippet(self):
         """Register device JavaScript snippet."""
         snippet = self.device_js_snippet
         if not snippet:
             return
 
+        return self.create_js_snippet(
+            'device', snippet, classes=self.get_device_js_classes())
+
+    def get_device_js_classes(self):
+        """Return device classes the device JavaScript is loaded for."""
         device_classes = [
             x.model_class
             for x in self.classes.itervalues()
@@ -465,8 +688,7 @@ class ZenPackSpec(Spec):
             if 'deviceClass' in [x[0] for x in kls._relations]:
                 device_classes.append(kls)
 
-        return self.create_js_snippet(
-            'device', snippet, classes=device_classes)
+        return device_classes
 
     @property
     def device_js_snippet(self):
@@ -505,7 +727,7 @@ class ZenPackSpec(Spec):
         return self._dynamicview_nav_js_snippet
 
     def create_dynamicview_nav_js_snippet(self):
-        if not DYNAMICVIEW_INSTALLED:
+        if not dynamicview_installed():
             return ""
 
         service_view_metatypes = set()
@@ -571,6 +793,9 @@ class ZenPackSpec(Spec):
         attributes['_v_specparams'] = self.specparams
         attributes['NEW_COMPONENT_TYPES'] = self.NEW_COMPONENT_TYPES
         attributes['NEW_RELATIONS'] = self.NEW_RELATIONS
+        attributes['DEVICE_TYPES'] = [
+            '.'.join((x.symbol_name, x.name))
+            for x in self.classes.itervalues() if x.is_device]
         attributes['GLOBAL_CATALOGS'] = []
         global_catalog_classes = {}
         for (class_, class_spec) in self.classes.items():
@@ -600,5 +825,6 @@ class ZenPackSpec(Spec):
         for spec in self.classes.itervalues():
             spec.test_setup()
 
-        self.create_global_js_snippet()
-        self.create_device_js_snippet()
+        if not self.js_bundles:
+            self.create_global_js_snippet()
+            self.create_device_js_snippet()
@@ -6,6 +6,8 @@
 # License.zenoss under the directory where your Zenoss product is installed.
 #
 ##############################################################################
+import functools
+
 from .helpers.ZenPackLibLog import DEFAULTLOG
 
 
@@ -21,6 +23,24 @@ FACET_BLACKLIST = (
 # ## functions to determine conditional imports elsewhere
 
 
+def memoized_check(func):
+    """Return func wrapped to only run once and then return the same result.
+
+    The optional ZenPacks checked by these functions are expensive to
+    import, so they are only checked when first needed.
+
+    """
+    results = []
+
+    @functools.wraps(func)
+    def wrapper():
+        if not results:
+            results.append(func())
+        return results[0]
+
+    return wrapper
+
+
 def yaml_installed():
     '''Return True if Impact is installed'''
     try:
@@ -34,6 +54,7 @@ def yaml_installed():
     return False
 
 
+@memoized_check
 def impact_installed():
     '''Return True if Impact is installed'''
     try:
@@ -47,6 +68,7 @@ def impact_installed():
     return False
 
 
+@memoized_check
 def dynamicview_installed():
     '''Return True if DynamicView is installed'''
     try:
@@ -61,6 +83,7 @@ def dynamicview_installed():
     return False
 
 
+@memoized_check
 def has_metricfacade():
     '''return True if metricfacade can be imported'''
     try:
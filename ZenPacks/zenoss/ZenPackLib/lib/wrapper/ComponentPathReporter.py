@@ -6,6 +6,8 @@
 # License.zenoss under the directory where your Zenoss product is installed.
 #
 ##############################################################################
+import os
+from Acquisition import aq_base
 from zope.component import adapts
 from zope.interface import implements
 from Products.Zuul.catalog.interfaces import IPathReporter
@@ -15,17 +17,52 @@ from ..base.ComponentBase import ComponentBase
 
 class ComponentPathReporter(DefaultPathReporter):
 
-    """Global catalog path reporter adapter factory for components."""
+    """Global catalog path reporter adapter factory for components.
+
+    In incremental mode the facet paths of each component are cached and
+    only computed again when the component's facet fingerprint changes.
+    This avoids traversing the facet graph on property-only reindexes.
+    Components of classes with extra_paths have no fingerprint, and their
+    paths are always computed.
+    Enable it with ComponentPathReporter.incremental = True or by setting
+    the ZPL_INCREMENTAL_PATHS environment variable.
+
+    """
 
     implements(IPathReporter)
     adapts(ComponentBase)
 
+    incremental = bool(os.environ.get('ZPL_INCREMENTAL_PATHS'))
+
     def getPaths(self):
         paths = super(ComponentPathReporter, self).getPaths()
 
+        if self.incremental:
+            paths.extend(self.get_cached_facet_paths())
+        else:
+            paths.extend(self.get_facet_paths())
+
+        return paths
+
+    def get_facet_paths(self):
+        """Return list of paths through all facets."""
+        paths = []
         for facet in self.context.get_facets():
             rp = relPath(facet, facet.containing_relname)
             paths.extend(rp)
 
         return paths
 
+    def get_cached_facet_paths(self):
+        """Return list of paths through all facets using cache."""
+        context = aq_base(self.context)
+        fingerprint = self.context.get_facet_fingerprint()
+        if fingerprint is None:
+            return self.get_facet_paths()
+
+        cached = getattr(context, '_v_zpl_facet_paths', None)
+        if cached is None or cached[0] != fingerprint:
+            cached = (fingerprint, self.get_facet_paths())
+            context._v_zpl_facet_paths = cached
+
+        return list(cached[1])
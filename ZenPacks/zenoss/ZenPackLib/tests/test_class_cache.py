@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Generated class cache tests."""
+
+# stdlib Imports
+import shutil
+import sys
+import tempfile
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib.tests import ZPLBaseTestCase
+from ZenPacks.zenoss.ZenPackLib.lib.helpers.ClassCache import (
+    SourceError, SourceWriter, load_class_cache, render_class_cache,
+    write_class_cache, get_class_cache_path)
+
+
+YAML_DOC = """
+name: ZenPacks.zenoss.ClassCache
+
+class_relationships:
+  - CacheDevice 1:MC CacheComponent
+
+classes:
+  CacheDevice:
+    base: [zenpacklib.Device]
+
+  CacheComponent:
+    base: [zenpacklib.Component]
+    extra_paths:
+      - ['cacheDevice']
+    properties:
+      size:
+        type: int
+        label: Size
+        index_type: field
+      state:
+        label: State
+        enum: {1: 'up', 2: 'down'}
+      used:
+        label: Used
+        datapoint: stats_used
+        datapoint_default: 0
+      ratio:
+        label: Ratio
+        api_only: true
+        api_backendtype: method
+"""
+
+SPEC_HASH = 'class-cache-test'
+
+
+class TestClassCache(ZPLBaseTestCase):
+    """Generated class cache tests."""
+
+    yaml_doc = YAML_DOC
+
+    def afterSetUp(self):
+        super(TestClassCache, self).afterSetUp()
+        self.cfg = self.configs.get('ZenPacks.zenoss.ClassCache').get('cfg')
+        self.attributes = dict(
+            (name, spec.get_class_cache_attributes())
+            for name, spec in self.cfg.classes.iteritems())
+
+    def test_generated_attributes(self):
+        source = render_class_cache(SPEC_HASH, self.attributes)
+        namespace = {}
+        exec compile(source, 'zpl_class_cache', 'exec') in namespace
+
+        self.assertEqual(SPEC_HASH, namespace['SPEC_HASH'])
+        generated = {}
+        for name, kinds in namespace['ATTRIBUTES'].iteritems():
+            generated[name] = dict((k, f()) for k, f in kinds.iteritems())
+            self.assertEqual(set(self.attributes[name]), set(generated[name]))
+
+        # Generated attributes write out the same as the dynamic ones.
+        self.assertEqual(source, render_class_cache(SPEC_HASH, generated))
+
+        model = generated['CacheComponent']['model']
+        self.assertNotIn('ratio', model)
+        self.assertTrue(callable(model['used']))
+        self.assertEqual(
+            {'CacheComponent': {'size': 'field'}}, model['_device_catalogs'])
+
+    def test_unknown_source(self):
+        self.assertRaises(SourceError, SourceWriter().value, object())
+        self.assertRaises(SourceError, SourceWriter().value, lambda: None)
+
+        # Attributes that can't be written are left out.
+        self.attributes['CacheComponent']['model']['unknown'] = object()
+        source = render_class_cache(SPEC_HASH, self.attributes)
+        self.assertNotIn('_CacheComponent_model', source)
+        self.assertIn('_CacheComponent_info', source)
+
+    def test_load_class_cache(self):
+        path = tempfile.mkdtemp()
+        cache_path = get_class_cache_path('ZenPacks.zenoss.ClassCache', path)
+
+        try:
+            write_class_cache(cache_path, SPEC_HASH, self.attributes)
+
+            attributes = load_class_cache(cache_path, SPEC_HASH)
+            self.assertEqual(set(self.attributes), set(attributes))
+            self.assertIsNone(load_class_cache(cache_path, 'outdated'))
+            self.assertIsNone(load_class_cache(
+                get_class_cache_path('ZenPacks.zenoss.Missing', path), SPEC_HASH))
+
+            spec = self.cfg.classes['CacheComponent']
+            spec.cached_attributes = attributes['CacheComponent']
+            self.assertEqual(
+                self.attributes['CacheComponent']['formbuilder'],
+                spec.get_class_attributes('formbuilder', self.fail))
+        finally:
+            sys.modules.pop('zpl_class_cache_ZenPacks_zenoss_ClassCache', None)
+            shutil.rmtree(path)
+
+    def test_class_cache_hash(self):
+        # Specs may be changed after they're created, so a created spec
+        # isn't cached.
+        self.cfg.spec_hash = SPEC_HASH
+        self.assertTrue(self.cfg.created)
+        self.assertIsNone(self.cfg.class_cache_hash)
+
+        self.cfg.created = False
+        try:
+            self.assertTrue(self.cfg.class_cache_hash)
+        finally:
+            self.cfg.created = True
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestClassCache))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Class hierarchy index tests."""
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib.tests import ZPLBaseTestCase
+
+
+YAML_DOC = """
+name: ZenPacks.zenoss.ClassHierarchy
+
+class_relationships:
+  - HierarchyDevice 1:MC Base
+
+classes:
+  HierarchyDevice:
+    base: [zenpacklib.Device]
+
+  Base:
+    base: [zenpacklib.Component]
+    properties:
+      shared:
+        label: Shared
+
+  Left:
+    base: [Base]
+    properties:
+      left:
+        label: Left
+
+  Right:
+    base: [Base]
+    properties:
+      right:
+        label: Right
+
+  Both:
+    base: [Left, Right]
+
+  Leaf:
+    base: [Both]
+"""
+
+
+class TestClassHierarchy(ZPLBaseTestCase):
+    """Class hierarchy index tests."""
+
+    yaml_doc = YAML_DOC
+
+    def afterSetUp(self):
+        super(TestClassHierarchy, self).afterSetUp()
+        self.cfg = self.configs.get('ZenPacks.zenoss.ClassHierarchy').get('cfg')
+        self.hierarchy = self.cfg.class_hierarchy
+
+    def test_index(self):
+        self.assertEqual(['Both', 'Left', 'Base', 'Right'], self.hierarchy.ancestors('Leaf'))
+        self.assertEqual(
+            ['Leaf', 'Both', 'Left', 'Right', 'Base'], self.hierarchy.mro('Leaf'))
+        self.assertEqual(
+            ['Left', 'Right', 'Both', 'Leaf'], self.hierarchy.descendants('Base'))
+        self.assertEqual([], self.hierarchy.ancestors('HierarchyDevice'))
+
+        base = self.cfg.classes['Base']
+        self.assertEqual(['Left', 'Right'], base.get_descendant_specs())
+        self.assertEqual(
+            ['Left', 'Right', 'Both'], [x.name for x in base.subclass_specs()])
+
+    def test_inherited(self):
+        leaf = self.cfg.classes['Leaf']
+        properties = leaf.inherited_properties()
+        self.assertEqual(set(['shared', 'left', 'right']), set(properties))
+        self.assertIs(properties, leaf.inherited_properties())
+        self.assertIn('hierarchyDevice', leaf.inherited_relationships())
+
+    def test_invalidate(self):
+        leaf = self.cfg.classes['Leaf']
+        left = self.cfg.classes['Left']
+        properties = leaf.inherited_properties()
+
+        left.properties['extra'] = left.properties['left']
+        try:
+            self.assertNotIn('extra', leaf.inherited_properties())
+            self.cfg.class_hierarchy.invalidate()
+            self.assertIsNot(properties, leaf.inherited_properties())
+            self.assertIn('extra', leaf.inherited_properties())
+        finally:
+            del left.properties['extra']
+            self.cfg.class_hierarchy.invalidate()
+
+    def test_reassigned(self):
+        leaf = self.cfg.classes['Leaf']
+        right = self.cfg.classes['Right']
+        original = right.properties
+        self.assertIn('right', leaf.inherited_properties())
+
+        right.properties = {'replaced': original['right']}
+        try:
+            properties = leaf.inherited_properties()
+            self.assertIn('replaced', properties)
+            self.assertNotIn('right', properties)
+            self.assertIs(properties, leaf.inherited_properties())
+        finally:
+            right.properties = original
+
+        self.assertIn('right', leaf.inherited_properties())
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestClassHierarchy))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
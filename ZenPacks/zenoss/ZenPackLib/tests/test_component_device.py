@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Cached ComponentBase.device() and rrdPath() tests."""
+
+# stdlib Imports
+import traceback
+
+# Zenoss Imports
+import Globals  # noqa
+from Products.ZenUtils.Utils import unused
+unused(Globals)
+
+from Acquisition import aq_base, aq_parent
+from Products.ZenTestCase.BaseTestCase import BaseTestCase
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib import zenpacklib
+from ZenPacks.zenoss.ZenPackLib.lib.base.ComponentBase import get_rrd_path_strategy
+
+
+YAML = """
+name: ZenPacks.test.ComponentDevice
+
+class_relationships:
+  - NestDevice 1:MC NestA
+  - NestA 1:MC NestB
+  - NestB 1:MC NestC
+
+classes:
+  NestDevice:
+    base: [zenpacklib.Device]
+
+  NestA:
+    base: [zenpacklib.Component]
+
+  NestB:
+    base: [zenpacklib.Component]
+
+  NestC:
+    base: [zenpacklib.Component]
+"""
+
+
+class TestComponentDevice(BaseTestCase):
+    """Cached ComponentBase.device() and rrdPath() tests."""
+
+    def afterSetUp(self):
+        super(TestComponentDevice, self).afterSetUp()
+        try:
+            cfg = zenpacklib.load_yaml(YAML)
+        except Exception:
+            self.fail(traceback.format_exc(limit=0))
+
+        deviceclass = self.dmd.Devices.createOrganizer("/Test")
+        deviceclass.setZenProperty("zPythonClass", "ZenPacks.test.ComponentDevice.NestDevice")
+        self.device = deviceclass.createInstance("test-device")
+
+        obj = self.device
+        for classname in ("NestA", "NestB", "NestC"):
+            cls = getattr(getattr(cfg.zenpack_module, classname), classname)
+            rel = getattr(obj, "nest{}s".format(classname[-1]))
+            rel._setObject(classname.lower(), cls(classname.lower()))
+            obj = rel._getOb(classname.lower())
+
+        self.component = obj
+
+    def test_device_cached(self):
+        device = self.component.device()
+        self.assertEqual(self.device.getPrimaryId(), device.getPrimaryId())
+
+        # Only the unwrapped device is cached.
+        holder = self.component.get_cache_holder()
+        self.assertIs(aq_base(device), holder._v_zpl_device[0])
+        self.assertIs(aq_base(device), aq_base(self.component.device()))
+
+        # It's wrapped in the caller's acquisition chain.
+        component = aq_base(self.component).__of__(self.component.aq_parent)
+        device = component.device()
+        self.assertEqual(self.device.getPrimaryId(), device.getPrimaryId())
+        self.assertIs(component, aq_parent(device))
+
+    def test_device_stale(self):
+        self.component.device()
+
+        # A cache from another holder is stale.
+        other = self.dmd.Devices.Test.createInstance("other-device")
+        rel = other.nestAs
+        rel._setObject("nesta", self.device.nestAs.nesta.__class__("nesta"))
+        rel._getOb("nesta").device()
+
+        holder = self.component.get_cache_holder()
+        holder._v_zpl_device = rel._v_zpl_device
+
+        device = self.component.device()
+        self.assertEqual(self.device.getPrimaryId(), device.getPrimaryId())
+        self.assertIs(aq_base(self.device), holder._v_zpl_device[0])
+
+    def test_device_moved(self):
+        self.component.device()
+
+        # Moving the component's container to another device invalidates it.
+        other = self.dmd.Devices.Test.createInstance("other-device")
+        nesta = self.device.nestAs._getOb("nesta")
+        self.device.nestAs._delObject("nesta")
+        holder = aq_base(nesta).nestBs.nestb.nestCs
+        self.assertIsNone(getattr(aq_base(holder), '_v_zpl_device', None))
+
+        other.nestAs._setObject("nesta", aq_base(nesta))
+
+        component = other.nestAs.nesta.nestBs.nestb.nestCs.nestc
+        self.assertEqual(other.getPrimaryId(), component.device().getPrimaryId())
+
+    def test_rrd_path_cached(self):
+        path = self.component.rrdPath()
+        self.assertIn(self.component.id, path)
+        self.assertEqual(path, self.component._v_zpl_rrd_path[1])
+        self.assertIs(path, self.component.rrdPath())
+
+    def test_rrd_path_renamed(self):
+        path = self.component.rrdPath()
+        self.component.id = "renamed"
+
+        self.assertNotEqual(path, self.component.rrdPath())
+        self.assertIn("renamed", self.component.rrdPath())
+
+    def test_rrd_path_parent_renamed(self):
+        self.component.rrdPath()
+
+        # Renaming a container removes its components and adds them again.
+        rel = self.device.nestAs.nesta.nestBs
+        nestb = aq_base(rel._getOb("nestb"))
+        rel._delObject("nestb")
+        self.assertIsNone(getattr(aq_base(self.component), '_v_zpl_rrd_path', None))
+
+        nestb.id = "renamed"
+        rel._setObject("renamed", nestb)
+
+        component = rel._getOb("renamed").nestCs.nestc
+        self.assertEqual(get_rrd_path_strategy()(component), component.rrdPath())
+
+    def test_device_unattached(self):
+        cls = self.component.__class__
+        self.assertIsNone(cls("unattached").device())
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestComponentDevice))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Bulk component removal tests."""
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib.tests import ZPLBaseTestCase
+from ZenPacks.zenoss.ZenPackLib.lib.base.ComponentRemoval import (
+    ComponentRemover, get_device_path)
+
+
+YAML_DOC = """
+name: ZenPacks.zenoss.ComponentRemoval
+
+class_relationships:
+  - RemovalDevice 1:MC RemovalComponent
+  - RemovalComponent 1:MC RemovalChild
+
+classes:
+  RemovalDevice:
+    base: [zenpacklib.Device]
+
+  RemovalComponent:
+    base: [zenpacklib.Component]
+
+  RemovalChild:
+    base: [zenpacklib.Component]
+"""
+
+
+class TestComponentRemoval(ZPLBaseTestCase):
+    """Bulk component removal tests."""
+
+    yaml_doc = YAML_DOC
+    build = True
+
+    def afterSetUp(self):
+        super(TestComponentRemoval, self).afterSetUp()
+        cfg = self.configs.get('ZenPacks.zenoss.ComponentRemoval').get('cfg')
+        component_class = cfg.zenpack_module.RemovalComponent.RemovalComponent
+        child_class = cfg.zenpack_module.RemovalChild.RemovalChild
+
+        deviceclass = self.dmd.Devices.createOrganizer('/ZPL/Removal')
+        deviceclass.setZenProperty(
+            'zPythonClass', 'ZenPacks.zenoss.ComponentRemoval.RemovalDevice')
+
+        self.device = deviceclass.createInstance('removal-device')
+        for i in range(3):
+            component_id = 'component-{}'.format(i)
+            self.device.removalComponents._setObject(
+                component_id, component_class(component_id))
+
+        component = self.device.removalComponents._getOb('component-0')
+        component.removalChilds._setObject('child-0', child_class('child-0'))
+        self.child = component.removalChilds._getOb('child-0')
+
+        self.remover = ComponentRemover(self.dmd, [])
+
+    def test_device_path(self):
+        self.assertEqual(
+            self.device.getPrimaryId(),
+            get_device_path(self.child.getPrimaryId()))
+        self.assertIsNone(get_device_path('/zport/dmd/Devices/rrdTemplates/x'))
+
+    def test_remove_some(self):
+        relpath = self.device.removalComponents.getPrimaryId()
+        self.assertEqual(
+            1, self.remover.remove_relationship(relpath, set(['component-1'])))
+        self.assertEqual(
+            ['component-0', 'component-2'],
+            sorted(self.device.removalComponents.objectIds()))
+
+    def test_remove_all(self):
+        child_relpath = self.child.getPrimaryParent().getPrimaryId()
+        relpath = self.device.removalComponents.getPrimaryId()
+        ids = set(['component-0', 'component-1', 'component-2', 'missing'])
+        self.assertEqual(3, self.remover.remove_relationship(relpath, ids))
+        self.assertEqual(1, self.remover.stats['missing'])
+        self.assertEqual([], self.device.removalComponents.objectIds())
+
+        # Relationships under removed components are skipped.
+        self.assertEqual(
+            0, self.remover.remove_relationship(child_relpath, set(['child-0'])))
+
+    def test_run(self):
+        types = [
+            'ZenPacks.zenoss.ComponentRemoval.RemovalComponent.RemovalComponent',
+            'ZenPacks.zenoss.ComponentRemoval.RemovalChild.RemovalChild']
+
+        # Interrupt removal after the first relationship.
+        remover = ComponentRemover(self.dmd, types, batch_size=1)
+        remove_relationship = remover.remove_relationship
+        calls = []
+
+        def interrupted(relpath, ids):
+            if calls:
+                raise RuntimeError("interrupted")
+            calls.append(relpath)
+            return remove_relationship(relpath, ids)
+
+        remover.remove_relationship = interrupted
+        self.assertRaises(RuntimeError, remover.run)
+        self.assertEqual(1, remover.stats['removed'])
+
+        # Running again resumes with the remaining components.
+        stats = ComponentRemover(self.dmd, types, batch_size=1).run()
+        self.assertEqual(3, stats['components'])
+        self.assertEqual(3, stats['removed'])
+        self.assertEqual(0, stats['missing'])
+
+        self.assertEqual([], self.device.removalComponents.objectIds())
+        self.assertEqual(0, len(self.search(types)))
+        self.assertEqual(0, len(self.device.ComponentBaseSearch))
+
+    def search(self, types):
+        from Products.Zuul.interfaces import ICatalogTool
+        return list(ICatalogTool(self.dmd).search(types=types))
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestComponentRemoval))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Batched datapoint property fetching tests."""
+
+# stdlib Imports
+import os
+
+# Zenoss Imports
+import transaction
+from Products import Zuul
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib.tests import ZPLBaseTestCase
+from ZenPacks.zenoss.ZenPackLib.lib.helpers.DatapointBatch import (
+    DATAPOINT_CACHE, MISSING, LocalDatapointBackend,
+    patch_bulk_metric_loading, prefetch_datapoints, set_datapoint_backend)
+
+
+YAML_DOC = """
+name: ZenPacks.zenoss.DatapointBatch
+
+class_relationships:
+  - BatchDevice 1:MC BatchComponent
+
+classes:
+  BatchDevice:
+    base: [zenpacklib.Device]
+
+  BatchComponent:
+    base: [zenpacklib.Component]
+    properties:
+      used:
+        label: Used
+        datapoint: stats_used
+        datapoint_default: 0
+        grid_display: true
+      free:
+        label: Free
+        datapoint: stats_free
+        datapoint_cached: false
+        grid_display: true
+"""
+
+
+class TestDatapointBatch(ZPLBaseTestCase):
+    """Batched datapoint property fetching tests."""
+
+    yaml_doc = YAML_DOC
+    build = True
+
+    def afterSetUp(self):
+        super(TestDatapointBatch, self).afterSetUp()
+        objects = self.configs.get('ZenPacks.zenoss.DatapointBatch').get('objects')
+        self.components = [
+            objects.create_object('BatchComponent', inst=i) for i in range(5)]
+
+        self.backend = LocalDatapointBackend()
+        for i, component in enumerate(self.components):
+            self.backend.set_value(component, 'stats_used', i * 10.0)
+            self.backend.set_value(component, 'stats_free', float('nan'))
+
+        set_datapoint_backend(self.backend)
+
+    def beforeTearDown(self):
+        set_datapoint_backend(None)
+        DATAPOINT_CACHE.clear()
+        super(TestDatapointBatch, self).beforeTearDown()
+
+    def test_prefetch(self):
+        prefetch_datapoints(self.components, ['stats_used', 'stats_free'])
+        self.assertEqual(1, self.backend.requests)
+
+        self.assertEqual([0.0, 10.0, 20.0, 30.0, 40.0], [x.used() for x in self.components])
+        self.assertEqual([None] * 5, [x.free() for x in self.components])
+        self.assertEqual(1, self.backend.requests)
+
+    def test_prefetch_transaction(self):
+        prefetch_datapoints(self.components, ['stats_used'])
+        self.assertEqual(40.0, DATAPOINT_CACHE.get(self.components[-1], 'stats_used'))
+
+        transaction.abort()
+        self.assertIs(MISSING, DATAPOINT_CACHE.get(self.components[-1], 'stats_used'))
+
+    def test_bulk_metric_loading(self):
+        from Products.Zuul.facades.devicefacade import DeviceFacade
+        original = getattr(DeviceFacade, 'bulkLoadMetricData', None)
+        if original is None:
+            self.skipTest('DeviceFacade.bulkLoadMetricData is not available')
+
+        patch_bulk_metric_loading()
+        self.assertIs(original, DeviceFacade.bulkLoadMetricData)
+
+        os.environ['ZPL_DATAPOINT_BATCH'] = '1'
+        try:
+            patch_bulk_metric_loading()
+        finally:
+            del os.environ['ZPL_DATAPOINT_BATCH']
+
+        try:
+            infos = [Zuul.info(x) for x in self.components]
+            self.assertEqual(
+                set(['stats_used', 'stats_free']), set(infos[0].dataPointsToFetch))
+
+            set_properties = []
+            for info in infos:
+                info.setBulkLoadProperty = lambda k, v, info=info: set_properties.append((info, k))
+
+            DeviceFacade(self.dmd).bulkLoadMetricData(infos)
+            self.assertEqual(1, self.backend.requests)
+            self.assertEqual(40.0, self.components[-1].used())
+            self.assertEqual(1, self.backend.requests)
+            self.assertEqual(
+                set((x, y) for x in infos for y in ('stats_used', 'stats_free')),
+                set(set_properties))
+        finally:
+            DeviceFacade.bulkLoadMetricData = original
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestDatapointBatch))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Chunked device relationship building tests."""
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib.tests import ZPLBaseTestCase
+from ZenPacks.zenoss.ZenPackLib.lib.base.DeviceRelations import (
+    DeviceRelationsBuilder, relations_current)
+
+
+YAML_DOC = """
+name: ZenPacks.zenoss.DeviceRelations
+
+class_relationships:
+  - RelationsDevice 1:MC RelationsComponent
+
+classes:
+  RelationsDevice:
+    base: [zenpacklib.Device]
+
+  RelationsComponent:
+    base: [zenpacklib.Component]
+"""
+
+
+class TestDeviceRelations(ZPLBaseTestCase):
+    """Chunked device relationship building tests."""
+
+    yaml_doc = YAML_DOC
+    build = True
+
+    def afterSetUp(self):
+        super(TestDeviceRelations, self).afterSetUp()
+        deviceclass = self.dmd.Devices.createOrganizer('/ZPL/Relations')
+        deviceclass.setZenProperty(
+            'zPythonClass', 'ZenPacks.zenoss.DeviceRelations.RelationsDevice')
+
+        self.devices = [
+            deviceclass.createInstance('relations-device-{}'.format(i))
+            for i in range(3)]
+
+    def test_only_outdated(self):
+        for device in self.devices[:2]:
+            device._delObject('relationsComponents')
+
+        self.assertFalse(relations_current(self.devices[0]))
+        self.assertTrue(relations_current(self.devices[2]))
+
+        builder = DeviceRelationsBuilder(self.dmd, batch_size=1)
+        stats = builder.run()
+        self.assertEqual(2, stats['updated'])
+        self.assertEqual(2, stats['batches'])
+        self.assertTrue(all(relations_current(x) for x in self.devices))
+        self.assertIn('scan=', builder.report())
+
+        # Running again is a no-op.
+        stats = DeviceRelationsBuilder(self.dmd).run()
+        self.assertEqual(0, stats['updated'])
+        self.assertEqual(0, stats['batches'])
+
+    def test_mistyped(self):
+        from Products.ZenRelations.ToManyRelationship import ToManyRelationship
+
+        device = self.devices[0]
+        device._delObject('relationsComponents')
+        device._setObject('relationsComponents', ToManyRelationship('relationsComponents'))
+        self.assertFalse(relations_current(device))
+
+        stats = DeviceRelationsBuilder(self.dmd).run()
+        self.assertEqual(1, stats['updated'])
+        self.assertTrue(relations_current(device))
+
+    def test_types(self):
+        for device in self.devices:
+            device._delObject('relationsComponents')
+
+        device_type = 'ZenPacks.zenoss.DeviceRelations.RelationsDevice.RelationsDevice'
+        stats = DeviceRelationsBuilder(self.dmd, types=[]).run()
+        self.assertEqual(0, stats['devices'])
+
+        stats = DeviceRelationsBuilder(self.dmd, types=[device_type]).run()
+        self.assertEqual(3, stats['devices'])
+        self.assertEqual(3, stats['updated'])
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestDeviceRelations))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
@@ -67,6 +67,26 @@ class TestEditableProperties(ZPLBaseTestCase):
             ob.property_string = x
             self.check_type(ob.property_string, str(x))
 
+    def test_property_coercer_table(self):
+        config = self.configs.get('ZenPacks.zenoss.EditableProperties')
+        ob = config.get('objects').class_objects.get('SomeComponent').get('ob')
+        properties, coercers = ob._property_coercers
+        self.assertIs(properties, ob._properties)
+        self.assertEquals(bool, coercers.get('property_bool'))
+        self.assertNotIn('id', coercers)
+
+        # subclasses that extend _properties get their own table
+        cls = type(ob)
+        subclass = type('SomeSubComponent', (cls,), {
+            '_properties': cls._properties + (
+                {'id': 'property_extra', 'type': 'int', 'mode': 'w'},)})
+        sub_ob = subclass('sub')
+        sub_ob.property_extra = '2'
+        self.check_type(sub_ob.property_extra, 2)
+        sub_ob.property_int = '3'
+        self.check_type(sub_ob.property_int, 3)
+        self.assertIs(subclass._property_coercers[0], subclass._properties)
+
     def check_type(self, actual, expected):
         self.assertEquals(expected, actual,
             'Type check failed,  expected {} ({}), got {} ({})'.format(expected,
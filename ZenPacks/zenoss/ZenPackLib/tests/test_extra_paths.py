@@ -185,6 +185,7 @@ class TestExtraPaths(ZPLBaseTestCase):
         self.endpoint = ep
         self.vm1 = vm1
         self.vm2 = vm2
+        self.folder_child = folder_child
 
     def testVirtualMachinePathsTopLevelDirect(self):
         vm1_facet_ids = sorted([x.id for x in self.vm1.get_facets()])
@@ -231,6 +232,65 @@ class TestExtraPaths(ZPLBaseTestCase):
         for id_ in ['ResourcePool-Top']:
             self.assertIn(id_, rp_facet_ids)
 
+    def testPathPatternStreamsFollow(self):
+        streams = self.vm1._v_path_pattern_streams
+        self.assertEqual(2, len(streams))
+
+        # Both streams are followed along resourcePool, and the result is
+        # remembered for the next traversal.
+        followed = streams.follow('resourcePool')
+        self.assertEqual([[x] for x in streams], [list(x) for x in followed])
+        self.assertIs(followed, streams.follow('resourcePool'))
+        self.assertEqual((), streams.follow('folder'))
+
+        # Plain lists of streams are still accepted.
+        vm1_facet_ids = sorted([x.id for x in self.vm1.get_facets()])
+        self.assertEqual(
+            vm1_facet_ids,
+            sorted([x.id for x in self.vm1.get_facets(streams=list(streams))]))
+
+    def testIncrementalPaths(self):
+        from Products.Zuul.catalog.interfaces import IPathReporter
+
+        reporter = IPathReporter(self.folder_child)
+        expected = sorted(reporter.getPaths())
+
+        reporter.incremental = True
+        self.assertEqual(expected, sorted(reporter.getPaths()))
+        cached = self.folder_child._v_zpl_facet_paths
+
+        # Property changes reuse the cached paths.
+        self.folder_child.title = "changed"
+        self.assertEqual(expected, sorted(reporter.getPaths()))
+        self.assertIs(cached, self.folder_child._v_zpl_facet_paths)
+
+        # Changing a faceting relationship directly computes them again.
+        self.folder_child.childEntities.removeRelation(self.vm2)
+        incremental_paths = sorted(reporter.getPaths())
+        self.assertIsNot(cached, self.folder_child._v_zpl_facet_paths)
+        self.assertNotEqual(expected, incremental_paths)
+
+        reporter.incremental = False
+        self.assertEqual(sorted(reporter.getPaths()), incremental_paths)
+
+    def testFacetFingerprint(self):
+        # Facets are keyed by primary path, which tells apart objects
+        # without a persistent id yet, and changes when they're moved.
+        contents = self.folder_child.get_facet_fingerprint()[1]
+        self.assertIn((self.vm2.getPrimaryId(),), contents)
+
+    def testIncrementalPathsExtraPaths(self):
+        from Acquisition import aq_base
+        from Products.Zuul.catalog.interfaces import IPathReporter
+
+        # Paths through extra_paths are never cached.
+        reporter = IPathReporter(self.vm2)
+        reporter.incremental = True
+        expected = sorted(reporter.getPaths())
+        self.assertIsNone(getattr(aq_base(self.vm2), '_v_zpl_facet_paths', None))
+
+        reporter.incremental = False
+        self.assertEqual(expected, sorted(reporter.getPaths()))
 
 def test_suite():
     """Return test suite for this module."""
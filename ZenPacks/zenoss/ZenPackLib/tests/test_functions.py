@@ -72,6 +72,29 @@ class TestFunctions(BaseTestCase):
 
         self.assertEquals(classes, expected_classes)
 
+    def test_keyword_owners(self):
+        """Test that reserved keywords are built with their owning classes."""
+        from ZenPacks.zenoss.ZenPackLib.lib import functions
+
+        keywords, owners = functions.build_keyword_owners()
+        self.assertIn('getId', keywords)
+        self.assertEqual(
+            ['Device', 'DeviceComponent', 'DeviceInfo', 'ComponentInfo'],
+            owners['name'])
+
+        class Patched(object):
+            def zplPatchedMethod(self):
+                pass
+
+        klasses = functions.get_keyword_classes() + [Patched]
+        keywords, owners = functions.build_keyword_owners(klasses)
+        self.assertIn('zplPatchedMethod', keywords)
+        self.assertEqual(['Patched'], owners['zplPatchedMethod'])
+
+        self.assertIn('getId', functions.ZENOSS_KEYWORDS)
+        self.assertEqual(
+            ['DeviceInfo', 'ComponentInfo'],
+            functions.find_keyword_cls('uuid'))
 
 def test_suite():
     """Return test suite for this module."""
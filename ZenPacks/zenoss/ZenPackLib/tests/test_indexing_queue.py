@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Deferred indexing queue tests."""
+
+# stdlib Imports
+import traceback
+
+# Zenoss Imports
+import Globals  # noqa
+from Products.ZenUtils.Utils import unused
+unused(Globals)
+
+from Products.ZenTestCase.BaseTestCase import BaseTestCase
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib import zenpacklib
+from ZenPacks.zenoss.ZenPackLib.lib.base.IndexingQueue import uncatalog_objects
+
+
+YAML = """
+name: ZenPacks.test.IndexingQueue
+
+class_relationships:
+  - QueueDevice 1:MC QueueComponent
+
+classes:
+  QueueDevice:
+    base: [zenpacklib.Device]
+
+  QueueComponent:
+    base: [zenpacklib.Component]
+    properties:
+      serial:
+        index_type: field
+        index_scope: both
+"""
+
+
+class TestIndexingQueue(BaseTestCase):
+    """Deferred indexing queue tests."""
+
+    def afterSetUp(self):
+        super(TestIndexingQueue, self).afterSetUp()
+        try:
+            self.cfg = zenpacklib.load_yaml(YAML)
+        except Exception:
+            self.fail(traceback.format_exc(limit=0))
+
+        deviceclass = self.dmd.Devices.createOrganizer("/Test")
+        deviceclass.setZenProperty("zPythonClass", "ZenPacks.test.IndexingQueue.QueueDevice")
+        self.device = deviceclass.createInstance("test-device")
+
+        self.queue_enabled = zenpacklib.IndexingQueue.enabled
+        zenpacklib.IndexingQueue.enable()
+
+    def beforeTearDown(self):
+        if not self.queue_enabled:
+            zenpacklib.IndexingQueue.disable()
+        super(TestIndexingQueue, self).beforeTearDown()
+
+    def add_component(self, component_id):
+        cls = self.cfg.zenpack_module.QueueComponent.QueueComponent
+        self.device.queueComponents._setObject(component_id, cls(component_id))
+        component = self.device.queueComponents._getOb(component_id)
+        component.serial = component_id
+        return component
+
+    def test_coalesced_writes(self):
+        component = self.add_component("component-1")
+
+        stats = zenpacklib.IndexingQueue.stats
+        requested, performed = stats['requested'], stats['performed']
+        for i in range(5):
+            component.index_object()
+
+        queue = zenpacklib.IndexingQueue.get()
+
+        # One write per catalog no matter how many times it was indexed.
+        self.assertEqual(2, len(queue.pending))
+        self.assertEqual(10, stats['requested'] - requested)
+
+        # Searches flush pending writes first.
+        self.assertEqual(1, len(component.device_search("QueueComponent", serial="component-1")))
+        self.assertEqual(0, len(queue.pending))
+        self.assertEqual(2, stats['performed'] - performed)
+
+    def test_unindex_wins(self):
+        component = self.add_component("component-2")
+        component.index_object()
+        component.unindex_object()
+        component.index_object()
+
+        queue = zenpacklib.IndexingQueue.get()
+        self.assertEqual(
+            set(["unindex"]),
+            set(x[0] for x in queue.pending.itervalues()))
+
+        queue.flush()
+        self.assertEqual(0, len(component.device_search("QueueComponent", serial="component-2")))
+
+    def test_bulk_unindex(self):
+        components = [self.add_component("bulk-{}".format(i)) for i in range(3)]
+        for component in components:
+            component.index_object()
+
+        zenpacklib.IndexingQueue.get().flush()
+        catalog = self.device.QueueComponentSearch
+        self.assertEqual(3, len(catalog))
+
+        # Some of a catalog's objects are uncataloged individually.
+        self.assertEqual(1, uncatalog_objects(catalog, [components[0].getPrimaryId()]))
+        self.assertEqual(2, len(catalog))
+
+        # All of them are cleared at once.
+        for component in components:
+            component.unindex_object()
+
+        zenpacklib.IndexingQueue.get().flush()
+        self.assertEqual(0, len(catalog))
+
+    def test_disabled(self):
+        zenpacklib.IndexingQueue.disable()
+        self.assertIsNone(zenpacklib.IndexingQueue.get())
+
+        component = self.add_component("component-3")
+        component.index_object()
+        self.assertEqual(1, len(component.device_search("QueueComponent", serial="component-3")))
+
+    def test_catalog_cache(self):
+        component1 = self.add_component("component-4")
+        component2 = self.add_component("component-5")
+
+        catalogs = component1.get_all_catalogs()
+        self.assertEqual(3, len(catalogs))
+
+        # Siblings share catalogs resolved for the containing relationship.
+        holder = component2.get_cache_holder()
+        self.assertIs(holder, component1.get_cache_holder())
+        self.assertIn(component2.__class__, holder._v_zpl_catalogs[2])
+        self.assertEqual(
+            [x.getPhysicalPath() for x in catalogs],
+            [x.getPhysicalPath() for x in component2.get_all_catalogs()])
+
+        # Creating or removing catalogs discards cached catalogs.
+        zenpacklib.Component.invalidate_catalog_cache()
+        component2.get_all_catalogs()
+        self.assertEqual(
+            [component2.__class__],
+            holder._v_zpl_catalogs[2].keys())
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestIndexingQueue))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""
+    Test planning of organizer and template operations on install
+"""
+from ZenPacks.zenoss.ZenPackLib.tests import ZPLBaseTestCase
+
+YAML_DOC = """name: ZenPacks.zenoss.ZenPackLib
+device_classes:
+  /Server/ZPLPlan/Child:
+    templates:
+      Device:
+        datasources:
+          sysUpTime:
+            type: SNMP
+            datapoints:
+              sysUpTime: GAUGE
+            oid: 1.3.6.1.2.1.25.1.1.0
+  /Server/ZPLPlan:
+    zProperties:
+      zPythonClass: Products.ZenModel.Device
+event_classes:
+  /Status/ZPLPlan: {}
+"""
+
+
+class TestInstallPlan(ZPLBaseTestCase):
+    """
+    Test InstallPlan operations and their application
+    """
+    yaml_doc = [YAML_DOC]
+
+    def get_plan(self, estimate=False):
+        from ZenPacks.zenoss.ZenPackLib.lib.base.InstallPlan import InstallPlan
+        config = self.configs.get('ZenPacks.zenoss.ZenPackLib')
+        zenpack = config.get('schema').ZenPack(self.dmd)
+        return InstallPlan(zenpack, self.app, batch_size=1).build(estimate)
+
+    def test_plan(self):
+        plan = self.get_plan()
+        self.assertEquals(
+            [(x.kind, x.name, x.action) for x in plan.operations],
+            [('device class', '/Server/ZPLPlan', 'create'),
+             ('device class', '/Server/ZPLPlan/Child', 'create'),
+             ('template', '/Server/ZPLPlan/Child/Device', 'create'),
+             ('event class', '/Status/ZPLPlan', 'create')])
+
+        # planning changes nothing
+        self.assertIsNone(self.dmd.Devices.unrestrictedTraverse('Server/ZPLPlan', None))
+
+    def test_apply(self):
+        results = self.get_plan().apply()
+        self.assertEquals(results['created'], 1)
+
+        parent = self.dmd.Devices.getOrganizer('/Server/ZPLPlan')
+        self.assertEquals(parent.getZ('zPythonClass'), 'Products.ZenModel.Device')
+        self.assertIsNotNone(self.dmd.Events.getOrganizer('/Status/ZPLPlan'))
+
+        # installing again only checks the template
+        plan = self.get_plan(estimate=True)
+        self.assertEquals(
+            [x.action for x in plan.operations],
+            ['update', 'update', 'skip', 'update'])
+        self.assertIn('Templates: 1 skip', plan.describe())
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestInstallPlan))
+    return suite
+
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
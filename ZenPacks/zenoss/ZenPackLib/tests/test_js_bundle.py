@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""JavaScript bundle tests."""
+
+# stdlib Imports
+import os
+import shutil
+import tempfile
+
+# Zenoss Imports
+import Globals  # noqa
+from Products.ZenUtils.Utils import unused
+unused(Globals)
+from Products.ZenTestCase.BaseTestCase import BaseTestCase
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib.lib.helpers.JSBundle import (
+    JS_BUNDLE_MANIFEST, JS_BUNDLE_MAX_AGE, JS_BUNDLE_NAMES, JS_BUNDLE_WEIGHTS,
+    JSBundleView, get_js_bundle_filename, get_js_bundle_path, load_js_bundle,
+    register_js_bundle, write_js_bundle)
+
+
+GLOBAL_JS = "(function(){\nvar ZC = Ext.ns('Zenoss.component');\n})();\n"
+DEVICE_JS = u"(function(){\nZC.registerName('Caf\xe9', 'Caf\xe9s');\n})();\n"
+
+
+class TestJSBundle(BaseTestCase):
+    """JavaScript bundle tests."""
+
+    def afterSetUp(self):
+        super(TestJSBundle, self).afterSetUp()
+        self.path = get_js_bundle_path('ZenPacks.zenoss.Test', tempfile.mkdtemp())
+
+    def beforeTearDown(self):
+        shutil.rmtree(os.path.dirname(self.path))
+        super(TestJSBundle, self).beforeTearDown()
+
+    def test_write_and_load(self):
+        bundles = write_js_bundle(
+            self.path, 'hash1', {'global': GLOBAL_JS, 'device': DEVICE_JS})
+
+        self.assertEqual(bundles['global'], get_js_bundle_filename('global', GLOBAL_JS))
+        with open(os.path.join(self.path, bundles['device']), 'rb') as f:
+            self.assertEqual(f.read().decode('utf-8'), DEVICE_JS)
+
+        self.assertEqual(bundles, load_js_bundle(self.path, 'hash1'))
+        self.assertIsNone(load_js_bundle(self.path, 'hash2'))
+
+    def test_empty_bundle(self):
+        bundles = write_js_bundle(
+            self.path, 'hash1', {'global': GLOBAL_JS, 'device': ''})
+
+        self.assertIsNone(bundles['device'])
+        self.assertEqual(bundles, load_js_bundle(self.path, 'hash1'))
+
+    def test_rewrite(self):
+        old = write_js_bundle(self.path, 'hash1', {'global': GLOBAL_JS})
+        new = write_js_bundle(self.path, 'hash2', {'global': GLOBAL_JS + '\n'})
+
+        self.assertNotEqual(old['global'], new['global'])
+        self.assertEqual(
+            sorted(os.listdir(self.path)),
+            sorted([JS_BUNDLE_MANIFEST, new['global']]))
+
+    def test_missing_bundle(self):
+        bundles = write_js_bundle(self.path, 'hash1', {'global': GLOBAL_JS})
+        os.remove(os.path.join(self.path, bundles['global']))
+
+        self.assertIsNone(load_js_bundle(self.path, 'hash1'))
+
+    def test_unwritable(self):
+        with open(self.path, 'wb') as f:
+            f.write('not a directory')
+
+        self.assertIsNone(write_js_bundle(self.path, 'hash1', {'global': GLOBAL_JS}))
+
+    def test_view(self):
+        bundles = write_js_bundle(self.path, 'hash1', {'global': GLOBAL_JS})
+        register_js_bundle(self.path, bundles['global'])
+
+        view = JSBundleView(self.dmd, self.dmd.REQUEST)
+        view.__name__ = bundles['global']
+        self.assertEqual(GLOBAL_JS, view())
+
+        response = self.dmd.REQUEST.response
+        self.assertEqual(
+            'public, max-age={}'.format(JS_BUNDLE_MAX_AGE),
+            response.getHeader('Cache-Control'))
+        self.assertTrue(response.getHeader('Expires'))
+
+    def test_weights(self):
+        # Bundles load in order, before the ZenPack's global.js (20).
+        weights = [JS_BUNDLE_WEIGHTS[x] for x in JS_BUNDLE_NAMES]
+        self.assertEqual(sorted(weights), weights)
+        self.assertLess(max(weights), 20)
+
+        # They load after the platform's JavaScript.
+        core_weights = get_core_src_weights()
+        if core_weights:
+            self.assertLess(max(core_weights), min(weights))
+
+
+def get_core_src_weights():
+    """Return weights of IJavaScriptSrcManager viewlets registered by ZenUI3."""
+    from zope.component import getGlobalSiteManager
+    from zope.viewlet.interfaces import IViewlet
+    from Products.ZenUI3.browser.interfaces import IJavaScriptSrcManager
+
+    weights = []
+    for registration in getGlobalSiteManager().registeredAdapters():
+        if registration.provided is not IViewlet:
+            continue
+        if IJavaScriptSrcManager not in registration.required[3:]:
+            continue
+        if 'ZenUI3' not in str(registration.info):
+            continue
+
+        weight = getattr(registration.factory, 'weight', None)
+        if weight is not None:
+            weights.append(int(weight))
+
+    return weights
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestJSBundle))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
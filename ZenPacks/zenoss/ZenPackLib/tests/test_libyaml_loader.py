@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""libyaml loader parity tests.
+
+The libyaml loaders must construct the same data, specs and source marks
+as the pure-Python loaders for the YAML fixtures in tests/data.
+
+"""
+
+# stdlib Imports
+import os
+import unittest
+
+import yaml
+
+# Zenoss Imports
+import Globals  # noqa
+from Products.ZenUtils.Utils import unused
+unused(Globals)
+from Products.ZenTestCase.BaseTestCase import BaseTestCase
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib.lib.helpers import loaders
+from ZenPacks.zenoss.ZenPackLib.lib.helpers.Dumper import Dumper
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+ZPLTEST1_DIR = os.path.join(
+    DATA_DIR, 'zenpacks', 'ZenPacks.zenoss.ZPLTest1',
+    'ZenPacks', 'zenoss', 'ZPLTest1')
+
+RESERVED_YAML = """
+name: ZenPacks.zenoss.LibYAML
+
+classes:
+  LibYAMLComponent:
+    base: [zenpacklib.Component]
+    properties:
+      class:
+        type: string
+"""
+
+
+def yaml_fixtures():
+    """Return paths of all YAML files in tests/data."""
+    filenames = []
+    for dirpath, dirnames, files in os.walk(DATA_DIR):
+        filenames.extend(
+            os.path.join(dirpath, x) for x in files if x.endswith('.yaml'))
+    return sorted(filenames)
+
+
+def node_marks(node):
+    """Return list of (tag, value, start, end) for all scalars in node."""
+    marks = []
+    pending = [node]
+    while pending:
+        n = pending.pop()
+        if isinstance(n, yaml.ScalarNode):
+            marks.append((
+                n.tag, n.value,
+                (n.start_mark.name, n.start_mark.line, n.start_mark.column),
+                (n.end_mark.name, n.end_mark.line, n.end_mark.column)))
+        elif isinstance(n, yaml.SequenceNode):
+            pending.extend(reversed(n.value))
+        elif isinstance(n, yaml.MappingNode):
+            for key_node, value_node in reversed(n.value):
+                pending.extend((value_node, key_node))
+    return marks
+
+
+def load_file(filename, loader):
+    with open(filename, 'r') as f:
+        return yaml.load(f, Loader=loader)
+
+
+@unittest.skipUnless(loaders.LIBYAML, "libyaml is not available")
+class TestLibYAMLLoader(BaseTestCase):
+    """libyaml loader parity tests."""
+
+    def test_fallback(self):
+        self.assertTrue(issubclass(
+            loaders.FastZenPackSpecLoader, loaders.ZenPackSpecLoader))
+        self.assertTrue(issubclass(
+            loaders.FastZenPackSpecLoader, yaml.CParser))
+
+    def test_compose_parity(self):
+        for filename in yaml_fixtures():
+            with open(filename, 'r') as f:
+                expected = yaml.compose(f, Loader=loaders.ZenPackSpecLoader)
+            with open(filename, 'r') as f:
+                actual = yaml.compose(f, Loader=loaders.CZenPackSpecLoader)
+
+            self.assertEqual(expected.tag, actual.tag, filename)
+            self.assertEqual(node_marks(expected), node_marks(actual), filename)
+
+    def test_ordered_parity(self):
+        for filename in yaml_fixtures():
+            self.assertEqual(
+                load_file(filename, loaders.OrderedLoader),
+                load_file(filename, loaders.COrderedLoader),
+                filename)
+
+    def test_zenpackspec_parity(self):
+        for basename in ('zenpack.yaml', 'zenpack2.yaml'):
+            filename = os.path.join(ZPLTEST1_DIR, basename)
+            expected = load_file(filename, loaders.ZenPackSpecLoader)
+            actual = load_file(filename, loaders.CZenPackSpecLoader)
+
+            self.assertEqual(
+                yaml.dump(expected.specparams, Dumper=Dumper),
+                yaml.dump(actual.specparams, Dumper=Dumper))
+
+            for name, spec in expected.classes.iteritems():
+                self.assertEqual(
+                    spec.source_location,
+                    actual.classes[name].source_location)
+
+            self.assertEqual(
+                [x.source_location for x in expected.class_relationships],
+                [x.source_location for x in actual.class_relationships])
+
+    def test_error_marks(self):
+        errors = []
+        for loader in (loaders.ZenPackSpecLoader, loaders.CZenPackSpecLoader):
+            try:
+                yaml.load(RESERVED_YAML, Loader=loader)
+            except yaml.constructor.ConstructorError as e:
+                errors.append(e)
+            else:
+                self.fail("{} accepted a reserved keyword".format(loader.__name__))
+
+        expected, actual = errors
+        for e in errors:
+            self.assertIn("reserved keyword 'class'", e.problem)
+        self.assertEqual(
+            (expected.problem_mark.line, expected.problem_mark.column),
+            (actual.problem_mark.line, actual.problem_mark.column))
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestLibYAMLLoader))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
@@ -14,11 +14,16 @@
 Tests YAML loading from multiple files
 
 """
+# stdlib Imports
+import imp
+import os
+
 # zenpacklib Imports
 from ZenPacks.zenoss.ZenPackLib import zenpacklib
 import yaml
 from ZenPacks.zenoss.ZenPackLib.lib.helpers.Dumper import Dumper
-from ZenPacks.zenoss.ZenPackLib.lib.helpers.utils import compare_zenpackspecs
+from ZenPacks.zenoss.ZenPackLib.lib.helpers.utils import (
+    compare_zenpackspecs, get_load_workers, get_merged_docs, get_optimized_yaml)
 from ZenPacks.zenoss.ZenPackLib.lib.base.ZenPack import ZenPack
 
 # Zenoss Imports
@@ -299,6 +304,47 @@ class TestMultiYAML(BaseTestCase):
         self.assertTrue(compare_equals,
                         'YAML merged dictionary test failed:\n{}'.format(diff))
 
+    def test_multi_yaml_pipeline(self):
+        """merged node graphs match the dump and re-parse round trip"""
+        docs = [YAML_DOC_1, YAML_DOC_2, YAML_DOC_3, YAML_DOC_4, YAML_DOC_5, YAML_DOC_6]
+
+        cfg_legacy = zenpacklib.load_yaml(get_optimized_yaml(get_merged_docs(docs)))
+        legacy_yaml = yaml.dump(cfg_legacy.specparams, Dumper=Dumper)
+
+        for workers in ('0', '2'):
+            os.environ['ZPL_LOAD_WORKERS'] = workers
+            try:
+                cfg_multi = zenpacklib.load_yaml(docs)
+            finally:
+                del os.environ['ZPL_LOAD_WORKERS']
+
+            self.assertEqual(
+                ['parse', 'merge', 'construct', 'create'],
+                cfg_multi.load_timings.keys())
+
+            multi_yaml = yaml.dump(cfg_multi.specparams, Dumper=Dumper)
+            diff = ZenPack.get_yaml_diff(legacy_yaml, multi_yaml)
+            self.assertTrue(
+                compare_zenpackspecs(legacy_yaml, multi_yaml),
+                'YAML merged node test failed ({} workers):\n{}'.format(workers, diff))
+
+    def test_load_workers(self):
+        """worker processes are opt-in and never used during imports"""
+        self.assertEqual(0, get_load_workers(10))
+
+        os.environ['ZPL_LOAD_WORKERS'] = '2'
+        try:
+            self.assertEqual(2, get_load_workers(10))
+            self.assertEqual(0, get_load_workers(2))
+
+            imp.acquire_lock()
+            try:
+                self.assertEqual(0, get_load_workers(10))
+            finally:
+                imp.release_lock()
+        finally:
+            del os.environ['ZPL_LOAD_WORKERS']
+
 
 def test_suite():
     """Return test suite for this module."""
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Batched relationship setter tests."""
+
+# stdlib Imports
+import traceback
+
+# Zope Imports
+from zope.event import notify
+
+# Zenoss Imports
+import Globals  # noqa
+from Products.ZenUtils.Utils import unused
+unused(Globals)
+
+from Products.DataCollector.ApplyDataMap import ApplyDataMap
+from Products.DataCollector.plugins.DataMaps import ObjectMap, RelationshipMap
+from Products.ZenTestCase.BaseTestCase import BaseTestCase
+from Products.Zuul.catalog.events import IndexingEvent
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib import zenpacklib
+
+
+YAML = """
+name: ZenPacks.test.RelationshipBatch
+
+class_relationships:
+  - BatchDevice 1:MC BatchPool
+  - BatchDevice 1:MC BatchVolume
+  - BatchDevice 1:MC BatchHost
+  - BatchPool 1:M BatchVolume
+  - BatchVolume M:M BatchHost
+
+classes:
+  BatchDevice:
+    base: [zenpacklib.Device]
+
+  BatchPool:
+    base: [zenpacklib.Component]
+
+  BatchVolume:
+    base: [zenpacklib.Component]
+
+  BatchHost:
+    base: [zenpacklib.Component]
+"""
+
+MODNAME = "ZenPacks.test.RelationshipBatch.{}"
+
+
+def create_device(dmd, device_id, datamaps):
+    deviceclass = dmd.Devices.createOrganizer("/Test")
+    deviceclass.setZenProperty(
+        "zPythonClass", MODNAME.format("BatchDevice"))
+    device = deviceclass.createInstance(device_id)
+    device.setPerformanceMonitor("localhost")
+    device.index_object()
+    notify(IndexingEvent(device))
+
+    adm = ApplyDataMap()._applyDataMap
+
+    [adm(device, datamap) for datamap in datamaps]
+
+    for component in device.getDeviceComponentsNoIndexGen():
+        component.index_object()
+        notify(IndexingEvent(component))
+
+    return device
+
+
+class TestRelationshipBatch(BaseTestCase):
+    """Batched relationship setter tests."""
+
+    def afterSetUp(self):
+        super(TestRelationshipBatch, self).afterSetUp()
+        try:
+            zenpacklib.load_yaml(YAML)
+        except Exception:
+            self.fail(traceback.format_exc(limit=0))
+
+        def relmap(classname, relname, ids):
+            return RelationshipMap(
+                modname=MODNAME.format(classname),
+                relname=relname,
+                objmaps=[ObjectMap({"id": x}) for x in ids])
+
+        self.device = create_device(self.dmd, "test-device", [
+            relmap("BatchPool", "batchPools", ["pool-1", "pool-2"]),
+            relmap("BatchVolume", "batchVolumes", ["vol-1", "vol-2", "vol-3"]),
+            relmap("BatchHost", "batchHosts", ["host-1", "host-2"]),
+            ])
+
+    def test_batch_setters(self):
+        batch = zenpacklib.RelationshipBatch()
+        for volume in self.device.batchVolumes():
+            volume.set_batchPool("pool-1", batch=batch)
+            volume.set_batchHosts(["host-1", "host-2"], batch=batch)
+
+        # Nothing changes until the batch is applied.
+        self.assertEqual(6, len(batch))
+        self.assertEqual([], self.device.batchPools._getOb("pool-1").get_batchVolumes())
+
+        stats = batch.apply()
+
+        self.assertEqual(1, stats['devices'])
+        self.assertEqual(1, stats['queries'])
+        self.assertEqual(3, stats['components'])
+        self.assertEqual(9, stats['added'])
+        self.assertEqual(0, stats['missing'])
+        # pool-1, host-1 and host-2 are each indexed once.
+        self.assertEqual(3, stats['indexed'])
+
+        pool = self.device.batchPools._getOb("pool-1")
+        self.assertItemsEqual(["vol-1", "vol-2", "vol-3"], pool.get_batchVolumes())
+
+        for volume in self.device.batchVolumes():
+            self.assertEqual("pool-1", volume.get_batchPool())
+            self.assertItemsEqual(["host-1", "host-2"], volume.get_batchHosts())
+
+    def test_batch_removes_and_missing(self):
+        volume = self.device.batchVolumes._getOb("vol-1")
+        volume.set_batchPool("pool-1")
+        volume.set_batchHosts(["host-1", "host-2"])
+
+        batch = zenpacklib.RelationshipBatch()
+        volume.set_batchPool("pool-2", batch=batch)
+        volume.set_batchHosts(["host-2", "host-3"], batch=batch)
+        stats = batch.apply()
+
+        self.assertEqual(2, stats['removed'])
+        self.assertEqual(1, stats['added'])
+        self.assertEqual(1, stats['missing'])
+        self.assertEqual("pool-2", volume.get_batchPool())
+        self.assertEqual(["host-2"], volume.get_batchHosts())
+
+        # An unchanged batch doesn't query or index anything.
+        batch = zenpacklib.RelationshipBatch()
+        volume.set_batchPool("pool-2", batch=batch)
+        stats = batch.apply()
+        self.assertEqual(0, stats['queries'])
+        self.assertEqual(0, stats['indexed'])
+
+    def test_batch_duplicate_and_inverse_updates(self):
+        volume = self.device.batchVolumes._getOb("vol-1")
+        pool = self.device.batchPools._getOb("pool-1")
+
+        batch = zenpacklib.RelationshipBatch()
+        volume.set_batchHosts(["host-1"], batch=batch)
+        volume.set_batchHosts(["host-2"], batch=batch)
+        volume.set_batchPool("pool-1", batch=batch)
+        pool.set_batchVolumes(["vol-1"], batch=batch)
+        stats = batch.apply()
+
+        # The inverse update sees the pool already added.
+        self.assertEqual(2, stats['added'])
+        self.assertEqual(["host-2"], volume.get_batchHosts())
+        self.assertEqual("pool-1", volume.get_batchPool())
+        self.assertEqual(["vol-1"], pool.get_batchVolumes())
+
+        # Statistics aren't carried over to the next apply.
+        volume.set_batchPool("pool-2", batch=batch)
+        stats = batch.apply()
+        self.assertEqual(1, stats['added'])
+        self.assertEqual(1, stats['removed'])
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestRelationshipBatch))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Compiled spec cache tests."""
+
+# stdlib Imports
+import os
+import shutil
+import tempfile
+
+import yaml
+
+# Zenoss Imports
+import Globals  # noqa
+from Products.ZenUtils.Utils import unused
+unused(Globals)
+from Products.ZenTestCase.BaseTestCase import BaseTestCase
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib import zenpacklib
+from ZenPacks.zenoss.ZenPackLib.lib.helpers.Dumper import Dumper
+from ZenPacks.zenoss.ZenPackLib.lib.helpers.utils import (
+    SPEC_CACHE_FILENAME, get_spec_cache, load_spec_cached)
+
+
+YAML_DOC = """
+name: ZenPacks.zenoss.SpecCache
+
+class_relationships:
+  - CacheDevice 1:MC CacheComponent
+
+classes:
+  CacheDevice:
+    base: [zenpacklib.Device]
+
+  CacheComponent:
+    base: [zenpacklib.Component]
+    properties:
+      size:
+        type: int
+        label: Size
+
+device_classes:
+  /SpecCache:
+    templates:
+      CacheComponent:
+        datasources:
+          stats:
+            type: COMMAND
+            commandTemplate: echo
+            datapoints:
+              size: GAUGE
+"""
+
+
+class TestSpecCache(BaseTestCase):
+    """Compiled spec cache tests."""
+
+    def afterSetUp(self):
+        super(TestSpecCache, self).afterSetUp()
+        self.path = tempfile.mkdtemp()
+        self.yaml_file = os.path.join(self.path, 'zenpack.yaml')
+        with open(self.yaml_file, 'w') as f:
+            f.write(YAML_DOC)
+
+        os.environ['ZPL_SPEC_CACHE'] = '1'
+
+    def beforeTearDown(self):
+        del os.environ['ZPL_SPEC_CACHE']
+        shutil.rmtree(self.path)
+        super(TestSpecCache, self).beforeTearDown()
+
+    def test_cache_hit(self):
+        cfg_cold = zenpacklib.load_yaml(self.yaml_file)
+        self.assertTrue(os.path.isfile(os.path.join(self.path, SPEC_CACHE_FILENAME)))
+
+        def construct(pickle_params):
+            self.fail("YAML was constructed despite a cache hit")
+
+        cfg_warm = load_spec_cached([self.yaml_file], construct)
+        cfg_warm.create()
+
+        self.assertEqual(
+            yaml.dump(cfg_cold.specparams, Dumper=Dumper),
+            yaml.dump(cfg_warm.specparams, Dumper=Dumper))
+
+    def test_cache_mismatch(self):
+        zenpacklib.load_yaml(self.yaml_file)
+        path, key = get_spec_cache([self.yaml_file])
+
+        with open(self.yaml_file, 'a') as f:
+            f.write("\nzProperties:\n  zSpecCache:\n    default: 1\n")
+
+        cfg = zenpacklib.load_yaml(self.yaml_file)
+        self.assertIn('zSpecCache', cfg.zProperties)
+        self.assertNotEqual(key, get_spec_cache([self.yaml_file])[1])
+
+    def test_cache_disabled(self):
+        del os.environ['ZPL_SPEC_CACHE']
+        try:
+            self.assertEqual((None, None), get_spec_cache([self.yaml_file]))
+            zenpacklib.load_yaml(self.yaml_file)
+            self.assertFalse(os.path.exists(os.path.join(self.path, SPEC_CACHE_FILENAME)))
+        finally:
+            os.environ['ZPL_SPEC_CACHE'] = '1'
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestSpecCache))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Spec parameter schema tests."""
+
+# Zenoss Imports
+import Globals  # noqa
+from Products.ZenUtils.Utils import unused
+unused(Globals)
+from Products.ZenTestCase.BaseTestCase import BaseTestCase
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib.lib.helpers.SpecSchema import SpecSchema
+from ZenPacks.zenoss.ZenPackLib.lib.spec.RRDDatasourceSpec import RRDDatasourceSpec
+from ZenPacks.zenoss.ZenPackLib.lib.spec.RRDTemplateSpec import RRDTemplateSpec
+from ZenPacks.zenoss.ZenPackLib.lib.params.RRDTemplateSpecParams import RRDTemplateSpecParams
+
+
+class TestSpecSchema(BaseTestCase):
+    """Spec parameter schema tests."""
+
+    def test_schema(self):
+        schema = SpecSchema.get(RRDDatasourceSpec)
+        self.assertIs(schema, SpecSchema.get(RRDDatasourceSpec))
+        self.assertIs(RRDDatasourceSpec.init_params, schema.params)
+
+        self.assertEqual('sourcetype', schema.yaml_params['type'])
+        self.assertEqual('enabled', schema.yaml_params['enabled'])
+        self.assertNotIn('sourcetype', schema.yaml_params)
+        self.assertEqual(['extra_params'], schema.extra_params)
+        self.assertEqual({'datapoints': 'RRDDatapointSpec'}, schema.specs_params)
+
+    def test_spec_class(self):
+        self.assertIs(RRDDatasourceSpec, SpecSchema.get_spec_class('RRDDatasourceSpec'))
+        self.assertIsNone(SpecSchema.get_spec_class('NoSuchSpec'))
+
+    def test_spec_params(self):
+        params = RRDTemplateSpecParams.init_params
+        self.assertEqual(
+            'SpecsParameter(RRDDatasourceSpecParams)',
+            params['datasources']['type'])
+        self.assertEqual(
+            'SpecsParameter(RRDDatasourceSpec)',
+            RRDTemplateSpec.init_params['datasources']['type'])
+        self.assertIsNot(
+            RRDTemplateSpec.init_params['datasources']['default'],
+            params['datasources']['default'])
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestSpecSchema))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
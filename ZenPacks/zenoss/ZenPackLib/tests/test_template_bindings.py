@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Template binding cache tests."""
+
+# stdlib Imports
+import transaction
+
+# zenpacklib Imports
+from ZenPacks.zenoss.ZenPackLib.tests import ZPLBaseTestCase
+from ZenPacks.zenoss.ZenPackLib.lib.base.TemplateBindings import (
+    TEMPLATE_BINDINGS, get_device_class_chain, get_templates_serials)
+
+
+YAML_DOC = """
+name: ZenPacks.zenoss.TemplateBindings
+
+class_relationships:
+  - BindingDevice 1:MC BindingComponent
+
+classes:
+  BindingDevice:
+    base: [zenpacklib.Device]
+
+  BindingComponent:
+    base: [zenpacklib.Component]
+    monitoring_templates: [BindingTemplate]
+"""
+
+
+class TestTemplateBindings(ZPLBaseTestCase):
+    """Template binding cache tests."""
+
+    yaml_doc = YAML_DOC
+    build = True
+
+    def afterSetUp(self):
+        super(TestTemplateBindings, self).afterSetUp()
+        TEMPLATE_BINDINGS.clear()
+
+        parent = self.dmd.Devices.createOrganizer('/ZPL/Bindings')
+        parent.manage_addRRDTemplate('BindingTemplate')
+        parent.manage_addRRDTemplate('DeviceTemplate')
+        self.device_class = self.dmd.Devices.createOrganizer('/ZPL/Bindings/Child')
+        self.device_class.setZenProperty(
+            'zPythonClass', 'ZenPacks.zenoss.TemplateBindings.BindingDevice')
+        self.device_class.setZenProperty('zDeviceTemplates', ['DeviceTemplate'])
+
+        cfg = self.configs.get('ZenPacks.zenoss.TemplateBindings').get('cfg')
+        cls = cfg.zenpack_module.BindingComponent.BindingComponent
+
+        self.device = self.device_class.createInstance('binding-device')
+        self.components = []
+        for i in range(3):
+            component_id = 'binding-component-{}'.format(i)
+            self.device.bindingComponents._setObject(component_id, cls(component_id))
+            self.components.append(
+                self.device.bindingComponents._getOb(component_id))
+
+    def beforeTearDown(self):
+        TEMPLATE_BINDINGS.clear()
+        super(TestTemplateBindings, self).beforeTearDown()
+
+    def get_ids(self, obj):
+        return [x.id for x in obj.getRRDTemplates()]
+
+    def test_device_side_effect_free(self):
+        self.device_class.manage_addRRDTemplate('DeviceTemplate-addition')
+        self.assertEqual(
+            ['DeviceTemplate', 'DeviceTemplate-addition'],
+            self.get_ids(self.device))
+        self.assertEqual(['DeviceTemplate'], self.device.zDeviceTemplates)
+
+    def test_invalidation(self):
+        component = self.components[0]
+        self.assertEqual(['BindingTemplate'], self.get_ids(component))
+
+        self.device_class.manage_addRRDTemplate('BindingTemplate-replacement')
+        self.assertEqual(['BindingTemplate-replacement'], self.get_ids(component))
+
+        self.device_class.rrdTemplates._delObject('BindingTemplate-replacement')
+        self.assertEqual(['BindingTemplate'], self.get_ids(component))
+
+    def test_cached(self):
+        transaction.savepoint()
+        if get_templates_serials(get_device_class_chain(self.device_class)) is None:
+            return
+
+        self.assertEqual(['BindingTemplate'], self.get_ids(self.components[0]))
+        self.assertEqual(1, len(TEMPLATE_BINDINGS.bindings))
+
+        def resolve():
+            self.fail("cached binding was resolved again")
+
+        templates = TEMPLATE_BINDINGS.get_templates(
+            (self.components[1], self.device),
+            self.device_class,
+            ('BindingTemplate',),
+            resolve)
+        self.assertEqual(['BindingTemplate'], [x.id for x in templates])
+
+        # Local templates are never taken from the cache.
+        self.components[2].makeLocalRRDTemplate('BindingTemplate')
+        self.assertEqual(
+            self.components[2].getPrimaryId(),
+            self.components[2].getRRDTemplates()[0].getPrimaryParent().getPrimaryId())
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestTemplateBindings))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""
+    Test structural comparison of templates with their specs
+"""
+from ZenPacks.zenoss.ZenPackLib.tests import ZPLBaseTestCase
+from ZenPacks.zenoss.ZenPackLib.lib.helpers.TemplateDiff import template_diff
+
+YAML_DOC = """name: ZenPacks.zenoss.ZenPackLib
+device_classes:
+  /Server:
+    templates:
+      Device:
+        description: Template with a bit of everything
+        targetPythonClass: Products.ZenModel.Device
+        thresholds:
+          CPU Utilization:
+            dsnames: [ssCpuRawIdle]
+            eventClass: /Perf/CPU
+            severity: 4
+            minval: '2'
+            escalateCount: 5
+          CPU Maximum:
+            dsnames: [ssCpuRawIdle_ssCpuRawIdle]
+            maxval: '95'
+            enabled: false
+        datasources:
+          ssCpuRawIdle:
+            type: SNMP
+            oid: 1.3.6.1.4.1.2021.11.53.0
+            datapoints:
+              ssCpuRawIdle:
+                rrdtype: DERIVE
+                rrdmin: 0
+                rrdmax: 100
+                aliases: {cpu__pct: '100,/'}
+          laLoadInt5:
+            type: SNMP
+            oid: 1.3.6.1.4.1.2021.10.1.5.2
+            severity: 2
+            cycletime: 60
+            datapoints:
+              laLoadInt5: GAUGE
+          uptime:
+            type: COMMAND
+            commandTemplate: echo OK
+            usessh: true
+            datapoints:
+              uptime: GAUGE_MIN_0
+        graphs:
+          CPU:
+            units: percent
+            miny: 0
+            maxy: 100
+            comments: [Idle CPU]
+            graphpoints:
+              Idle:
+                dpName: ssCpuRawIdle_ssCpuRawIdle
+                lineType: AREA
+                color: 00cc00
+                includeThresholds: true
+                thresholdLegends:
+                  CPU Utilization:
+                    legend: Low idle
+                    color: ff0000
+          Load:
+            units: processes
+            graphpoints:
+              laLoadInt5:
+                dpName: laLoadInt5_laLoadInt5
+                lineType: LINE
+                lineWidth: 2
+"""
+
+YAML_PING = """name: ZenPacks.zenoss.ZenPackLib
+device_classes:
+  /Server:
+    templates:
+      Ping:
+        datasources:
+          ping:
+            type: PING
+"""
+
+
+class TestTemplateDiff(ZPLBaseTestCase):
+    """
+    Test that templates match the spec they were created from
+    """
+    yaml_doc = [YAML_DOC]
+
+    def get_spec(self, config, name='Device'):
+        cfg = config.get('cfg')
+        return cfg.device_classes.get('/Server').templates.get(name)
+
+    def test_created(self):
+        tspec = self.get_spec(self.configs.get('ZenPacks.zenoss.ZenPackLib'))
+        template = tspec.create(self.dmd, False)
+
+        # thresholdLegends were applied to the threshold graph point
+        graphpoints = template.graphDefs._getOb('CPU').graphPoints
+        self.assertEquals('Low idle', graphpoints._getOb('CPU Utilization').legend)
+
+        # SNMP oids and extra_params were set
+        datasource = template.datasources._getOb('laLoadInt5')
+        self.assertIsInstance(datasource.oid, str)
+        self.assertEquals(60, datasource.cycletime)
+
+        diff = template_diff(template, tspec)
+        self.assertIsNone(diff, 'Unexpected difference:\n{}'.format(diff))
+
+    def test_modified(self):
+        tspec = self.get_spec(self.configs.get('ZenPacks.zenoss.ZenPackLib'))
+        template = tspec.create(self.dmd, False)
+
+        template.thresholds._getOb('CPU Maximum').maxval = '90'
+        self.assertIsNotNone(template_diff(template, tspec))
+
+    def test_added_datapoints(self):
+        tspec = self.get_spec(self.get_config(YAML_PING), 'Ping')
+        template = self.get_spec(
+            self.configs.get('ZenPacks.zenoss.ZenPackLib')).create(self.dmd, False)
+        if 'PING' not in dict(template.getDataSourceOptions()):
+            self.skipTest('PING datasources are not available')
+
+        template = tspec.create(self.dmd, False)
+        diff = template_diff(template, tspec)
+        self.assertIsNone(diff, 'Unexpected difference:\n{}'.format(diff))
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestTemplateDiff))
+    return suite
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""
+    Test that installs skip templates unchanged since they were created
+"""
+from ZenPacks.zenoss.ZenPackLib.tests import ZPLBaseTestCase
+
+YAML_DOC = """name: ZenPacks.zenoss.ZenPackLib
+device_classes:
+  /Server:
+    templates:
+      Device:
+        description: Original description
+        datasources:
+          sysUpTime:
+            type: SNMP
+            datapoints:
+              sysUpTime: GAUGE
+            oid: 1.3.6.1.2.1.25.1.1.0
+"""
+
+YAML_CHANGED = YAML_DOC.replace('Original description', 'Changed description')
+
+
+class TestTemplateFingerprints(ZPLBaseTestCase):
+    """
+    Test template fingerprints recorded and checked by update_object
+    """
+    yaml_doc = [YAML_DOC]
+
+    def update(self, config):
+        cfg = config.get('cfg')
+        tspec = cfg.device_classes.get('/Server').templates.get('Device')
+        tspec_param = cfg.specparams.device_classes.get('/Server').templates.get('Device')
+        zenpack = config.get('schema').ZenPack(self.dmd)
+        deviceclass = tspec.deviceclass_spec.create_organizer(self.dmd)
+        result = zenpack.update_object(
+            self.app, deviceclass, 'rrdTemplates', 'Device', tspec, tspec_param)
+        return result, deviceclass.rrdTemplates._getOb('Device')
+
+    def test_fingerprints(self):
+        orig = self.configs.get('ZenPacks.zenoss.ZenPackLib')
+        result, template = self.update(orig)
+        self.assertEquals(result, 'created')
+        self.assertTrue(template.zpl_spec_fingerprint)
+        self.assertTrue(template.zpl_contents_fingerprint)
+
+        # installing the same spec again skips the template
+        result, template = self.update(orig)
+        self.assertEquals(result, 'skipped')
+
+        # a changed spec updates it
+        result, template = self.update(self.get_config(YAML_CHANGED))
+        self.assertEquals(result, 'updated')
+        self.assertEquals(template.description, 'Changed description')
+
+        # a locally modified template isn't skipped
+        template.description = 'Local description'
+        result, template = self.update(self.get_config(YAML_CHANGED))
+        self.assertEquals(result, 'updated')
+        self.assertEquals(template.description, 'Changed description')
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestTemplateFingerprints))
+    return suite
+
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
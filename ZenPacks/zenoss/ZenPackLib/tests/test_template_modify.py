@@ -324,8 +324,11 @@ class TestTemplateModified(ZPLBaseTestCase):
         new_tspec = new_cfg.device_classes.get('/Server').templates.get('Device')
         new_tspec_param = new_cfg.specparams.device_classes.get('/Server').templates.get('Device')
 
+        template_ids = orig_template.getPrimaryParent().objectIds()
         diff = zenpack.object_changed(self.dmd, orig_template, new_tspec, new_tspec_param)
         self.assertEquals(diff, expected, 'Expected:\n{}\ngot:\n{}'.format(expected, diff))
+        # no prototype template is created for the comparison
+        self.assertEquals(template_ids, orig_template.getPrimaryParent().objectIds())
 
 
 def test_suite():
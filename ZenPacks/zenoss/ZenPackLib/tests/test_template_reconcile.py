@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""
+    Test in-place reconciliation of templates with their specs
+"""
+from Acquisition import aq_base
+from ZenPacks.zenoss.ZenPackLib.tests import ZPLBaseTestCase
+
+YAML_DOC = """name: ZenPacks.zenoss.ZenPackLib
+device_classes:
+  /Server:
+    templates:
+      Device:
+        description: Original description
+        thresholds:
+          CPU Utilization:
+            dsnames: [ssCpuRawIdle_ssCpuRawIdle]
+            eventClass: /Perf/CPU
+            minval: '2'
+        datasources:
+          laLoadInt5:
+            type: SNMP
+            datapoints:
+              laLoadInt5:
+                aliases: {loadAverage5min: '100,/'}
+            oid: 1.3.6.1.4.1.2021.10.1.5.2
+          ssCpuRawIdle:
+            type: SNMP
+            datapoints:
+              ssCpuRawIdle: DERIVE_MIN_0
+            oid: 1.3.6.1.4.1.2021.11.53.0
+          sysUpTime:
+            type: SNMP
+            datapoints:
+              sysUpTime: GAUGE
+            oid: 1.3.6.1.2.1.25.1.1.0
+        graphs:
+          Load Average 5 min:
+            units: processes
+            graphpoints:
+              laLoadInt5:
+                dpName: laLoadInt5_laLoadInt5
+                lineType: AREA
+"""
+
+YAML_CHANGED = """name: ZenPacks.zenoss.ZenPackLib
+device_classes:
+  /Server:
+    templates:
+      Device:
+        description: Changed description
+        thresholds:
+          CPU Utilization:
+            dsnames: [ssCpuRawIdle_ssCpuRawIdle]
+            eventClass: /Perf/CPU
+            minval: '3'
+        datasources:
+          laLoadInt5:
+            type: SNMP
+            datapoints:
+              laLoadInt5:
+                aliases: {loadAverage5min: '100,/', load5: '1,*'}
+            oid: 1.3.6.1.4.1.2021.10.1.5.2
+          ssCpuRawIdle:
+            type: SNMP
+            datapoints:
+              ssCpuRawIdle: DERIVE_MIN_0
+            oid: 1.3.6.1.4.1.2021.11.53.0
+          memAvailSwap:
+            type: SNMP
+            datapoints:
+              memAvailSwap: GAUGE
+            oid: 1.3.6.1.4.1.2021.4.4.0
+        graphs:
+          Load Average 5 min:
+            units: processes
+            graphpoints:
+              laLoadInt5:
+                dpName: laLoadInt5_laLoadInt5
+                lineType: AREA
+"""
+
+
+class TestTemplateReconcile(ZPLBaseTestCase):
+    """
+    Test that reconciled templates match their spec with minimal edits
+    """
+    yaml_doc = [YAML_DOC]
+
+    def get_specs(self, config):
+        cfg = config.get('cfg')
+        tspec = cfg.device_classes.get('/Server').templates.get('Device')
+        tspec_param = cfg.specparams.device_classes.get('/Server').templates.get('Device')
+        return tspec, tspec_param
+
+    def test_unchanged(self):
+        orig = self.configs.get('ZenPacks.zenoss.ZenPackLib')
+        tspec, tspec_param = self.get_specs(orig)
+        template = tspec.create(self.dmd, False)
+        datasource = aq_base(template.datasources._getOb('laLoadInt5'))
+
+        edits = tspec.reconcile(self.dmd, False)
+
+        self.assertEquals(edits.changed, 0, 'Unexpected edits: {}'.format(edits))
+        self.assertIs(datasource, aq_base(template.datasources._getOb('laLoadInt5')))
+
+    def test_changed(self):
+        orig = self.configs.get('ZenPacks.zenoss.ZenPackLib')
+        tspec, _ = self.get_specs(orig)
+        template = tspec.create(self.dmd, False)
+        threshold = aq_base(template.thresholds._getOb('CPU Utilization'))
+        unchanged = aq_base(template.datasources._getOb('ssCpuRawIdle'))
+        graph = aq_base(template.graphDefs._getOb('Load Average 5 min'))
+
+        new = self.get_config(YAML_CHANGED)
+        new_tspec, new_tspec_param = self.get_specs(new)
+        zenpack = new.get('schema').ZenPack(self.dmd)
+
+        edits = new_tspec.reconcile(self.dmd, False)
+        counts = edits.counts
+        self.assertEquals(counts['template']['updated'], 1)
+        self.assertEquals(counts['thresholds']['updated'], 1)
+        self.assertEquals(counts['datasources']['added'], 1)
+        self.assertEquals(counts['datasources']['removed'], 1)
+        self.assertEquals(counts['datasources']['unchanged'], 2)
+        self.assertEquals(counts['datapoints']['updated'], 1)
+        self.assertEquals(counts['graphs']['unchanged'], 1)
+
+        # objects are updated in place rather than replaced
+        self.assertIs(threshold, aq_base(template.thresholds._getOb('CPU Utilization')))
+        self.assertIs(unchanged, aq_base(template.datasources._getOb('ssCpuRawIdle')))
+        self.assertIs(graph, aq_base(template.graphDefs._getOb('Load Average 5 min')))
+        self.assertIsNone(template.datasources._getOb('sysUpTime', None))
+
+        # and the result is the same as a newly created template
+        diff = zenpack.object_changed(self.dmd, template, new_tspec, new_tspec_param)
+        self.assertIsNone(diff, 'Unexpected difference:\n{}'.format(diff))
+
+
+def test_suite():
+    """Return test suite for this module."""
+    from unittest import TestSuite, makeSuite
+    suite = TestSuite()
+    suite.addTest(makeSuite(TestTemplateReconcile))
+    return suite
+
+
+if __name__ == "__main__":
+    from zope.testrunner.runner import Runner
+    runner = Runner(found_suites=[test_suite()])
+    runner.run()
@@ -0,0 +1,1001 @@
+#! /usr/bin/env python
+##############################################################################
+# Copyright (C) Zenoss, Inc. 2018, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+##############################################################################
+
+"""
+This tool measures zenpacklib hot paths.  It must be run with the Python
+of a Zenoss installation since it builds real zenpacklib classes.
+
+Usage:
+
+    python benchmark.py --list
+    python benchmark.py [-n COUNT] NAME [NAME ...]
+
+Each benchmark prints one line per measurement with the number of
+operations, the elapsed time and the resulting rate.
+"""
+
+import os
+import sys
+import time
+from collections import OrderedDict
+from optparse import OptionParser
+
+import Globals
+from Products.ZenUtils.Utils import unused
+unused(Globals)
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    """Register the decorated function as a named benchmark."""
+    def wrap(f):
+        BENCHMARKS[name] = f
+        return f
+    return wrap
+
+
+def timed(func, count):
+    """Return seconds taken to call func(i) for i in range(count)."""
+    start = time.time()
+    for i in xrange(count):
+        func(i)
+    return time.time() - start
+
+
+def report(label, count, seconds, unit='ops'):
+    """Print a single measurement."""
+    rate = count / seconds if seconds else float('inf')
+    print "{:<45} {:>9} {} in {:8.3f}s ({:12.0f} {}/s)".format(
+        label, count, unit, seconds, rate, unit)
+
+
+def load_spec(yaml_doc):
+    """Return created ZenPackSpec for yaml_doc."""
+    from ZenPacks.zenoss.ZenPackLib import zenpacklib
+    return zenpacklib.load_yaml(yaml_doc)
+
+
+def get_class(cfg, name):
+    """Return the generated model class for name."""
+    return getattr(getattr(cfg.zenpack_module, name), name)
+
+
+_dmd = None
+
+
+def get_dmd():
+    """Return a dmd connection. Changes are never committed."""
+    global _dmd
+    if _dmd is None:
+        from Products.ZenUtils.ZenScriptBase import ZenScriptBase
+        _dmd = ZenScriptBase(connect=True, noopts=True).dmd
+    return _dmd
+
+
+def create_device(cfg, classname, device_id):
+    """Return a new device of the generated classname in /ZPLBenchmark."""
+    deviceclass = get_dmd().Devices.createOrganizer('/ZPLBenchmark')
+    deviceclass.setZenProperty(
+        'zPythonClass', '{}.{}'.format(cfg.name, classname))
+    device = deviceclass.findDeviceByIdExact(device_id)
+    if device:
+        device.deleteDevice()
+    return deviceclass.createInstance(device_id)
+
+
+def add_components(cfg, device, classname, relname, count, prefix):
+    """Add and index count new components to relname on device."""
+    cls = get_class(cfg, classname)
+    rel = getattr(device, relname)
+    components = []
+    for i in xrange(count):
+        component_id = '{}-{}'.format(prefix, i)
+        rel._setObject(component_id, cls(component_id))
+        component = rel._getOb(component_id)
+        component.index_object()
+        components.append(component)
+    return components
+
+
+# Benchmarks ################################################################
+
+
+SETATTR_TYPES = ('int', 'float', 'boolean', 'string', 'lines')
+
+
+def setattr_yaml(count=50):
+    """Return YAML for a component class with count properties."""
+    lines = [
+        "name: ZenPacks.zenoss.ZPLBenchSetattr",
+        "classes:",
+        "  BenchComponent:",
+        "    base: [zenpacklib.Component]",
+        "    properties:",
+        ]
+    for i in xrange(count):
+        lines.append("      prop{}: {{type: {}}}".format(
+            i, SETATTR_TYPES[i % len(SETATTR_TYPES)]))
+    return '\n'.join(lines) + '\n'
+
+
+@benchmark('setattr')
+def bench_setattr(count):
+    """ComponentBase.__setattr__ on a class with 50 properties."""
+    from ZenPacks.zenoss.ZenPackLib.lib.base.ComponentBase import (
+        get_property_coercers)
+
+    cfg = load_spec(setattr_yaml(50))
+    ob = get_class(cfg, 'BenchComponent')('bench')
+    names = ['prop{}'.format(i) for i in xrange(50)]
+    # relationship plumbing and other attributes that are not _properties
+    others = ['_v_bench{}'.format(i) for i in xrange(50)]
+
+    def table(i):
+        setattr(ob, names[i % 50], '1')
+
+    def not_a_property(i):
+        setattr(ob, others[i % 50], '1')
+
+    def per_call(i):
+        # what __setattr__ used to do on every assignment
+        get_property_coercers(ob._properties).get(names[i % 50])
+        setattr(ob, names[i % 50], '1')
+
+    report('setattr property (coercer table)', count, timed(table, count))
+    report('setattr non-property (coercer table)', count, timed(not_a_property, count))
+    report('setattr property (per-call map, before)', count, timed(per_call, count))
+
+
+RELATIONSHIPS_YAML = """
+name: ZenPacks.zenoss.ZPLBenchRelationships
+class_relationships:
+  - BenchDevice 1:MC BenchPool
+  - BenchDevice 1:MC BenchVolume
+  - BenchPool 1:M BenchVolume
+classes:
+  BenchDevice:
+    base: [zenpacklib.Device]
+  BenchPool:
+    base: [zenpacklib.Component]
+  BenchVolume:
+    base: [zenpacklib.Component]
+"""
+
+
+@benchmark('relationships')
+def bench_relationships(count):
+    """set_<relname> one at a time vs. RelationshipBatch for COUNT links."""
+    import transaction
+    from ZenPacks.zenoss.ZenPackLib.lib.base.RelationshipBatch import (
+        RelationshipBatch)
+
+    cfg = load_spec(RELATIONSHIPS_YAML)
+
+    try:
+        device = create_device(cfg, 'BenchDevice', 'zpl-bench-relationships')
+        pools = add_components(
+            cfg, device, 'BenchPool', 'benchPools', max(1, count / 100), 'pool')
+        volumes = add_components(
+            cfg, device, 'BenchVolume', 'benchVolumes', count, 'volume')
+
+        def pool_id(i, offset):
+            return pools[(i + offset) % len(pools)].id
+
+        def single(i):
+            volumes[i].set_benchPool(pool_id(i, 0))
+
+        report('set_<relname> per component', count, timed(single, count))
+
+        batch = RelationshipBatch()
+        start = time.time()
+        for i, volume in enumerate(volumes):
+            volume.set_benchPool(pool_id(i, 1), batch=batch)
+        stats = batch.apply()
+        report('set_<relname> with RelationshipBatch', count, time.time() - start)
+
+        for key, value in stats.iteritems():
+            print "    {}: {}".format(key, value)
+    finally:
+        transaction.abort()
+
+
+INDEXING_YAML = """
+name: ZenPacks.zenoss.ZPLBenchIndexing
+class_relationships:
+  - BenchDevice 1:MC BenchComponent
+classes:
+  BenchDevice:
+    base: [zenpacklib.Device]
+  BenchComponent:
+    base: [zenpacklib.Component]
+    properties:
+      serial:
+        index_type: field
+        index_scope: both
+"""
+
+
+@benchmark('indexing')
+def bench_indexing(count):
+    """index_object three times per component with and without IndexingQueue."""
+    import transaction
+    from ZenPacks.zenoss.ZenPackLib.lib.base.IndexingQueue import IndexingQueue
+
+    cfg = load_spec(INDEXING_YAML)
+    enabled = IndexingQueue.enabled
+
+    try:
+        device = create_device(cfg, 'BenchDevice', 'zpl-bench-indexing')
+        components = add_components(
+            cfg, device, 'BenchComponent', 'benchComponents', count, 'component')
+
+        def reindex(i):
+            # e.g. modeling, a relationship change and a property change
+            for _ in xrange(3):
+                components[i].index_object()
+
+        IndexingQueue.disable()
+        report('index_object x3 (immediate)', count, timed(reindex, count))
+
+        IndexingQueue.enable()
+        before = dict(IndexingQueue.stats)
+        start = time.time()
+        for i in xrange(count):
+            reindex(i)
+        IndexingQueue.get().flush()
+        report('index_object x3 (IndexingQueue)', count, time.time() - start)
+
+        for key, value in IndexingQueue.stats.iteritems():
+            print "    {}: {}".format(key, value - before[key])
+    finally:
+        transaction.abort()
+        IndexingQueue.enabled = enabled
+
+
+@benchmark('catalogs')
+def bench_catalogs(count):
+    """index_object for 10000 sibling components with cached catalog handles."""
+    import transaction
+    from ZenPacks.zenoss.ZenPackLib.lib.base.CatalogBase import CatalogBase
+
+    cfg = load_spec(INDEXING_YAML)
+    count = min(count, 10000)
+
+    try:
+        device = create_device(cfg, 'BenchDevice', 'zpl-bench-catalogs')
+        components = add_components(
+            cfg, device, 'BenchComponent', 'benchComponents', count, 'component')
+
+        def uncached(i):
+            CatalogBase.invalidate_catalog_cache()
+            components[i].index_object()
+
+        def cached(i):
+            components[i].index_object()
+
+        def resolve(i):
+            components[i].resolve_all_catalogs()
+
+        def lookup(i):
+            components[i].get_all_catalogs()
+
+        report('resolve catalogs (uncached)', count, timed(resolve, count))
+        report('resolve catalogs (cached)', count, timed(lookup, count))
+        report('index_object (uncached catalogs)', count, timed(uncached, count))
+        report('index_object (cached catalogs)', count, timed(cached, count))
+    finally:
+        transaction.abort()
+
+
+NESTED_YAML = """
+name: ZenPacks.zenoss.ZPLBenchNested
+class_relationships:
+  - BenchDevice 1:MC BenchLevel1
+  - BenchLevel1 1:MC BenchLevel2
+  - BenchLevel2 1:MC BenchLevel3
+  - BenchLevel3 1:MC BenchLevel4
+  - BenchLevel4 1:MC BenchLevel5
+classes:
+  BenchDevice:
+    base: [zenpacklib.Device]
+  BenchLevel1:
+    base: [zenpacklib.Component]
+  BenchLevel2:
+    base: [zenpacklib.Component]
+  BenchLevel3:
+    base: [zenpacklib.Component]
+  BenchLevel4:
+    base: [zenpacklib.Component]
+  BenchLevel5:
+    base: [zenpacklib.Component]
+"""
+
+
+@benchmark('device')
+def bench_device(count):
+    """ComponentBase.device() on a component 5 containment levels deep."""
+    import transaction
+
+    cfg = load_spec(NESTED_YAML)
+
+    try:
+        obj = create_device(cfg, 'BenchDevice', 'zpl-bench-device')
+        for level in xrange(1, 6):
+            obj = add_components(
+                cfg, obj, 'BenchLevel{}'.format(level),
+                'benchLevel{}s'.format(level), 1, 'level')[0]
+
+        report('device() (walk, before)', count, timed(lambda i: obj.find_device(), count))
+        report('device() (cached)', count, timed(lambda i: obj.device(), count))
+    finally:
+        transaction.abort()
+
+
+FACETS_YAML = """
+name: ZenPacks.zenoss.ZPLBenchFacets
+class_relationships:
+  - BenchDevice 1:MC BenchNode
+  - BenchDevice 1:MC BenchTag
+  - BenchNode(childNodes) 1:M (parentNode)BenchNode
+  - BenchNode M:M BenchTag
+classes:
+  BenchDevice:
+    base: [zenpacklib.Device]
+  BenchNode:
+    base: [zenpacklib.Component]
+    extra_paths:
+      - ['(parentNode)+']
+  BenchTag:
+    base: [zenpacklib.Component]
+"""
+
+
+@benchmark('facets')
+def bench_facets(count):
+    """get_facets and getPaths for a leaf node in a 5-level facet graph."""
+    import transaction
+    from Products.Zuul.catalog.interfaces import IPathReporter
+
+    cfg = load_spec(FACETS_YAML)
+    count = max(1, count / 100)
+
+    try:
+        device = create_device(cfg, 'BenchDevice', 'zpl-bench-facets')
+        tags = add_components(cfg, device, 'BenchTag', 'benchTags', 20, 'tag')
+        nodes = add_components(cfg, device, 'BenchNode', 'benchNodes', 5, 'node')
+        for parent, child in zip(nodes, nodes[1:]):
+            child.parentNode.addRelation(parent)
+        for node in nodes:
+            for tag in tags:
+                node.benchTags.addRelation(tag)
+
+        leaf = nodes[-1]
+        streams = leaf._v_path_pattern_streams
+        reporter = IPathReporter(leaf)
+        facets = len(list(leaf.get_facets()))
+        paths = len(reporter.getPaths())
+
+        def uncompiled(i):
+            # match every path against every stream on each traversal
+            for single in [streams] + list(streams._singles or ()):
+                single._transitions.clear()
+            list(leaf.get_facets())
+
+        def compiled(i):
+            list(leaf.get_facets())
+
+        def get_paths(i):
+            reporter.getPaths()
+
+        report('get_facets (matched per traversal)', count * facets, timed(uncompiled, count), 'facets')
+        report('get_facets (compiled streams)', count * facets, timed(compiled, count), 'facets')
+        report('ComponentPathReporter.getPaths', count * paths, timed(get_paths, count), 'paths')
+    finally:
+        transaction.abort()
+
+
+def write_split_zenpack(path, files=40):
+    """Write a ZenPack's YAML split across files in path. Return filenames."""
+    filenames = []
+
+    def write(name, text):
+        filename = os.path.join(path, name)
+        with open(filename, 'w') as f:
+            f.write(text)
+        filenames.append(filename)
+
+    write('zenpack.yaml', "name: ZenPacks.zenoss.ZPLBenchLoad\n")
+    for i in xrange(files - 1):
+        write('class{:02d}.yaml'.format(i), """
+name: ZenPacks.zenoss.ZPLBenchLoad
+class_relationships:
+  - BenchDevice 1:MC BenchComponent{0}
+classes:
+  BenchDevice:
+    base: [zenpacklib.Device]
+  BenchComponent{0}:
+    base: [zenpacklib.Component]
+    monitoring_templates: [BenchComponent{0}]
+    properties:
+      status{0}: {{type: string, label: Status}}
+      size{0}: {{type: int, label: Size}}
+device_classes:
+  /ZPLBenchLoad:
+    templates:
+      BenchComponent{0}:
+        datasources:
+          stats:
+            type: COMMAND
+            commandTemplate: echo
+            datapoints:
+              a{0}: GAUGE
+              b{0}: DERIVE_MIN_0
+        graphs:
+          Stats:
+            graphpoints:
+              A: {{dpName: stats_a{0}}}
+""".format(i))
+
+    return filenames
+
+
+@benchmark('load')
+def bench_load(count):
+    """load_yaml of a ZenPack split across 40 files (COUNT/20000 loads)."""
+    import shutil
+    import tempfile
+    from ZenPacks.zenoss.ZenPackLib import zenpacklib
+    from ZenPacks.zenoss.ZenPackLib.lib.helpers.utils import (
+        get_merged_docs, get_optimized_yaml)
+
+    loads = max(1, count / 20000)
+    path = tempfile.mkdtemp()
+    workers = os.environ.get('ZPL_LOAD_WORKERS')
+
+    try:
+        files = write_split_zenpack(path)
+
+        def legacy(i):
+            zenpacklib.load_yaml(get_optimized_yaml(get_merged_docs(files)))
+
+        report('load_yaml 40 files (merge, dump, re-parse)', loads, timed(legacy, loads), 'loads')
+
+        for label, setting in (('serial', '0'), ('parallel', workers or 'auto')):
+            os.environ['ZPL_LOAD_WORKERS'] = setting
+
+            timings = OrderedDict()
+
+            def merged(i):
+                cfg = zenpacklib.load_yaml(path)
+                for phase, seconds in cfg.load_timings.iteritems():
+                    timings[phase] = timings.get(phase, 0.0) + seconds
+
+            report('load_yaml 40 files (merged nodes, {})'.format(label), loads, timed(merged, loads), 'loads')
+            for phase, seconds in timings.iteritems():
+                print "    {}: {:0.3f}s".format(phase, seconds / loads)
+    finally:
+        if workers is None:
+            os.environ.pop('ZPL_LOAD_WORKERS', None)
+        else:
+            os.environ['ZPL_LOAD_WORKERS'] = workers
+        shutil.rmtree(path)
+
+
+@benchmark('speccache')
+def bench_speccache(count):
+    """load_yaml cold vs. warm compiled spec cache (COUNT/20000 loads)."""
+    import shutil
+    import tempfile
+    from ZenPacks.zenoss.ZenPackLib import zenpacklib
+    from ZenPacks.zenoss.ZenPackLib.lib.helpers.utils import SPEC_CACHE_FILENAME
+
+    loads = max(1, count / 20000)
+    path = tempfile.mkdtemp()
+    cache_file = os.path.join(path, SPEC_CACHE_FILENAME)
+    enabled = os.environ.get('ZPL_SPEC_CACHE')
+    os.environ['ZPL_SPEC_CACHE'] = '1'
+
+    try:
+        write_split_zenpack(path)
+
+        def cold(i):
+            if os.path.exists(cache_file):
+                os.remove(cache_file)
+            zenpacklib.load_yaml(path)
+
+        def warm(i):
+            zenpacklib.load_yaml(path)
+
+        report('load_yaml 40 files (cold spec cache)', loads, timed(cold, loads), 'loads')
+        report('load_yaml 40 files (warm spec cache)', loads, timed(warm, loads), 'loads')
+    finally:
+        if enabled is None:
+            del os.environ['ZPL_SPEC_CACHE']
+        else:
+            os.environ['ZPL_SPEC_CACHE'] = enabled
+        shutil.rmtree(path)
+
+
+def read_test_yaml():
+    """Return YAML documents built from the tests/data fixtures.
+
+    Directories of partial YAML files are merged into a single document.
+
+    """
+    from ZenPacks.zenoss.ZenPackLib.lib.helpers.utils import (
+        get_merged_docs, get_optimized_yaml)
+
+    data = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'data')
+
+    documents = []
+    for dirpath, dirnames, files in sorted(os.walk(data)):
+        filenames = [
+            os.path.join(dirpath, x) for x in sorted(files)
+            if x.endswith('.yaml')]
+
+        if os.path.basename(dirpath) == 'test_dir_load':
+            documents.append(get_optimized_yaml(get_merged_docs(filenames)))
+            continue
+
+        for filename in filenames:
+            with open(filename, 'r') as f:
+                documents.append(f.read())
+
+    return documents
+
+
+@benchmark('libyaml')
+def bench_libyaml(count):
+    """Pure-Python vs. libyaml loaders over tests/data YAML (COUNT/1000 passes)."""
+    import yaml
+    from ZenPacks.zenoss.ZenPackLib.lib.helpers import loaders
+
+    passes = max(1, count / 1000)
+    contents = read_test_yaml()
+
+    if not loaders.LIBYAML:
+        print "libyaml is not available: Fast loaders are pure-Python"
+
+    for label, loader in (
+            ('OrderedLoader', loaders.OrderedLoader),
+            ('FastOrderedLoader', loaders.FastOrderedLoader),
+            ('ZenPackSpecLoader', loaders.ZenPackSpecLoader),
+            ('FastZenPackSpecLoader', loaders.FastZenPackSpecLoader)):
+
+        def compose(i):
+            for content in contents:
+                yaml.compose(content, Loader=loader)
+
+        def load(i):
+            for content in contents:
+                yaml.load(content, Loader=loader)
+
+        report('compose {} files ({})'.format(len(contents), label), passes, timed(compose, passes), 'passes')
+        report('load {} files ({})'.format(len(contents), label), passes, timed(load, passes), 'passes')
+
+
+def datapoints_yaml(count):
+    """Return YAML for a ZenPack with a template of count datapoints."""
+    lines = [
+        "name: ZenPacks.zenoss.ZPLBenchmark",
+        "device_classes:",
+        "  /ZPLBenchmark:",
+        "    templates:",
+        "      Device:",
+        "        datasources:",
+        ]
+
+    for i in xrange(0, count, 10):
+        lines.extend([
+            "          ds{}:".format(i),
+            "            type: COMMAND",
+            "            commandTemplate: echo",
+            "            datapoints:",
+            ])
+        lines.extend(
+            "              dp{}: {{rrdtype: GAUGE, rrdmin: 0}}".format(j)
+            for j in xrange(i, min(i + 10, count)))
+
+    return "\n".join(lines) + "\n"
+
+
+@benchmark('specschema')
+def bench_specschema(count):
+    """Spec parameter schema lookups vs. per-node rebuilds (COUNT/50 datapoints)."""
+    import yaml
+    from ZenPacks.zenoss.ZenPackLib.lib.helpers.SpecSchema import SpecSchema
+    from ZenPacks.zenoss.ZenPackLib.lib.helpers.loaders import FastZenPackSpecLoader
+    from ZenPacks.zenoss.ZenPackLib.lib.spec.Spec import Spec
+    from ZenPacks.zenoss.ZenPackLib.lib.spec.RRDDatapointSpec import RRDDatapointSpec
+
+    datapoints = max(10, count / 50)
+
+    def rebuild(i):
+        # What construct_specsparameters and construct_spec used to do for
+        # every node.
+        {x.__name__: x for x in Spec.get_subclasses()}.get('RRDDatapointSpec')
+        param_name_map = {}
+        for key, attributes in RRDDatapointSpec.init_params.items():
+            param_name_map[attributes.get('yaml_param')] = key
+
+    def lookup(i):
+        SpecSchema.get_spec_class('RRDDatapointSpec')
+        SpecSchema.get(RRDDatapointSpec).yaml_params
+
+    report('rebuild subclass and parameter maps', datapoints, timed(rebuild, datapoints), 'nodes')
+    report('SpecSchema lookups', datapoints, timed(lookup, datapoints), 'nodes')
+
+    doc = datapoints_yaml(datapoints)
+
+    def load(i):
+        yaml.load(doc, Loader=FastZenPackSpecLoader)
+
+    report('construct {} datapoints'.format(datapoints), 1, timed(load, 1), 'loads')
+
+
+@benchmark('import')
+def bench_import(count):
+    """Import zenpacklib in a new process, and build reserved keywords (COUNT/20000 imports)."""
+    import subprocess
+    from ZenPacks.zenoss.ZenPackLib.lib import functions
+
+    imports = max(1, count / 20000)
+
+    def do_import(i):
+        subprocess.check_call([
+            sys.executable, '-c',
+            'import ZenPacks.zenoss.ZenPackLib.zenpacklib'])
+
+    report('import zenpacklib', imports, timed(do_import, imports), 'imports')
+
+    def build(i):
+        functions.build_keyword_owners()
+
+    report('build reserved keywords', imports, timed(build, imports), 'builds')
+
+    keywords = list(functions.ZENOSS_KEYWORDS)
+
+    def find(i):
+        functions.find_keyword_cls(keywords[i % len(keywords)])
+
+    report('find_keyword_cls', count, timed(find, count))
+
+
+@benchmark('classcache')
+def bench_classcache(count):
+    """ClassSpec class attributes built vs. generated class cache (COUNT/1000 rounds)."""
+    import shutil
+    import tempfile
+    from ZenPacks.zenoss.ZenPackLib.lib.helpers.ClassCache import render_class_cache
+
+    path = tempfile.mkdtemp()
+    try:
+        write_split_zenpack(path)
+        cfg = load_spec(path)
+    finally:
+        shutil.rmtree(path)
+
+    rounds = max(1, count / 1000)
+    specs = cfg.classes.values()
+    attributes = OrderedDict(
+        (spec.name, spec.get_class_cache_attributes()) for spec in specs)
+
+    start = time.time()
+    source = render_class_cache('benchmark', attributes)
+    namespace = {}
+    exec compile(source, 'zpl_class_cache', 'exec') in namespace
+    report('write and import class cache', 1, time.time() - start, 'modules')
+
+    functions = [
+        f for kinds in namespace['ATTRIBUTES'].itervalues()
+        for f in kinds.itervalues()]
+
+    def dynamic(i):
+        for spec in specs:
+            spec.get_class_cache_attributes()
+
+    def cached(i):
+        for f in functions:
+            f()
+
+    label = '{} classes attributes'.format(len(specs))
+    report('{} (built)'.format(label), rounds, timed(dynamic, rounds), 'rounds')
+    report('{} (class cache)'.format(label), rounds, timed(cached, rounds), 'rounds')
+
+
+def hierarchy_yaml(count, depth=5):
+    """Return YAML for a ZenPack with count classes in trees of depth levels."""
+    lines = [
+        "name: ZenPacks.zenoss.ZPLBenchHierarchy",
+        "class_relationships:",
+        "  - BenchDevice 1:MC BenchClass0",
+        "classes:",
+        "  BenchDevice:",
+        "    base: [zenpacklib.Device]",
+    ]
+    for i in xrange(count):
+        level = i % depth
+        base = 'zenpacklib.Component' if level == 0 else 'BenchClass{}'.format(i - 1)
+        if level > 1:
+            # Mix in a second base to get diamonds.
+            base = '{}, BenchClass{}'.format(base, i - level)
+        lines.extend([
+            "  BenchClass{}:".format(i),
+            "    base: [{}]".format(base),
+            "    properties:",
+            "      prop{0}a: {{label: Prop {0} A}}".format(i),
+            "      prop{0}b: {{label: Prop {0} B, type: int}}".format(i),
+        ])
+    return "\n".join(lines) + "\n"
+
+
+@benchmark('hierarchy')
+def bench_hierarchy(count):
+    """Class hierarchy lookups on a ZenPack with 300 classes (COUNT/100 rounds)."""
+    cfg = load_spec(hierarchy_yaml(300))
+    specs = cfg.classes.values()
+    rounds = max(1, count / 100)
+
+    def lookups(i):
+        for spec in specs:
+            spec.inherited_properties()
+            spec.inherited_relationships()
+            spec.get_base_specs()
+            spec.get_descendant_specs()
+            spec.subclass_specs()
+
+    def invalidated(i):
+        cfg.class_hierarchy.invalidate()
+        lookups(i)
+
+    def rebuilt(i):
+        cfg._class_hierarchy = None
+        lookups(i)
+
+    label = '{} classes'.format(len(specs))
+    report('{} (cached)'.format(label), rounds, timed(lookups, rounds), 'rounds')
+    report('{} (merged maps invalidated)'.format(label), rounds, timed(invalidated, rounds), 'rounds')
+    report('{} (index rebuilt)'.format(label), rounds, timed(rebuilt, rounds), 'rounds')
+    report('load_yaml {} classes'.format(len(specs)), 1, timed(lambda i: load_spec(hierarchy_yaml(300)), 1), 'loads')
+
+
+@benchmark('datapoints')
+def bench_datapoints(count):
+    """Datapoint properties of a 500 row grid page, per object vs. batched (COUNT/10000 pages)."""
+    from ZenPacks.zenoss.ZenPackLib.lib.helpers.DatapointBatch import (
+        DATAPOINT_CACHE, LocalDatapointBackend, prefetch_datapoints,
+        set_datapoint_backend)
+
+    cfg = load_spec("""
+name: ZenPacks.zenoss.ZPLBenchDatapoints
+classes:
+  BenchComponent:
+    base: [zenpacklib.Component]
+    properties:
+      dp1: {label: DP 1, datapoint: stats_dp1, grid_display: true}
+      dp2: {label: DP 2, datapoint: stats_dp2, grid_display: true}
+      dp3: {label: DP 3, datapoint: stats_dp3, grid_display: true}
+      dp4: {label: DP 4, datapoint: stats_dp4, grid_display: true}
+""")
+    cls = get_class(cfg, 'BenchComponent')
+    datapoints = cfg.classes['BenchComponent'].datapoints_to_fetch
+    pages = max(1, count / 10000)
+
+    # 1ms per request stands in for a metric service round trip.
+    backend = LocalDatapointBackend(latency=0.001)
+    components = [cls('bench-{}'.format(i)) for i in xrange(500)]
+    for component in components:
+        for datapoint in datapoints:
+            backend.set_value(component, datapoint, 1.0)
+
+    set_datapoint_backend(backend)
+    try:
+        def per_object(i):
+            for component in components:
+                for datapoint in datapoints:
+                    backend.fetch([component], [datapoint])
+
+        def batched(i):
+            DATAPOINT_CACHE.clear()
+            prefetch_datapoints(components, datapoints)
+            for component in components:
+                for prop in ('dp1', 'dp2', 'dp3', 'dp4'):
+                    getattr(component, prop)()
+
+        for label, func in (('per object', per_object), ('batched', batched)):
+            backend.requests = 0
+            seconds = timed(func, pages)
+            report('500 rows x 4 datapoints ({})'.format(label), pages, seconds, 'pages')
+            print "    {} metric requests per page".format(backend.requests / pages)
+    finally:
+        set_datapoint_backend(None)
+        DATAPOINT_CACHE.clear()
+
+
+@benchmark('templates')
+def bench_templates(count):
+    """Template binding of components during config generation, uncached vs. cached (COUNT/2 components)."""
+    import transaction
+    from ZenPacks.zenoss.ZenPackLib.lib.base.TemplateBindings import TEMPLATE_BINDINGS
+
+    cfg = load_spec("""
+name: ZenPacks.zenoss.ZPLBenchTemplates
+class_relationships:
+  - BenchDevice 1:MC BenchComponent
+classes:
+  BenchDevice:
+    base: [zenpacklib.Device]
+  BenchComponent:
+    base: [zenpacklib.Component]
+    monitoring_templates: [BenchTemplate, BenchExtra]
+""")
+    count = max(1, count / 2)
+    try:
+        device = create_device(cfg, 'BenchDevice', 'bench-templates')
+        deviceclass = device.deviceClass()
+        for template_id in ('BenchTemplate', 'BenchExtra-replacement', 'BenchExtra-addition'):
+            if not deviceclass.rrdTemplates._getOb(template_id, None):
+                deviceclass.manage_addRRDTemplate(template_id)
+
+        components = add_components(
+            cfg, device, 'BenchComponent', 'benchComponents', count, 'bench')
+
+        # Cached bindings are only used for stored device classes.
+        transaction.savepoint()
+
+        def uncached(i):
+            components[i].resolve_rrd_templates()
+
+        def cached(i):
+            components[i].getRRDTemplates()
+
+        TEMPLATE_BINDINGS.clear()
+        for label, func in (('uncached', uncached), ('cached', cached)):
+            seconds = timed(func, count)
+            report('getRRDTemplates ({})'.format(label), count, seconds, 'components')
+        print "    {} cached bindings".format(len(TEMPLATE_BINDINGS.bindings))
+    finally:
+        TEMPLATE_BINDINGS.clear()
+        transaction.abort()
+
+
+@benchmark('rrdpath')
+def bench_rrdpath(count):
+    """Component rrdPath() with per-call JSON probing vs. cached (COUNT components)."""
+    import json
+    import transaction
+    from ZenPacks.zenoss.ZenPackLib.lib.base.ComponentBase import (
+        flat_rrd_path, metadata_rrd_path)
+
+    cfg = load_spec("""
+name: ZenPacks.zenoss.ZPLBenchRRDPath
+class_relationships:
+  - BenchDevice 1:MC BenchComponent
+classes:
+  BenchDevice:
+    base: [zenpacklib.Device]
+  BenchComponent:
+    base: [zenpacklib.Component]
+""")
+    try:
+        device = create_device(cfg, 'BenchDevice', 'bench-rrdpath')
+        components = add_components(
+            cfg, device, 'BenchComponent', 'benchComponents', count, 'bench')
+
+        def probed(i):
+            original = metadata_rrd_path(components[i])
+            try:
+                json.loads(original)
+            except ValueError:
+                return flat_rrd_path(components[i])
+            else:
+                return original
+
+        def cached(i):
+            components[i].rrdPath()
+
+        for label, func in (('probed', probed), ('first call', cached), ('cached', cached)):
+            seconds = timed(func, count)
+            report('rrdPath ({})'.format(label), count, seconds, 'components')
+    finally:
+        transaction.abort()
+
+
+def templates_yaml(count):
+    """Return YAML for count templates of 10 datasources, 2 thresholds and 5 graphs."""
+    lines = ["name: ZenPacks.zenoss.ZPLBenchTemplateDiff",
+             "device_classes:",
+             "  /Server/ZPLBench:",
+             "    templates:"]
+    for i in xrange(count):
+        lines.append("      Bench{}:".format(i))
+        lines.append("        thresholds:")
+        for j in xrange(2):
+            lines.append("          th{0}: {{dsnames: [ds{0}_dp{0}], maxval: '{1}'}}".format(j, 90 + j))
+        lines.append("        datasources:")
+        for j in xrange(10):
+            lines.append("          ds{0}:".format(j))
+            lines.append("            type: SNMP")
+            lines.append("            oid: 1.3.6.1.4.1.2021.11.{}.0".format(50 + j))
+            lines.append("            datapoints: {{dp{}: GAUGE}}".format(j))
+        lines.append("        graphs:")
+        for j in xrange(5):
+            lines.append("          Graph {}:".format(j))
+            lines.append("            units: percent")
+            lines.append("            graphpoints:")
+            lines.append("              dp{0}: {{dpName: ds{0}_dp{0}, lineType: AREA, includeThresholds: true}}".format(j))
+    return "\n".join(lines) + "\n"
+
+
+@benchmark('templatediff')
+def bench_templatediff(count):
+    """Install-time template comparison, prototype vs. structural (COUNT/500 templates)."""
+    import transaction
+    import yaml
+    from ZenPacks.zenoss.ZenPackLib.lib.base.ZenPack import ZenPack
+    from ZenPacks.zenoss.ZenPackLib.lib.helpers.Dumper import Dumper
+    from ZenPacks.zenoss.ZenPackLib.lib.helpers.TemplateDiff import template_diff
+
+    count = max(1, count / 500)
+    cfg = load_spec(templates_yaml(count))
+    dmd = get_dmd()
+    dcspec = cfg.device_classes['/Server/ZPLBench']
+    dcspecparam = cfg.specparams.device_classes['/Server/ZPLBench']
+    try:
+        dcspec.create_organizer(dmd)
+        specs = [dcspec.templates[x] for x in sorted(dcspec.templates)]
+        templates = [x.create(dmd, False) for x in specs]
+        params = [dcspecparam.templates[x.name] for x in specs]
+
+        def prototype(i):
+            spec = specs[i]
+            object_yaml = yaml.dump(params[i].fromObject(templates[i]), Dumper=Dumper)
+            proto_id = '{}-new'.format(spec.name)
+            proto = spec.create(dmd, False, proto_id)
+            proto_yaml = yaml.dump(params[i].fromObject(proto), Dumper=Dumper)
+            spec.remove(dmd, proto_id)
+            return ZenPack.get_yaml_diff(object_yaml, proto_yaml)
+
+        def structural(i):
+            return template_diff(templates[i], specs[i])
+
+        for label, func in (('prototype', prototype), ('structural', structural)):
+            seconds = timed(func, count)
+            report('object_changed ({})'.format(label), count, seconds, 'templates')
+            changed = len([x for x in xrange(count) if func(x)])
+            print "    {} of {} templates reported as changed".format(changed, count)
+    finally:
+        transaction.abort()
+
+
+def main():
+    parser = OptionParser(usage="%prog [options] NAME [NAME ...]")
+    parser.add_option("-n", "--count", dest="count", type="int",
+                      default=100000, help="operations per measurement")
+    parser.add_option("-l", "--list", dest="list", action="store_true",
+                      help="list available benchmarks")
+    options, args = parser.parse_args()
+
+    if options.list or not args:
+        for name, func in BENCHMARKS.iteritems():
+            print "{:<20} {}".format(name, func.__doc__)
+        return
+
+    for name in args:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark: {}".format(name))
+
+    for name in args:
+        print "# {}: {}".format(name, BENCHMARKS[name].__doc__)
+        BENCHMARKS[name](options.count)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -64,6 +64,8 @@ from lib.base.Component import (
 )
 
 from lib.spec import ZenPackSpec
+from lib.base.RelationshipBatch import RelationshipBatch
+from lib.base.IndexingQueue import IndexingQueue
 from lib.functions import relationships_from_yuml, catalog_search, ucfirst, relname_from_classname
 
 LOG = logging.getLogger('zen.ZenPackLib')